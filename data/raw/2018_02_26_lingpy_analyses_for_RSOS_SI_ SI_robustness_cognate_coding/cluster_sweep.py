@@ -0,0 +1,133 @@
+"""
+Cognate clustering at many thresholds in one pass.
+
+LexStat.cluster() aligns every pair of words in a concept again for each
+threshold. Here the per-concept distance matrices are computed once (one
+concept per worker process) and every threshold is read off them:
+
+* upgma, single, complete: LingPy's flat linkage always performs the same
+  sequence of merges and stops at the first one above the threshold, so the
+  full merge sequence is computed once and cut at every threshold;
+* mcl, infomap, link_clustering (and any other method): the cached matrix
+  is handed to LingPy's clustering function once per threshold, with
+  LexStat.cluster()'s default keywords (inflation, max_steps, matrix_type,
+  ...) updated by the caller's.
+
+The partitions are identical to those of LexStat.cluster() with the same
+settings.
+"""
+
+import multiprocessing as mp
+import os
+
+from cognate_eval import compare
+
+LINKAGES = {'upgma': lambda s: sum(s) / len(s), 'single': min, 'complete': max}
+
+# The LexStat being swept, inherited by the forked workers (it cannot be
+# pickled)
+_LEX = None
+
+
+def merge_sequence(matrix, linkage='upgma'):
+    """
+    Merges of LingPy's flat linkage clustering run to completion, as a list
+    of (distance, kept cluster, merged cluster).
+    """
+    score = LINKAGES[linkage]
+    clusters = dict([(i, [i]) for i in range(len(matrix))])
+    merges = []
+    while len(clusters) > 1:
+        scores, indices = [], []
+        for i, valA in clusters.items():
+            for j, valB in clusters.items():
+                if i != j:
+                    scores.append(score(
+                        [matrix[vA][vB] for vA in valA for vB in valB]))
+                    indices.append((i, j))
+        minimum = min(scores)
+        idxA, idxB = indices[scores.index(minimum)]
+        clusters[idxA] += clusters[idxB]
+        del clusters[idxB]
+        merges.append((minimum, idxA, idxB))
+    return merges
+
+
+def cut(merges, size, threshold):
+    """Cluster of each item (numbered like flat_cluster) at a threshold."""
+    parent = list(range(size))
+    for distance, idxA, idxB in merges:
+        if distance > threshold:
+            break
+        for i in range(size):
+            if parent[i] == idxB:
+                parent[i] = idxA
+    return dict((i, parent[i] + 1) for i in range(size))
+
+
+def partitions(matrix, thresholds, cluster_method='upgma', **keywords):
+    """
+    One {item: cluster} dictionary per threshold. Keywords are passed to the
+    clustering function as in LexStat.cluster().
+    """
+    if cluster_method in LINKAGES:
+        merges = merge_sequence(matrix, cluster_method)
+        return [cut(merges, len(matrix), t) for t in thresholds]
+    kw = _LEX.cluster(defaults=True, **keywords)
+    fclust = _LEX._cluster_method(cluster_method, **kw)
+    out = []
+    for t in thresholds:
+        c = fclust(matrix, t)
+        out.append(dict((i, c.get(str(i), c.get(i))) for i in range(len(matrix))))
+    return out
+
+
+def _concept(args):
+    concept, thresholds, cluster_method, kw = args
+    indices = _LEX.get_list(row=concept, flat=True)
+    matrix = next(_LEX._get_matrices(concept=concept, **kw))
+    return concept, indices, partitions(matrix, thresholds, cluster_method,
+            **kw)
+
+
+def sweep(lex, thresholds, gold=None, method='lexstat', cluster_method='upgma',
+        ref='t_{0}', processes=None, **keywords):
+    """
+    Cluster at every threshold and add the results to lex as ref.format(i)
+    for i = 1, 2, ... If gold is given, return the B-cubed scores (as
+    lingpy.evaluate.acd.bcubes, computed for all thresholds at once by
+    cognate_eval) as a list of (threshold, precision, recall, f-score).
+
+    Further keywords (scale, factor, mode, gop, inflation, ...) are passed to
+    the distance computation and the clustering function as in
+    LexStat.cluster().
+    """
+    global _LEX
+    _LEX = lex
+    kw = dict(method=method)
+    kw.update(keywords)
+    jobs = [(c, thresholds, cluster_method, kw) for c in sorted(lex.rows)]
+    processes = processes or os.cpu_count() or 1
+    try:
+        if processes > 1:
+            with mp.get_context('fork').Pool(processes) as pool:
+                results = pool.map(_concept, jobs, chunksize=1)
+        else:
+            results = [_concept(job) for job in jobs]
+    finally:
+        _LEX = None
+
+    refs = [ref.format(n + 1) for n in range(len(thresholds))]
+    for n, t in enumerate(thresholds):
+        clr, k = {}, 0
+        for concept, indices, parts in results:
+            clusters = [parts[n][i] + k for i in range(len(indices))]
+            k = max(clusters)
+            for idx, cluster in zip(indices, clusters):
+                clr[idx] = cluster
+        lex.add_entries(refs[n], clr, lambda x: x, override=True)
+    if not gold:
+        return []
+    scores = compare(lex, gold, refs)
+    return [(t, float(p), float(r), float(f)) for t, p, r, f in zip(thresholds,
+        scores['precision'], scores['recall'], scores['fscore'])]
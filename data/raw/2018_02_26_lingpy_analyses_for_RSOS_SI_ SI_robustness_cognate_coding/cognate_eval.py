@@ -0,0 +1,172 @@
+"""
+Batched comparison of cognate codings.
+
+All codings of a wordlist (expert cognate ids, LexStat runs at many
+thresholds, other methods) are encoded once as integer label arrays over the
+same words, one row per coding. Every score against a reference coding then
+follows from three numbers per word: the size of its reference set, of its
+test set and of their intersection, counted for the whole batch at once:
+
+* B-cubed precision, recall and F-score, overall exactly as
+  lingpy.evaluate.acd.bcubes (which counts a cognate set once per language,
+  taking its first word there) and per concept as bcubes(per_concept=True);
+* the adjusted Rand index and the variation of information (natural log) per
+  concept, and their means over concepts.
+
+Optional word masks (one per coding) restrict the comparison, e.g. to a
+subset of the languages.
+"""
+
+import numpy as np
+
+
+def encode(wordlist, refs):
+    """
+    Label arrays of the given cognate-id columns of a LingPy wordlist.
+
+    Returns a dictionary with the word ids, the concepts and taxa (names and
+    one integer per word) and labels, an array of refs x words.
+    """
+    ids = list(wordlist)
+    concepts = [wordlist[idx][wordlist._rowIdx] for idx in ids]
+    taxa = [wordlist[idx][wordlist._colIdx] for idx in ids]
+    rows = sorted(set(concepts))
+    cols = sorted(set(taxa))
+    labels = np.zeros((len(refs), len(ids)), dtype=np.int64)
+    for i, ref in enumerate(refs):
+        codes = {}
+        labels[i] = [codes.setdefault(wordlist[idx, ref], len(codes))
+            for idx in ids]
+    return {
+        'ids': ids,
+        'refs': list(refs),
+        'concepts': rows,
+        'taxa': cols,
+        'concept': np.array([rows.index(c) for c in concepts]),
+        'taxon': np.array([cols.index(t) for t in taxa]),
+        'labels': labels,
+        }
+
+
+def taxon_mask(encoded, taxa):
+    """Word mask keeping the words of the given taxa."""
+    keep = [encoded['taxa'].index(t) for t in taxa]
+    return np.isin(encoded['taxon'], keep)
+
+
+def _group(*columns):
+    """Dense group number of every cell for the combination of the columns."""
+    shape = np.broadcast(*columns).shape
+    key = np.zeros(shape, dtype=np.int64)
+    for column in columns:
+        column = np.broadcast_to(column, shape)
+        key = key * (int(column.max()) + 1) + column
+        key = np.unique(key, return_inverse=True)[1].reshape(shape)
+    return key
+
+
+def _count(group, weights):
+    """Summed weights of the cells in the same group, for every cell."""
+    return np.bincount(group.ravel(), weights=weights.ravel())[group]
+
+
+def _first(group, weights):
+    """Mask of the first weighted cell of every group (row by row)."""
+    group = np.where(weights > 0, group, -1)
+    first = np.unique(group.ravel(), return_index=True)[1]
+    mask = np.zeros(group.size, dtype=bool)
+    mask[first] = True
+    return mask.reshape(group.shape) & (weights > 0)
+
+
+def _ratio(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return a / b
+
+
+def _fscore(p, r):
+    return _ratio(2 * p * r, p + r)
+
+
+def evaluate(encoded, gold, tests=None, mask=None):
+    """
+    Score test codings against the gold coding.
+
+    gold and tests are names from encoded['refs'] (tests defaults to all
+    others); mask is None, a boolean word mask or one mask per test. Returns
+    a dictionary with the tests and the arrays precision, recall, fscore,
+    ari and vi (one value per test), and 'concept' holding the same scores
+    as tests x concepts arrays (nan where a concept has no words).
+    """
+    refs = encoded['refs']
+    tests = [r for r in refs if r != gold] if tests is None else list(tests)
+    G = encoded['labels'][refs.index(gold)][None, :]
+    T = encoded['labels'][[refs.index(t) for t in tests]]
+    row = np.arange(len(tests))[:, None]
+    concept = encoded['concept'][None, :]
+    taxon = encoded['taxon'][None, :]
+    W = np.ones(T.shape) if mask is None else np.broadcast_to(
+            np.asarray(mask, dtype=float), T.shape)
+
+    # per concept: set sizes of each word in the reference, the test and both
+    gsize = _count(_group(row, concept, G), W)
+    tsize = _count(_group(row, concept, T), W)
+    both = _count(_group(row, concept, G, T), W)
+    n_concepts = len(encoded['concepts'])
+    cell = (row * n_concepts + concept) * np.ones(T.shape, dtype=np.int64)
+
+    def per_concept(values):
+        values = np.where(W > 0, W * values, 0.0)
+        return np.bincount(cell.ravel(), weights=values.ravel(),
+                minlength=len(tests) * n_concepts).reshape(-1, n_concepts)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = per_concept(1.0)
+        p = per_concept(_ratio(both, tsize)) / n
+        r = per_concept(_ratio(both, gsize)) / n
+        vi = -per_concept(np.log(_ratio(both, gsize)) +
+                np.log(_ratio(both, tsize))) / n
+
+        # adjusted Rand index from pair counts (sum of C(size, 2) = sum of
+        # (size - 1) / 2 over the words)
+        pairs = n * (n - 1) / 2
+        index = per_concept((both - 1) / 2)
+        a = per_concept((gsize - 1) / 2)
+        b = per_concept((tsize - 1) / 2)
+        expected = a * b / pairs
+        maximum = (a + b) / 2
+        ari = np.where(maximum == expected, 1.0,
+                (index - expected) / (maximum - expected))
+    ari[n == 0] = np.nan
+
+    # overall B-cubed as LingPy: each cognate set counts once per taxon
+    scores = []
+    for one, other in [(G, T), (T, G)]:
+        first = W * _first(_group(row, one, taxon), W)
+        size = _count(_group(row, one), first)
+        shared = _count(_group(row, one, other), first)
+        scores.append(
+            (first * _ratio(shared, np.maximum(size, 1))).sum(axis=1) /
+            first.sum(axis=1))
+    recall, precision = scores
+
+    return {
+        'tests': tests,
+        'precision': precision,
+        'recall': recall,
+        'fscore': _fscore(precision, recall),
+        'ari': np.nanmean(ari, axis=1),
+        'vi': np.nanmean(vi, axis=1),
+        'concept': {
+            'precision': p,
+            'recall': r,
+            'fscore': _fscore(p, r),
+            'ari': ari,
+            'vi': vi,
+            },
+        }
+
+
+def compare(wordlist, gold, tests, mask=None):
+    """Encode a wordlist and evaluate its test columns in one go."""
+    return evaluate(encode(wordlist, [gold] + list(tests)), gold, tests, mask)
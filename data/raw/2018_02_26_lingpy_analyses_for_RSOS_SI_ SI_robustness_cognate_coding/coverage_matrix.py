@@ -0,0 +1,108 @@
+"""
+Mutual coverage of the languages in a wordlist from one boolean matrix.
+
+The languages x concepts matrix of attested concepts is built once; the
+number of concepts shared by every pair of languages is then its product
+with its transpose. Minimum and average mutual coverage are read off that
+matrix (the minimum is the largest threshold mutual_coverage_check in
+lingpy.compare.sanity accepts), and the largest language subsets meeting a
+threshold are the maximum cliques of the graph of pairs reaching it, found
+by Bron-Kerbosch with pivoting on bitsets.
+"""
+
+import numpy as np
+
+
+def presence(wordlist, concepts='concept'):
+    """Taxa, concepts and the taxa x concepts matrix of attested concepts."""
+    taxa = list(wordlist.cols)
+    rows = sorted(set(wordlist[idx, concepts] for idx in wordlist))
+    tidx = dict((t, i) for i, t in enumerate(taxa))
+    cidx = dict((c, i) for i, c in enumerate(rows))
+    matrix = np.zeros((len(taxa), len(rows)), dtype=bool)
+    for idx in wordlist:
+        matrix[tidx[wordlist[idx][wordlist._colIdx]],
+                cidx[wordlist[idx, concepts]]] = True
+    return taxa, rows, matrix
+
+
+def mutual_coverage(wordlist, concepts='concept'):
+    """
+    Mutual coverage of all language pairs.
+
+    Returns a dictionary with the taxa, the concepts, the presence matrix,
+    mutual (taxa x taxa counts of shared concepts), minimum (over all pairs)
+    and average (mean over the taxa of their mean coverage with the others).
+    """
+    taxa, rows, matrix = presence(wordlist, concepts)
+    counts = matrix.astype(np.int64)
+    mutual = counts @ counts.T
+    pairs = mutual[~np.eye(len(taxa), dtype=bool)]
+    return {
+        'taxa': taxa,
+        'concepts': rows,
+        'matrix': matrix,
+        'mutual': mutual,
+        'minimum': int(pairs.min()) if len(pairs) else 0,
+        'average': float(pairs.mean()) if len(pairs) else 0.0,
+        }
+
+
+def _max_cliques(neighbours):
+    """All maximum cliques of a graph given as neighbour bitsets."""
+    best, cliques = [0], []
+
+    def expand(clique, size, candidates, excluded):
+        if not candidates and not excluded:
+            if size > best[0]:
+                best[0] = size
+                del cliques[:]
+            if size == best[0]:
+                cliques.append(clique)
+            return
+        if size + bin(candidates).count('1') < best[0]:
+            return
+        union = candidates | excluded
+        pivot = max(_members(union),
+                key=lambda u: bin(candidates & neighbours[u]).count('1'))
+        for v in _members(candidates & ~neighbours[pivot]):
+            expand(clique | 1 << v, size + 1, candidates & neighbours[v],
+                    excluded & neighbours[v])
+            candidates &= ~(1 << v)
+            excluded |= 1 << v
+
+    expand(0, 0, (1 << len(neighbours)) - 1, 0)
+    return best[0], cliques
+
+
+def _members(bits):
+    i = 0
+    while bits:
+        if bits & 1:
+            yield i
+        bits >>= 1
+        i += 1
+
+
+def largest_subset(coverage, threshold):
+    """
+    Largest sets of languages in which every pair shares at least threshold
+    concepts (coverage as returned by mutual_coverage).
+
+    Returns the number of languages and a list of (average mutual coverage,
+    sorted languages), best covered first, like mutual_coverage_subset in
+    lingpy.compare.sanity.
+    """
+    taxa, mutual = coverage['taxa'], coverage['mutual']
+    adjacent = (mutual >= threshold) & ~np.eye(len(taxa), dtype=bool)
+    neighbours = [sum(1 << int(j) for j in np.flatnonzero(row))
+            for row in adjacent]
+    size, cliques = _max_cliques(neighbours)
+    subsets = []
+    for clique in cliques:
+        members = list(_members(clique))
+        block = mutual[np.ix_(members, members)]
+        pairs = block[~np.eye(len(members), dtype=bool)]
+        subsets.append((float(pairs.mean()) if len(pairs) else 0.0,
+            sorted(taxa[i] for i in members)))
+    return size, sorted(subsets, key=lambda x: (-x[0], x[1]))
@@ -0,0 +1,79 @@
+"""
+Disk cache for the LexStat scorer and the tokenized wordlist behind it.
+
+The permutation-based scorer (get_scorer with 10000 runs) takes minutes and
+only depends on the input wordlist, the orthography profile, the code that
+parses them and the scorer parameters. Its result is stored under a hash of
+exactly those, as a wordlist file (KEY.tsv) plus the scoring matrix
+(KEY.npz), so later runs that only change the clustering reuse it.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+import lingpy
+from lingpy import LexStat
+from lingpy.algorithm import misc
+
+CACHE_DIR = '.lexstat_cache'
+
+
+def cache_key(sources, functions=(), **params):
+    """
+    Hash of the source files, the code of the parsing functions, the
+    scorer parameters and the LingPy version.
+    """
+    h = hashlib.sha256()
+    for path in sources:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    for function in functions:
+        h.update(inspect.getsource(function).encode('utf-8'))
+    h.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    h.update(lingpy.__version__.encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def save_scorer(lex, path):
+    chars = sorted(lex.cscorer.chars2int, key=lex.cscorer.chars2int.get)
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, chars=np.array(chars), matrix=np.array(lex.cscorer.matrix),
+             params=json.dumps(lex.params['cscorer']))
+    os.replace(tmp, path)
+
+
+def load_scorer(lex, path):
+    """Attach a stored scorer to a LexStat as if get_scorer had run."""
+    data = np.load(path)
+    lex.cscorer = misc.ScoreDict(data['chars'].tolist(), data['matrix'].tolist())
+    lex._meta['scorer']['cscorer'] = lex.cscorer
+    lex.params = {'cscorer': json.loads(str(data['params']))}
+    lex._meta['params'] = lex.params
+    return lex
+
+
+def cached_lexstat(prepare, sources, functions=(), cache_dir=CACHE_DIR,
+        **scorer):
+    """
+    LexStat with its scorer, from the cache if the inputs are unchanged.
+
+    prepare() builds the tokenized wordlist; sources are the files it reads
+    and functions the code it runs (both part of the key); scorer holds the
+    get_scorer keywords (e.g. runs=10000).
+    """
+    key = cache_key(sources, functions, **scorer)
+    base = os.path.join(cache_dir, key)
+    if os.path.exists(base + '.tsv') and os.path.exists(base + '.npz'):
+        print('[i] Using cached LexStat scorer {0}.'.format(key))
+        return load_scorer(LexStat(base + '.tsv'), base + '.npz')
+
+    lex = LexStat(prepare(), check=True)
+    lex.get_scorer(**scorer)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    lex.output('tsv', filename=base, ignore='all', prettify=False)
+    save_scorer(lex, base + '.npz')
+    return lex
@@ -0,0 +1,108 @@
+"""
+Orthography-profile tokenizer with cached segmentation.
+
+Gives the same output as segments.Tokenizer(profile)(form, column) for a
+tab-separated profile without a rules file. The graphemes of the profile are
+compiled into one regular expression shaped like their prefix trie (one
+alternative per first character, optional longer continuations), so every
+match is the longest grapheme starting at that position, the greedy match of
+the segments parse tree; a character that starts no grapheme becomes the
+replacement marker. Every distinct form is segmented only once, and
+tokens() converts a whole column in one call.
+"""
+
+import csv
+import re
+
+GRAPHEME_COL = 'Grapheme'
+NULL = 'NULL'
+REPLACEMENT_MARKER = '�'
+
+
+def read_profile(path):
+    """Ordered {grapheme: {column: value}} read as segments reads a profile."""
+    graphemes = {}
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = [row for row in csv.reader(f, delimiter='\t') if row]
+    header = rows[0]
+    for row in rows[1:]:
+        spec = dict((k, None if (k != GRAPHEME_COL and v == NULL) else v)
+                for k, v in zip(header, row))
+        grapheme = spec.pop(GRAPHEME_COL)
+        if not grapheme:
+            raise ValueError('Grapheme must not be empty')
+        graphemes.setdefault(grapheme, spec)
+    return graphemes
+
+
+def _trie_pattern(graphemes):
+    """Regular expression of a prefix trie: the longest grapheme matches."""
+    trie = {}
+    for grapheme in graphemes:
+        node = trie
+        for char in grapheme:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def pattern(node):
+        alternatives = [re.escape(char) + pattern(child)
+                for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ''
+        group = '(?:' + '|'.join(alternatives) + ')'
+        return group + '?' if '' in node else group
+
+    return pattern(trie)
+
+
+class Orthography:
+    """
+    Tokenizer for one orthography profile.
+
+    >>> t = Orthography('profile.tsv')
+    >>> t('ka:l', 'IPA')
+    'k aː l'
+    """
+
+    def __init__(self, profile):
+        self.graphemes = read_profile(profile)
+        self.columns = set(k for spec in self.graphemes.values() for k in spec)
+        self.pattern = re.compile(
+                _trie_pattern(self.graphemes) + '|.', re.DOTALL)
+        self._cache = {}
+
+    def segment(self, word):
+        """Graphemes of a word (without spaces), longest match first."""
+        return [m if m in self.graphemes else REPLACEMENT_MARKER
+                for m in self.pattern.findall(word)]
+
+    def transform(self, word, column=GRAPHEME_COL):
+        """Graphemes of a word converted to another column of the profile."""
+        graphemes = self.segment(word)
+        if column == GRAPHEME_COL:
+            return graphemes
+        out = []
+        for grapheme in graphemes:
+            try:
+                target = self.graphemes[grapheme][column]
+            except KeyError:
+                target = REPLACEMENT_MARKER
+            if target is not None:
+                out.append(target)
+        return out
+
+    def __call__(self, string, column=GRAPHEME_COL):
+        """Space-separated segments, words separated by ' # '."""
+        key = (string, column)
+        if key not in self._cache:
+            if column != GRAPHEME_COL and column not in self.columns:
+                raise ValueError('Column {0} not found in profile.'.format(
+                    column))
+            self._cache[key] = ' # '.join(
+                    ' '.join(self.transform(word, column)).strip()
+                    for word in string.split())
+        return self._cache[key]
+
+    def tokens(self, forms, column=GRAPHEME_COL):
+        """Token lists of many forms, each distinct form tokenized once."""
+        return [self(form, column).split(' ') for form in forms]
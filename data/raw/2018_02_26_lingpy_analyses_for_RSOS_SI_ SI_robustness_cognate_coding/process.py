@@ -1,7 +1,12 @@
 from lingpy import *
-from lingpy.evaluate.acd import bcubes, diff
-from lingpy.compare.sanity import mutual_coverage_check, mutual_coverage
-from segments.tokenizer import Tokenizer
+from lingpy.evaluate.acd import diff
+
+from cluster_sweep import sweep
+from coverage_matrix import mutual_coverage
+from lexstat_cache import cached_lexstat
+from orthography import Orthography
+
+SOURCES = ['DravLex-2017-04-23.csv', 'profile.tsv', 'orthography.py']
 
 
 # load data and add ids
@@ -50,8 +55,8 @@ def parse_first():
     # add form, splitting bad values
     wl.add_entries('form', 'value', lambda x: repl.get(x, x).split(' ~ ')[0])
 
-    # get the tokenizer
-    t = Tokenizer('profile.tsv')
+    # get the tokenizer (same tokens as segments, each form segmented once)
+    t = Orthography('profile.tsv')
     wl.add_entries('tokens', 'form', lambda x: t(x, 'IPA').split(' '))
 
     
@@ -60,27 +65,29 @@ def parse_first():
             
     return wl
 
+def get_lexstat(runs=10000):
+    """
+    LexStat with the correspondence scorer, reused from the disk cache while
+    the data, profile, parsing code and scorer parameters are unchanged.
+    """
+    return cached_lexstat(parse_first, SOURCES, [pre_prepare, parse_first],
+            runs=runs)
+
 def thresholds():
 
-    wl = parse_first()
-    lex = LexStat(wl, check=True)
-    lex.get_scorer(runs=10000)
+    lex = get_lexstat()
     lex.add_entries('nobor', 'cogid,borrowing', lambda x,y:
             str(x[y[0]])+'-'+x[y[1]])
     lex.renumber('nobor')
-    for i in range(1, 20):
-        tr = i * 0.05
-        trn = 't_'+str(i)
-        lex.cluster(method='lexstat', threshold=tr, ref=trn,
-            cluster_method='infomap')
-        a, b, c = bcubes(lex, 'noborid', trn, pprint=False)
+    # distances are computed once and clustered at all thresholds (t_1, ...)
+    scores = sweep(lex, [i * 0.05 for i in range(1, 20)], gold='noborid',
+            method='lexstat', cluster_method='infomap')
+    for tr, a, b, c in scores:
         print('Accuracy: T: {3:.2f}, P: {0:.2f}, R: {1:.2f}, FS: {2:.2f}'.format(a,
             b, c, tr))
 
 def cognates():
-    wl = parse_first()
-    lex = LexStat(wl, check=True)
-    lex.get_scorer(runs=10000)
+    lex = get_lexstat()
     lex.add_entries('nobor', 'cogid,borrowing', lambda x,y:
             str(x[y[0]])+'-'+x[y[1]])
     lex.renumber('nobor')
@@ -100,18 +107,11 @@ def cognates():
 def coverage():
 
     wl = pre_prepare()
-    for i in range(wl.height, 0, -1):
-        if mutual_coverage_check(wl, i):
-            print("Mutual coverage is {0}.".format(i))
-            break
-
-    # TODO: average mutual coverage computation
-    mucu = mutual_coverage(wl)
-    sums = []
-    for t in wl.cols:
-        sums += [sum(mucu[t].values()) / len(mucu[t])]
-    print("Average mutual coverage is {0:.2f}".format(
-        sum(sums) / len(sums)))
+    # all pairwise coverages at once (languages x concepts matrix product)
+    cov = mutual_coverage(wl)
+    if cov['minimum']:
+        print("Mutual coverage is {0}.".format(cov['minimum']))
+    print("Average mutual coverage is {0:.2f}".format(cov['average']))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,191 @@
+# scripts/alignment_writer.py
+"""
+Streaming NEXUS / PHYLIP / FASTA writer for binary cognate alignments.
+
+Rows (or interleaved column blocks) are encoded with NumPy - state + ord('0')
+on a uint8 view, then tobytes() - and written to the file as they are
+produced, so no per-character Python strings or in-memory file image are
+built. NEXUS output can carry CHARSTATELABELS and one CHARSET per concept:
+
+    python scripts/alignment_writer.py data/processed/dravidian_beastling.csv out.nex --charsets
+    python scripts/alignment_writer.py data/processed/dravidian_beastling.csv out.phy --interleave 60
+"""
+
+import argparse
+from contextlib import contextmanager
+from itertools import groupby
+
+import numpy as np
+from pathlib import Path
+
+@contextmanager
+def _open(target):
+    """Open a path for binary writing, or pass through an open binary file."""
+    if hasattr(target, 'write'):
+        yield target
+    else:
+        with open(target, 'wb') as f:
+            yield f
+
+def encode_block(values, symbols=b"01", missing=b"?"):
+    """
+    Encode an array of states (0..k-1, -1 = missing) as ASCII bytes.
+
+    Complete data with contiguous symbols takes the fast path: a uint8 view
+    plus the first symbol's code. Otherwise states go through a lookup
+    table whose last entry (index -1) is the missing symbol.
+    """
+
+    values = np.asarray(values)
+    contiguous = symbols == bytes(range(symbols[0], symbols[0] + len(symbols)))
+    if contiguous and values.dtype == np.uint8:
+        return (values + np.uint8(symbols[0])).tobytes()
+    table = np.frombuffer(symbols + missing, dtype=np.uint8)
+    return table[values].tobytes()
+
+def _blocks(n_chars, interleave):
+    """Column ranges of each (interleaved) block."""
+    width = interleave or n_chars
+    return [(start, min(start + width, n_chars)) for start in range(0, max(n_chars, 1), width)]
+
+def nexus_name(name):
+    """Quote a NEXUS token if it contains punctuation or whitespace."""
+    name = str(name)
+    if name and not any(c in name for c in " \t\n()[]{}/\\,;:=*'\"`+-<>"):
+        return name
+    return "'" + name.replace("'", "''") + "'"
+
+def concept_of(feature):
+    """Concept of a cognate feature named <concept>_<cogid>."""
+    return str(feature).rsplit('_', 1)[0]
+
+def concept_charsets(features):
+    """
+    Map each concept to its NEXUS character ranges (1-based), e.g. "3-5 9".
+    """
+
+    positions = {}
+    for i, feature in enumerate(features, start=1):
+        positions.setdefault(concept_of(feature), []).append(i)
+
+    charsets = {}
+    for concept, idx in positions.items():
+        ranges = []
+        # Consecutive positions share the same (position - rank) key
+        for _, run in groupby(enumerate(idx), key=lambda x: x[1] - x[0]):
+            run = [i for _, i in run]
+            ranges.append(f"{run[0]}-{run[-1]}" if len(run) > 1 else f"{run[0]}")
+        charsets[concept] = ' '.join(ranges)
+    return charsets
+
+def write_nexus(target, taxa, matrix, interleave=0, features=None, charsets=False,
+                symbols="01", missing="?", gap="-"):
+    """
+    Write a NEXUS DATA block, one taxon row (or block row) at a time.
+
+    matrix is a taxa x characters array of states (-1 = missing). With
+    interleave=N, characters are written in blocks of N columns. features
+    adds CHARSTATELABELS; charsets=True also adds a SETS block with one
+    CHARSET per concept.
+    """
+
+    matrix = np.asarray(matrix)
+    n_taxa, n_chars = matrix.shape
+    symbols, missing = symbols.encode(), missing.encode()
+    labels = [nexus_name(taxon) for taxon in taxa]
+
+    with _open(target) as f:
+        f.write(b"#NEXUS\n\nBEGIN DATA;\n")
+        f.write(f"    DIMENSIONS NTAX={n_taxa} NCHAR={n_chars};\n".encode())
+        f.write(f"    FORMAT DATATYPE=STANDARD MISSING={missing.decode()} GAP={gap} "
+                f"SYMBOLS=\"{symbols.decode()}\"{' INTERLEAVE' if interleave else ''};\n".encode())
+
+        if features is not None:
+            f.write(b"    CHARSTATELABELS\n")
+            f.write(",\n".join(f"        {i} {nexus_name(feature)}"
+                               for i, feature in enumerate(features, start=1)).encode())
+            f.write(b"\n    ;\n")
+
+        f.write(b"    MATRIX\n")
+        for block, (start, end) in enumerate(_blocks(n_chars, interleave)):
+            if block:
+                f.write(b"\n")
+            for label, row in zip(labels, matrix):
+                f.write(f"        {label:<20} ".encode()
+                        + encode_block(row[start:end], symbols, missing) + b"\n")
+        f.write(b"    ;\nEND;")
+
+        if charsets and features is not None:
+            f.write(b"\n\nBEGIN SETS;\n")
+            for concept, ranges in concept_charsets(features).items():
+                f.write(f"    CHARSET {nexus_name(concept)} = {ranges};\n".encode())
+            f.write(b"END;")
+
+def write_phylip(target, taxa, matrix, interleave=0, symbols="01", missing="?"):
+    """Write relaxed PHYLIP (names padded to 10 characters, or longer)."""
+
+    matrix = np.asarray(matrix)
+    n_taxa, n_chars = matrix.shape
+    width = max(10, max(len(str(taxon)) for taxon in taxa) + 1)
+    symbols, missing = symbols.encode(), missing.encode()
+
+    with _open(target) as f:
+        f.write(f"{n_taxa} {n_chars}\n".encode())
+        for block, (start, end) in enumerate(_blocks(n_chars, interleave)):
+            if block:
+                f.write(b"\n")
+            for taxon, row in zip(taxa, matrix):
+                # Only the first block carries the taxon names
+                name = f"{taxon!s:<{width}}".encode() if block == 0 else b""
+                f.write(name + encode_block(row[start:end], symbols, missing) + b"\n")
+
+def write_fasta(target, taxa, matrix, line_width=0, symbols="01", missing="?"):
+    """Write FASTA, optionally wrapping sequences at line_width characters."""
+
+    matrix = np.asarray(matrix)
+    symbols, missing = symbols.encode(), missing.encode()
+
+    with _open(target) as f:
+        for taxon, row in zip(taxa, matrix):
+            f.write(f">{taxon}\n".encode())
+            for start, end in _blocks(len(row), line_width):
+                f.write(encode_block(row[start:end], symbols, missing) + b"\n")
+
+def write_alignment(target, taxa, matrix, features=None, interleave=0, charsets=False):
+    """Write an alignment in the format given by the target's extension."""
+
+    suffix = Path(target).suffix.lower()
+    if suffix in ('.nex', '.nexus'):
+        write_nexus(target, taxa, matrix, interleave, features, charsets)
+    elif suffix in ('.phy', '.phylip'):
+        write_phylip(target, taxa, matrix, interleave)
+    elif suffix in ('.fa', '.fas', '.fasta'):
+        write_fasta(target, taxa, matrix, interleave)
+    else:
+        raise ValueError(f"Unknown alignment format: {target}")
+
+def main(argv=None):
+    from cognate_matrix import load_matrix, unpack
+    from site_patterns import ASCERTAINMENT, site_patterns, to_matrix
+
+    parser = argparse.ArgumentParser(description="Write a binary cognate matrix as NEXUS, PHYLIP or FASTA.")
+    parser.add_argument("source", help="wide binary CSV or packed .npz")
+    parser.add_argument("target", help=".nex, .phy or .fasta output")
+    parser.add_argument("--interleave", type=int, default=0,
+                        help="block width (FASTA: line width); 0 = sequential")
+    parser.add_argument("--charsets", action="store_true",
+                        help="NEXUS: add CHARSTATELABELS and one CHARSET per concept")
+    parser.add_argument("--ascertainment", choices=ASCERTAINMENT,
+                        help="drop all-absent (or all constant) columns")
+    args = parser.parse_args(argv)
+
+    matrix = load_matrix(args.source)
+    if args.ascertainment:
+        matrix = to_matrix(site_patterns(matrix, args.ascertainment))
+    write_alignment(args.target, matrix['languages'], unpack(matrix, missing_value=-1),
+                    matrix['features'] if args.charsets else None,
+                    args.interleave, args.charsets)
+    print(f"✓ Created: {args.target}")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 # scripts/analyze_test_results.py
 """Analyze the test BEAST run results."""
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 
+from hpd import hpd
+from log_cache import load_log
+
 def analyze_test_run():
     """Quick analysis of test run."""
     
@@ -13,7 +15,7 @@ def analyze_test_run():
     log_file = "dravidian_beauti_full.log"
     
     print(f"Loading {log_file}...")
-    df = pd.read_csv(log_file, sep="\t", comment="#")
+    df = load_log(log_file)
     
     # Remove burnin (10%)
     burnin = int(len(df) * 0.1)
@@ -37,7 +39,8 @@ def analyze_test_run():
     if 'TreeHeight' in df.columns:
         print(f"\nProto-Dravidian Age Estimate:")
         print(f"  Mean: {df_post['TreeHeight'].mean():.3f} kya")
-        print(f"  95% HPD: [{df_post['TreeHeight'].quantile(0.025):.3f}, {df_post['TreeHeight'].quantile(0.975):.3f}]")
+        hpd_lower, hpd_upper = hpd(df_post['TreeHeight'].to_numpy(), 0.95)
+        print(f"  95% HPD: [{hpd_lower:.3f}, {hpd_upper:.3f}]")
     
     # Quick plots
     fig, axes = plt.subplots(2, 2, figsize=(12, 8))
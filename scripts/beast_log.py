@@ -0,0 +1,291 @@
+# scripts/beast_log.py
+"""
+Incremental BEAST trace log reader.
+
+LogFollower reads a (possibly still growing) tab-separated BEAST .log from
+a byte offset, parses only the complete rows written since the last poll and
+appends them to NumPy columns. Running means and variances (Welford) and a
+batch-means ESS are updated from the new rows only; quantiles are computed
+on demand. Follow a running chain until it has converged:
+
+    python scripts/beast_log.py results/sensitivity/loose/dravidian_loose_prior.log
+    python scripts/beast_log.py run.log --follow --min-ess 200 --columns posterior Tree.height
+"""
+
+import argparse
+import io
+import os
+import signal
+import time
+
+import numpy as np
+import pandas as pd
+
+# Batch-means ESS keeps between N_BATCHES and 2 * N_BATCHES batches
+N_BATCHES = 32
+
+class LogFollower:
+    """Tail-following reader of one BEAST trace log."""
+
+    def __init__(self, path, burnin=0):
+        """
+        burnin is the chain state (Sample value) below which rows are kept
+        but left out of the running statistics.
+        """
+
+        self.path = path
+        self.burnin = burnin
+        self.offset = 0
+        self.header = None
+        self.n = 0
+        self._partial = b""
+        self._data = np.empty((0, 0))
+
+        # Running statistics over rows at or after the burn-in state
+        self._first = None
+        self._count = 0
+        self._mean = None
+        self._m2 = None
+        self._batch_size = 1
+        self._batch_sums = None
+        self._n_batched = 0
+
+    # -- parsing ---------------------------------------------------------
+
+    def poll(self):
+        """Read rows appended since the last call; return how many."""
+
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+        if size < self.offset:
+            raise RuntimeError(f"{self.path} was truncated (restarted chain?)")
+        if size == self.offset:
+            return 0
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        self.offset = size
+
+        # Keep an unfinished last line for the next poll
+        chunk = self._partial + chunk
+        end = chunk.rfind(b'\n') + 1
+        chunk, self._partial = chunk[:end], chunk[end:]
+        if not chunk:
+            return 0
+
+        if self.header is None or chunk.startswith(b'#'):
+            chunk = self._strip_preamble(chunk)
+        rows = self._parse(chunk)
+        if len(rows):
+            self._append(rows)
+        return len(rows)
+
+    def _strip_preamble(self, chunk):
+        """Drop # comment lines and take the first other line as the header."""
+        start = 0
+        while start < len(chunk):
+            end = chunk.find(b'\n', start) + 1 or len(chunk)
+            line = chunk[start:end].strip()
+            if line.startswith(b'#') or (self.header is None and not line):
+                start = end
+                continue
+            if self.header is None:
+                self.header = line.decode().split('\t')
+                self._data = np.empty((1024, len(self.header)))
+                start = end
+            break
+        return chunk[start:]
+
+    def _parse(self, chunk):
+        """Parse complete tab-separated rows into a float array."""
+        if self.header is None or not chunk.strip():
+            return np.empty((0, len(self.header or ())))
+        # Same C parser (and rounding) as pd.read_csv on the whole file
+        rows = pd.read_csv(io.BytesIO(chunk), sep='\t', header=None, names=self.header,
+                           skip_blank_lines=True, on_bad_lines='skip', engine='c')
+        if not all(np.issubdtype(dtype, np.number) for dtype in rows.dtypes):
+            # Non-numeric cells become NaN
+            rows = rows.apply(pd.to_numeric, errors='coerce')
+        return rows.to_numpy(dtype=float)
+
+    def _append(self, rows):
+        """Append rows to the column store (amortised doubling)."""
+        needed = self.n + len(rows)
+        if needed > len(self._data):
+            grown = np.empty((max(needed, 2 * len(self._data)), self._data.shape[1]))
+            grown[:self.n] = self._data[:self.n]
+            self._data = grown
+        self._data[self.n:needed] = rows
+        self.n = needed
+        self._update(rows)
+
+    # -- running statistics ----------------------------------------------
+
+    def _update(self, rows):
+        """Fold new rows into the running mean/variance and batch sums."""
+
+        if self.header[0] == 'Sample':
+            rows = rows[rows[:, 0] >= self.burnin]
+        if not len(rows):
+            return
+        if self._first is None:
+            self._first = self.n - len(rows)
+            width = rows.shape[1]
+            self._mean, self._m2 = np.zeros(width), np.zeros(width)
+            self._batch_sums = np.empty((0, width))
+
+        # Chan et al. parallel update of Welford's mean and M2
+        k = len(rows)
+        mean = rows.mean(axis=0)
+        m2 = ((rows - mean) ** 2).sum(axis=0)
+        total = self._count + k
+        delta = mean - self._mean
+        self._mean = self._mean + delta * k / total
+        self._m2 = self._m2 + m2 + delta ** 2 * self._count * k / total
+        self._count = total
+
+        # Sum every newly completed batch, then halve the batch count by
+        # merging neighbours whenever it exceeds 2 * N_BATCHES
+        values = self._data[self._first:self.n]
+        complete = (len(values) // self._batch_size) * self._batch_size
+        if complete > self._n_batched:
+            new = values[self._n_batched:complete]
+            sums = new.reshape(-1, self._batch_size, new.shape[1]).sum(axis=1)
+            self._batch_sums = np.vstack([self._batch_sums, sums])
+            self._n_batched = complete
+        while len(self._batch_sums) >= 2 * N_BATCHES:
+            pairs = len(self._batch_sums) // 2
+            self._batch_sums = self._batch_sums[:2 * pairs].reshape(pairs, 2, -1).sum(axis=1)
+            self._batch_size *= 2
+            self._n_batched = pairs * self._batch_size
+            # Fold in the rows that now complete a (larger) batch
+            complete = (len(values) // self._batch_size) * self._batch_size
+            if complete > self._n_batched:
+                new = values[self._n_batched:complete]
+                sums = new.reshape(-1, self._batch_size, new.shape[1]).sum(axis=1)
+                self._batch_sums = np.vstack([self._batch_sums, sums])
+                self._n_batched = complete
+
+    @property
+    def columns(self):
+        """Column name -> array view of all rows read so far."""
+        return {name: self._data[:self.n, i] for i, name in enumerate(self.header or ())}
+
+    def values(self, burnin=True):
+        """Rows as an array, without the burn-in rows by default."""
+        start = (self._first if self._first is not None else self.n) if burnin else 0
+        return self._data[start:self.n]
+
+    def frame(self, burnin=False):
+        """The rows read so far as a DataFrame (Sample as integers)."""
+        df = pd.DataFrame(self.values(burnin), columns=self.header)
+        if 'Sample' in df.columns:
+            df['Sample'] = df['Sample'].astype(np.int64)
+        return df
+
+    # Before any row has passed the burn-in, every statistic is NaN
+
+    def mean(self):
+        if not self._count:
+            return pd.Series(np.nan, index=self.header)
+        return pd.Series(self._mean, index=self.header)
+
+    def std(self):
+        if not self._count:
+            return pd.Series(np.nan, index=self.header)
+        return pd.Series(np.sqrt(self._m2 / max(self._count - 1, 1)), index=self.header)
+
+    def quantiles(self, q=(0.025, 0.5, 0.975)):
+        """Quantiles of each column after burn-in (computed on demand)."""
+        values = self.values()
+        if not len(values):
+            return pd.DataFrame(np.nan, index=list(q), columns=self.header)
+        return pd.DataFrame(np.quantile(values, q, axis=0),
+                            index=list(q), columns=self.header)
+
+    def ess(self):
+        """
+        Batch-means effective sample size of each column.
+
+        ESS = n * var / (b * var of batch means); constant columns get NaN.
+        """
+
+        if self._batch_sums is None or len(self._batch_sums) < 2:
+            return pd.Series(np.nan, index=self.header)
+        batch_means = self._batch_sums / self._batch_size
+        batch_var = batch_means.var(axis=0, ddof=1)
+        var = self._m2 / max(self._count - 1, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ess = np.where(batch_var > 0, self._count * var / (self._batch_size * batch_var), np.nan)
+        return pd.Series(np.minimum(ess, self._count), index=self.header)
+
+    def summary(self, columns=None):
+        """Mean, sd, 95% interval and ESS of the given (default: all) columns."""
+        quantiles = self.quantiles()
+        table = pd.DataFrame({
+            'mean': self.mean(),
+            'std': self.std(),
+            'lower': quantiles.loc[0.025],
+            'median': quantiles.loc[0.5],
+            'upper': quantiles.loc[0.975],
+            'ess': self.ess(),
+        }).drop(index=['Sample'], errors='ignore')
+        return table.loc[columns] if columns else table
+
+def read_log(path, columns=None):
+    """Read a finished BEAST log into a DataFrame (one pass)."""
+    follower = LogFollower(path)
+    follower.poll()
+    df = follower.frame()
+    return df[columns] if columns else df
+
+def follow(path, columns=None, min_ess=200, burnin=0, interval=10.0, stop_pid=None):
+    """
+    Poll a growing log and print a summary line after each batch of rows.
+
+    Returns the follower once every selected column reaches min_ess (and
+    sends SIGTERM to stop_pid, e.g. the BEAST process, if given).
+    """
+
+    follower = LogFollower(path, burnin)
+    while True:
+        # Summarise once at least two rows are past the burn-in
+        if follower.poll() and len(follower.values()) > 1:
+            summary = follower.summary(columns)
+            state = int(follower.columns['Sample'][-1]) if 'Sample' in follower.header else follower.n
+            parts = [f"{name}={row['mean']:.4g} (ESS {row['ess']:.0f})" for name, row in summary.iterrows()]
+            print(f"  state {state:>10}: " + ", ".join(parts), flush=True)
+
+            if (summary['ess'] >= min_ess).all():
+                print(f"✓ All ESS ≥ {min_ess} after {follower.n} samples")
+                if stop_pid:
+                    os.kill(stop_pid, signal.SIGTERM)
+                return follower
+        time.sleep(interval)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise or follow a BEAST trace log.")
+    parser.add_argument("log", help="BEAST .log file")
+    parser.add_argument("--columns", nargs="+", help="columns to report (default: all)")
+    parser.add_argument("--burnin", type=int, default=0, help="burn-in in chain states")
+    parser.add_argument("--follow", action="store_true", help="keep reading as the chain runs")
+    parser.add_argument("--min-ess", type=float, default=200, help="--follow: stop at this ESS")
+    parser.add_argument("--interval", type=float, default=10.0, help="--follow: seconds between polls")
+    parser.add_argument("--stop-pid", type=int, help="--follow: SIGTERM this process on convergence")
+    args = parser.parse_args(argv)
+
+    if args.follow:
+        follower = follow(args.log, args.columns, args.min_ess, args.burnin,
+                          args.interval, args.stop_pid)
+    else:
+        follower = LogFollower(args.log, args.burnin)
+        follower.poll()
+
+    print(f"\n{args.log}: {follower.n} samples")
+    print(follower.summary(args.columns).to_string(float_format=lambda x: f"{x:.4g}"))
+
+if __name__ == "__main__":
+    main()
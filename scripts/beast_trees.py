@@ -0,0 +1,301 @@
+# scripts/beast_trees.py
+"""
+Streaming reader for BEAST posterior .trees files.
+
+Trees are parsed one line at a time (TRANSLATE block and [&rate=...]
+node metadata included) into flat arrays instead of node objects. A tree
+with n taxa has 2n - 1 nodes: tips 0..n-1 in TRANSLATE order, then the
+internal nodes in post-order, so the root is always the last node and
+every child comes before its parent. A set of trees is stored as stacked
+arrays:
+
+    parent    trees x nodes   int16 (root: -1)
+    length    trees x nodes   float64 branch lengths
+    height    trees x nodes   float64 node heights (youngest tip = 0)
+    meta      name -> trees x nodes float64 (NaN where missing)
+
+Clades are bitsets over taxa packed into uint64 words (clade_masks);
+clade_ages gives the MRCA age of any set of clades in every tree.
+
+    python scripts/beast_trees.py results/final/posterior.trees --burnin 0.1
+"""
+
+import argparse
+import re
+
+import numpy as np
+
+TOKEN = re.compile(r"""
+      (?P<open>\()
+    | (?P<close>\))
+    | (?P<comma>,)
+    | \[&(?P<meta>[^\]]*)\]
+    | \[[^\]]*\]                     # plain comments
+    | :(?P<length>[^,()\[;]+)
+    | (?P<label>'[^']*'|[^\s(),:;\[]+)
+""", re.VERBOSE)
+
+META_ITEM = re.compile(r"([^=,{}]+)=(\{[^}]*\}|[^,]*)")
+
+def parse_metadata(text):
+    """Numeric [&key=value,...] entries (sets like {a,b} are skipped)."""
+    values = {}
+    for key, value in META_ITEM.findall(text):
+        try:
+            values[key.strip()] = float(value)
+        except ValueError:
+            pass
+    return values
+
+def parse_newick(newick, taxon_index):
+    """
+    Parse one Newick string into (parent, length, meta) arrays.
+
+    taxon_index maps tip labels (TRANSLATE numbers or names) to tip
+    numbers 0..n-1; internal nodes are numbered n, n+1, ... as they close.
+    """
+
+    n_tips = len(set(taxon_index.values()))
+    n_nodes = 2 * n_tips - 1
+    parent = np.full(n_nodes, -1, dtype=np.int16)
+    length = np.zeros(n_nodes)
+    meta = {}
+
+    stack = [[]]          # children of each open clade
+    next_internal = n_tips
+    last = None           # node that the next label/length/metadata belongs to
+
+    for match in TOKEN.finditer(newick):
+        kind = match.lastgroup
+        if kind == 'open':
+            stack.append([])
+            last = None
+        elif kind == 'close':
+            node = next_internal
+            next_internal += 1
+            for child in stack.pop():
+                parent[child] = node
+            stack[-1].append(node)
+            last = node
+        elif kind == 'label':
+            if last is None:
+                label = match.group('label').strip("'")
+                last = taxon_index[label]
+                stack[-1].append(last)
+            # labels of internal nodes are ignored
+        elif kind == 'length':
+            length[last] = float(match.group('length'))
+        elif kind == 'meta' and last is not None:
+            for key, value in parse_metadata(match.group('meta')).items():
+                meta.setdefault(key, np.full(n_nodes, np.nan))[last] = value
+        elif kind == 'comma':
+            last = None
+
+    if next_internal != n_nodes:
+        raise ValueError(f"Tree is not binary ({next_internal - n_tips} internal nodes "
+                         f"for {n_tips} taxa)")
+    return parent, length, meta
+
+def _read_header(f):
+    """Read up to the first tree line; return (taxa, translate, first tree line)."""
+    taxa, translate = [], {}
+    block = None
+    for line in f:
+        stripped = line.strip()
+        lower = stripped.lower()
+        if lower.startswith('tree '):
+            return taxa, translate, line
+        if lower.startswith('taxlabels'):
+            block = 'taxlabels'
+            stripped = stripped[len('taxlabels'):]
+        elif lower.startswith('translate'):
+            block = 'translate'
+            stripped = stripped[len('translate'):]
+
+        if block == 'taxlabels':
+            taxa.extend(label.strip("'") for label in stripped.rstrip(';').split())
+        elif block == 'translate':
+            for entry in stripped.rstrip(';').split(','):
+                parts = entry.split()
+                if len(parts) == 2:
+                    translate[parts[0]] = parts[1].strip("'")
+        if stripped.endswith(';'):
+            block = None
+    return taxa, translate, None
+
+def _tree_line(line):
+    """'tree STATE_1000 = [&R] (...)' -> (1000, '(...)')."""
+    name, _, newick = line.partition('=')
+    state = name.split()[-1]
+    digits = re.search(r"(\d+)$", state)
+    return int(digits.group(1)) if digits else -1, newick.strip()
+
+def count_trees(path):
+    """Number of trees in a file (a raw line scan, no parsing)."""
+    with open(path) as f:
+        return sum(1 for line in f if line.lstrip()[:5].lower() == 'tree ')
+
+def iter_trees(path, skip=0, thin=1):
+    """
+    Yield (state, parent, length, meta) for each tree, one line at a time.
+
+    The first `skip` trees are passed over without parsing; after that
+    every `thin`-th tree is parsed.
+    """
+
+    with open(path) as f:
+        taxa, translate, line = _read_header(f)
+        names = list(translate.values()) if translate else taxa
+        taxon_index = {name: i for i, name in enumerate(names)}
+        taxon_index.update({key: taxon_index[name] for key, name in translate.items()})
+
+        index = 0
+        while line is not None:
+            if line.lstrip()[:5].lower() == 'tree ':
+                if index >= skip and (index - skip) % thin == 0:
+                    state, newick = _tree_line(line)
+                    yield (state, *parse_newick(newick, taxon_index))
+                index += 1
+            elif line.strip().lower().startswith('end;'):
+                break
+            line = next(f, None)
+
+def read_taxa(path):
+    """Taxon names in tip order."""
+    with open(path) as f:
+        taxa, translate, _ = _read_header(f)
+    return list(translate.values()) if translate else taxa
+
+def node_heights(parent, length, n_tips):
+    """
+    Node heights of stacked trees (trees x nodes), youngest tip at 0.
+
+    Depths are accumulated root-to-tip: nodes are visited from the root
+    (last) down, each adding its branch to its parent's depth.
+    """
+
+    parent = np.atleast_2d(parent)
+    length = np.atleast_2d(length)
+    n_trees, n_nodes = parent.shape
+    rows = np.arange(n_trees)
+    depth = np.zeros((n_trees, n_nodes))
+    for node in range(n_nodes - 2, -1, -1):
+        depth[:, node] = depth[rows, parent[:, node]] + length[:, node]
+    return depth[:, :n_tips].max(axis=1, keepdims=True) - depth
+
+def read_trees(path, burnin=0.0, thin=1):
+    """
+    Read a .trees file into stacked arrays.
+
+    burnin is a fraction of the trees (< 1) or a number of trees to drop.
+    Returns a dict with taxa, states, parent, length, height and meta.
+    """
+
+    taxa = read_taxa(path)
+    skip = int(count_trees(path) * burnin) if burnin < 1 else int(burnin)
+
+    states, parents, lengths, metas = [], [], [], []
+    for state, parent, length, meta in iter_trees(path, skip, thin):
+        states.append(state)
+        parents.append(parent)
+        lengths.append(length)
+        metas.append(meta)
+
+    n_nodes = 2 * len(taxa) - 1
+    parent = np.array(parents, dtype=np.int16).reshape(-1, n_nodes)
+    length = np.array(lengths).reshape(-1, n_nodes)
+
+    # One column per metadata key, NaN where a tree lacks it
+    meta = {}
+    for key in sorted({key for m in metas for key in m}):
+        meta[key] = np.array([m.get(key, np.full(n_nodes, np.nan)) for m in metas])
+
+    return {
+        'taxa': np.asarray(taxa, dtype=str),
+        'states': np.array(states, dtype=np.int64),
+        'parent': parent,
+        'length': length,
+        'height': node_heights(parent, length, len(taxa)),
+        'meta': meta,
+    }
+
+def n_words(n_taxa):
+    return (n_taxa + 63) // 64
+
+def taxa_mask(clade, taxa):
+    """Bitset (uint64 words) of a clade given as taxon names."""
+    taxa = list(taxa)
+    mask = np.zeros(n_words(len(taxa)), dtype=np.uint64)
+    for name in clade:
+        i = taxa.index(name)
+        mask[i // 64] |= np.uint64(1) << np.uint64(i % 64)
+    return mask
+
+def clade_masks(trees):
+    """
+    Taxon bitset of every node of every tree: trees x nodes x words uint64.
+
+    Children precede parents, so one pass over the node index ORs each
+    node's set into its parent across all trees at once.
+    """
+
+    parent = trees['parent']
+    n_trees, n_nodes = parent.shape
+    n_tips = len(trees['taxa'])
+    masks = np.zeros((n_trees, n_nodes, n_words(n_tips)), dtype=np.uint64)
+
+    tips = np.arange(n_tips)
+    masks[:, tips, tips // 64] = np.uint64(1) << (tips % 64).astype(np.uint64)
+
+    rows = np.arange(n_trees)
+    for node in range(n_nodes - 1):
+        masks[rows, parent[:, node]] |= masks[:, node]
+    return masks
+
+def clade_ages(trees, clades, masks=None):
+    """
+    MRCA height of each clade in every tree.
+
+    clades maps a name (or is a list) of taxon-name lists. The MRCA is the
+    lowest node whose bitset contains the whole clade. Returns (ages,
+    monophyletic): trees x clades arrays of heights and of whether the
+    MRCA holds exactly the clade's taxa.
+    """
+
+    definitions = list(clades.values()) if isinstance(clades, dict) else list(clades)
+    if masks is None:
+        masks = clade_masks(trees)
+
+    n_trees = len(masks)
+    ages = np.empty((n_trees, len(definitions)))
+    monophyletic = np.empty((n_trees, len(definitions)), dtype=bool)
+    for j, clade in enumerate(definitions):
+        target = taxa_mask(clade, trees['taxa'])
+        contains = ((masks & target) == target).all(axis=-1)
+        node = np.where(contains, trees['height'], np.inf).argmin(axis=1)
+        ages[:, j] = trees['height'][np.arange(n_trees), node]
+        monophyletic[:, j] = (masks[np.arange(n_trees), node] == target).all(axis=-1)
+    return ages, monophyletic
+
+def nbytes(trees):
+    """Memory held by the arrays of a tree set."""
+    return sum(value.nbytes for key, value in trees.items() if isinstance(value, np.ndarray)) \
+        + sum(value.nbytes for value in trees['meta'].values())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read a BEAST .trees file into arrays.")
+    parser.add_argument("trees", help="BEAST posterior .trees file")
+    parser.add_argument("--burnin", type=float, default=0.1, help="fraction (or number) of trees")
+    parser.add_argument("--thin", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    trees = read_trees(args.trees, args.burnin, args.thin)
+    root = trees['height'][:, -1]
+    print(f"✓ {len(trees['states'])} trees, {len(trees['taxa'])} taxa "
+          f"({nbytes(trees) / 1e6:.1f} MB)")
+    print(f"  Root height: mean {root.mean():.3f}, median {np.median(root):.3f}")
+    for key, values in trees['meta'].items():
+        print(f"  {key}: mean {np.nanmean(values):.4g}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,637 @@
+# scripts/beast_xml.py
+"""
+Generate BEAST 2.7 XML for the Dravidian dating analysis.
+
+Builds the same XML BEAUti wrote for results/xml/dravidian_*_prior.xml from
+the binary matrix, the tip dates, the clock, the tree prior and the
+calibrations, and can write a whole grid of variants in one call:
+
+    # The root priors of the three shipped sensitivity XMLs (loose, medium,
+    # tight), written as dravidian_4lang_root_sigma1.5.xml, ...
+    python scripts/beast_xml.py --grid root_sigma=1.5,1.0,0.5 -o results/xml
+
+    # A 50-point root-prior sweep
+    python scripts/beast_xml.py --grid root_sigma=0.25:2.5:50 -o results/xml/sweep
+
+    # Model settings from the BEASTling configuration (the root prior stays
+    # the default Normal(4.5, 1.5) unless --root-prior is given)
+    python scripts/beast_xml.py --config config/dravidian.conf -o results/xml
+"""
+
+import argparse
+import configparser
+import itertools
+import re
+from pathlib import Path
+
+import numpy as np
+
+from cognate_matrix import load_matrix, to_beast_sequences
+from site_patterns import site_patterns, to_matrix
+
+# The shipped analysis (results/xml/dravidian_loose_prior.xml)
+DEFAULT_SETTINGS = {
+    'name': 'dravidian_4lang',
+    'data': 'data/processed/dravidian_beastling.csv',
+    # Linguistic divergence dates (kya), not attestation dates
+    'tip_dates': {'Kannada': 2.75, 'Malayalam': 1.195, 'Tamil': 3.5, 'Telugu': 3.25},
+    'root_mean': 4.5,
+    'root_sigma': 1.5,
+    'calibrations': [],
+    'substitution': 'mutationdeath',
+    'death_prob': 0.1,
+    'gamma_categories': 0,
+    'remove_constant': False,
+    'clock': 'relaxed',
+    'tree_prior': 'yule',
+    'chain_length': 10_000_000,
+    'store_every': 5000,
+    'log_every': 1000,
+    'sample_from_prior': False,
+}
+
+SUBSTITUTION_MODELS = ('mutationdeath', 'covarion', 'ctmc')
+CLOCKS = ('relaxed', 'strict')
+TREE_PRIORS = ('yule', 'birthdeath')
+
+HEADER = """<?xml version="1.0" encoding="UTF-8" standalone="no"?><beast beautitemplate='Standard' beautistatus='' namespace="beast.core:beast.evolution.alignment:beast.evolution.tree.coalescent:beast.core.util:beast.evolution.nuc:beast.evolution.operators:beast.evolution.sitemodel:beast.evolution.substitutionmodel:beast.base.evolution.alignment:beast.pkgmgmt:beast.base.core:beast.base.inference:beast.base.evolution.tree.coalescent:beast.pkgmgmt:beast.base.core:beast.base.inference.util:beast.evolution.nuc:beast.base.evolution.operator:beast.base.inference.operator:beast.base.evolution.sitemodel:beast.base.evolution.substitutionmodel:beast.base.evolution.likelihood" required="BEAST.base v2.7.8" version="2.7">
+
+    <data
+id="{name}"
+spec="Alignment"
+dataType="{data_type}"
+name="alignment">
+{sequences}{user_data_type}
+    </data>
+
+    <map name="Uniform" >beast.base.inference.distribution.Uniform</map>
+
+    <map name="Exponential" >beast.base.inference.distribution.Exponential</map>
+
+    <map name="LogNormal" >beast.base.inference.distribution.LogNormalDistributionModel</map>
+
+    <map name="Normal" >beast.base.inference.distribution.Normal</map>
+
+    <map name="Beta" >beast.base.inference.distribution.Beta</map>
+
+    <map name="Gamma" >beast.base.inference.distribution.Gamma</map>
+
+    <map name="LaplaceDistribution" >beast.base.inference.distribution.LaplaceDistribution</map>
+
+    <map name="prior" >beast.base.inference.distribution.Prior</map>
+
+    <map name="InverseGamma" >beast.base.inference.distribution.InverseGamma</map>
+
+    <map name="OneOnX" >beast.base.inference.distribution.OneOnX</map>
+
+"""
+
+RUN = """    <run id="mcmc" spec="{run_spec}" chainLength="{chain_length}"{run_attributes}>
+        <state id="state" spec="State" storeEvery="{store_every}">
+            <tree id="Tree.t:{name}" spec="beast.base.evolution.tree.Tree" name="stateNode">
+                <trait id="dateTrait.t:{name}" spec="beast.base.evolution.tree.TraitSet" traitname="date">
+{tip_dates}
+                    <taxa id="TaxonSet.{name}" spec="TaxonSet">
+                        <alignment idref="{name}"/>
+                    </taxa>
+                </trait>
+                <taxonset idref="TaxonSet.{name}"/>
+            </tree>
+{state}        </state>
+        <init id="RandomTree.t:{name}" spec="RandomTree" estimate="false" initial="@Tree.t:{name}" taxa="@{name}">
+            <populationModel id="ConstantPopulation0.t:{name}" spec="ConstantPopulation">
+                <parameter id="randomPopSize.t:{name}" spec="parameter.RealParameter" name="popSize">1.0</parameter>
+            </populationModel>
+        </init>
+        <distribution id="posterior" spec="CompoundDistribution">
+            <distribution id="prior" spec="CompoundDistribution">
+{priors}            </distribution>
+            <distribution id="likelihood" spec="CompoundDistribution" useThreads="true">
+                <distribution id="treeLikelihood.{name}" spec="ThreadedTreeLikelihood" data="@{name}" tree="@Tree.t:{name}">
+                    <siteModel id="SiteModel.s:{name}" spec="SiteModel"{site_attributes}>
+                        <parameter id="mutationRate.s:{name}" spec="parameter.RealParameter" estimate="false" lower="0.0" name="mutationRate">1.0</parameter>
+{gamma_shape}                        <parameter id="proportionInvariant.s:{name}" spec="parameter.RealParameter" estimate="false" lower="0.0" name="proportionInvariant" upper="1.0">0.0</parameter>
+{substitution_model}                    </siteModel>
+{branch_rate_model}                </distribution>
+            </distribution>
+        </distribution>
+{operators}        <logger id="tracelog" spec="Logger" fileName="$(filebase).log" logEvery="{log_every}" model="@posterior" sanitiseHeaders="true" sort="smart">
+            <log idref="posterior"/>
+            <log idref="likelihood"/>
+            <log idref="prior"/>
+            <log idref="treeLikelihood.{name}"/>
+            <log id="TreeHeight.t:{name}" spec="beast.base.evolution.tree.TreeStatLogger" tree="@Tree.t:{name}"/>
+{logs}        </logger>
+        <logger id="screenlog" spec="Logger" logEvery="{log_every}">
+            <log idref="posterior"/>
+            <log idref="likelihood"/>
+            <log idref="prior"/>
+        </logger>
+        <logger id="treelog.t:{name}" spec="Logger" fileName="$(filebase)-$(tree).trees" logEvery="{log_every}" mode="tree">
+            <log id="TreeWithMetaDataLogger.t:{name}" spec="beast.base.evolution.TreeWithMetaDataLogger" branchratemodel="@{clock_id}" tree="@Tree.t:{name}"/>
+        </logger>
+        <operatorschedule id="OperatorSchedule" spec="OperatorSchedule"/>
+    </run>
+
+</beast>
+"""
+
+# Per-component blocks: state nodes, priors, model elements, operators, logs
+CLOCK_BLOCKS = {
+    'relaxed': {
+        'id': 'RelaxedClock.c:{name}',
+        'state': """            <parameter id="ucldMean.c:{name}" spec="parameter.RealParameter" lower="0.0" name="stateNode">1.0</parameter>
+            <parameter id="ucldStdev.c:{name}" spec="parameter.RealParameter" lower="0.0" name="stateNode">0.1</parameter>
+            <stateNode id="rateCategories.c:{name}" spec="parameter.IntegerParameter" dimension="{n_branches}">1</stateNode>
+""",
+        'priors': """                <prior id="MeanRatePrior.c:{name}" name="distribution" x="@ucldMean.c:{name}">
+                    <Gamma id="Gamma.1" name="distr">
+                        <parameter id="RealParameter.5" spec="parameter.RealParameter" estimate="false" name="alpha">0.01</parameter>
+                        <parameter id="RealParameter.6" spec="parameter.RealParameter" estimate="false" name="beta">100.0</parameter>
+                    </Gamma>
+                </prior>
+                <prior id="ucldStdevPrior.c:{name}" name="distribution" x="@ucldStdev.c:{name}">
+                    <Gamma id="Gamma.0" name="distr">
+                        <parameter id="RealParameter.3" spec="parameter.RealParameter" estimate="false" name="alpha">0.5396</parameter>
+                        <parameter id="RealParameter.4" spec="parameter.RealParameter" estimate="false" name="beta">0.3819</parameter>
+                    </Gamma>
+                </prior>
+""",
+        'model': """                    <branchRateModel id="RelaxedClock.c:{name}" spec="beast.base.evolution.branchratemodel.UCRelaxedClockModel" clock.rate="@ucldMean.c:{name}" rateCategories="@rateCategories.c:{name}" tree="@Tree.t:{name}">
+                        <LogNormal id="LogNormalDistributionModel.c:{name}" S="@ucldStdev.c:{name}" meanInRealSpace="true" name="distr">
+                            <parameter id="RealParameter.2" spec="parameter.RealParameter" estimate="false" lower="0.0" name="M" upper="1.0">1.0</parameter>
+                        </LogNormal>
+                    </branchRateModel>
+""",
+        'operators': """        <operator id="ucldMeanScaler.c:{name}" spec="ScaleOperator" parameter="@ucldMean.c:{name}" scaleFactor="0.5" weight="1.0"/>
+        <operator id="ucldStdevScaler.c:{name}" spec="ScaleOperator" parameter="@ucldStdev.c:{name}" scaleFactor="0.5" weight="3.0"/>
+        <operator id="CategoriesRandomWalk.c:{name}" spec="operator.IntRandomWalkOperator" parameter="@rateCategories.c:{name}" weight="10.0" windowSize="1"/>
+        <operator id="CategoriesSwapOperator.c:{name}" spec="operator.SwapOperator" intparameter="@rateCategories.c:{name}" weight="10.0"/>
+        <operator id="CategoriesUniform.c:{name}" spec="operator.UniformOperator" parameter="@rateCategories.c:{name}" weight="10.0"/>
+        <operator id="relaxedUpDownOperator.c:{name}" spec="operator.UpDownOperator" scaleFactor="0.75" weight="3.0">
+            <up idref="ucldMean.c:{name}"/>
+            <down idref="Tree.t:{name}"/>
+        </operator>
+""",
+        'logs': """            <log idref="ucldMean.c:{name}"/>
+            <log idref="ucldStdev.c:{name}"/>
+            <log id="rate.c:{name}" spec="beast.base.evolution.RateStatistic" branchratemodel="@RelaxedClock.c:{name}" tree="@Tree.t:{name}"/>
+""",
+    },
+    'strict': {
+        'id': 'StrictClock.c:{name}',
+        'state': """            <parameter id="clockRate.c:{name}" spec="parameter.RealParameter" lower="0.0" name="stateNode">1.0</parameter>
+""",
+        'priors': """                <prior id="ClockPrior.c:{name}" name="distribution" x="@clockRate.c:{name}">
+                    <Gamma id="Gamma.1" name="distr">
+                        <parameter id="RealParameter.5" spec="parameter.RealParameter" estimate="false" name="alpha">0.01</parameter>
+                        <parameter id="RealParameter.6" spec="parameter.RealParameter" estimate="false" name="beta">100.0</parameter>
+                    </Gamma>
+                </prior>
+""",
+        'model': """                    <branchRateModel id="StrictClock.c:{name}" spec="beast.base.evolution.branchratemodel.StrictClockModel" clock.rate="@clockRate.c:{name}"/>
+""",
+        'operators': """        <operator id="StrictClockRateScaler.c:{name}" spec="ScaleOperator" parameter="@clockRate.c:{name}" scaleFactor="0.75" weight="3.0"/>
+        <operator id="strictClockUpDownOperator.c:{name}" spec="operator.UpDownOperator" scaleFactor="0.75" weight="3.0">
+            <up idref="clockRate.c:{name}"/>
+            <down idref="Tree.t:{name}"/>
+        </operator>
+""",
+        'logs': """            <log idref="clockRate.c:{name}"/>
+""",
+    },
+}
+
+TREE_OPERATORS = """        <operator id="{prefix}TreeRootScaler.t:{name}" spec="kernel.BactrianScaleOperator" rootOnly="true" scaleFactor="0.5" tree="@Tree.t:{name}" upper="10.0" weight="3.0"/>
+        <operator id="{prefix}UniformOperator.t:{name}" spec="kernel.BactrianNodeOperator" tree="@Tree.t:{name}" weight="30.0"/>
+        <operator id="{prefix}SubtreeSlide.t:{name}" spec="kernel.BactrianSubtreeSlide" tree="@Tree.t:{name}" weight="15.0"/>
+        <operator id="{prefix}Narrow.t:{name}" spec="Exchange" tree="@Tree.t:{name}" weight="15.0"/>
+        <operator id="{prefix}Wide.t:{name}" spec="Exchange" isNarrow="false" tree="@Tree.t:{name}" weight="3.0"/>
+        <operator id="{prefix}WilsonBalding.t:{name}" spec="WilsonBalding" tree="@Tree.t:{name}" weight="3.0"/>
+        <operator id="{prefix}BICEPSEpochTop.t:{name}" spec="EpochFlexOperator" scaleFactor="0.1" tree="@Tree.t:{name}" weight="2.0"/>
+        <operator id="{prefix}BICEPSEpochAll.t:{name}" spec="EpochFlexOperator" fromOldestTipOnly="false" scaleFactor="0.1" tree="@Tree.t:{name}" weight="2.0"/>
+        <operator id="{prefix}BICEPSTreeFlex.t:{name}" spec="TreeStretchOperator" scaleFactor="0.01" tree="@Tree.t:{name}" weight="2.0"/>
+"""
+
+TREE_PRIOR_BLOCKS = {
+    'yule': {
+        'prefix': 'YuleModel',
+        'state': """            <parameter id="birthRate.t:{name}" spec="parameter.RealParameter" lower="0.0" name="stateNode">1.0</parameter>
+""",
+        'priors': """                <distribution id="YuleModel.t:{name}" spec="beast.base.evolution.speciation.YuleModel" birthDiffRate="@birthRate.t:{name}" tree="@Tree.t:{name}"/>
+                <prior id="YuleBirthRatePrior.t:{name}" name="distribution" x="@birthRate.t:{name}">
+                    <Uniform id="Uniform.1" name="distr" upper="Infinity"/>
+                </prior>
+""",
+        'operators': """        <operator id="YuleBirthRateScaler.t:{name}" spec="kernel.BactrianScaleOperator" parameter="@birthRate.t:{name}" upper="10.0" weight="3.0"/>
+""",
+        'logs': """            <log idref="YuleModel.t:{name}"/>
+            <log idref="birthRate.t:{name}"/>
+""",
+    },
+    'birthdeath': {
+        'prefix': 'BirthDeath',
+        'state': """            <parameter id="BDBirthRate.t:{name}" spec="parameter.RealParameter" lower="0.0" name="stateNode" upper="10000.0">1.0</parameter>
+            <parameter id="BDDeathRate.t:{name}" spec="parameter.RealParameter" lower="0.0" name="stateNode" upper="1.0">0.5</parameter>
+""",
+        'priors': """                <distribution id="BirthDeath.t:{name}" spec="beast.base.evolution.speciation.BirthDeathGernhard08Model" birthDiffRate="@BDBirthRate.t:{name}" relativeDeathRate="@BDDeathRate.t:{name}" tree="@Tree.t:{name}"/>
+                <prior id="BirthRatePrior.t:{name}" name="distribution" x="@BDBirthRate.t:{name}">
+                    <Uniform id="Uniform.BDBirthRate" name="distr" upper="1000.0"/>
+                </prior>
+                <prior id="DeathRatePrior.t:{name}" name="distribution" x="@BDDeathRate.t:{name}">
+                    <Uniform id="Uniform.BDDeathRate" name="distr"/>
+                </prior>
+""",
+        'operators': """        <operator id="BirthRateScaler.t:{name}" spec="kernel.BactrianScaleOperator" parameter="@BDBirthRate.t:{name}" upper="10.0" weight="3.0"/>
+        <operator id="DeathRateScaler.t:{name}" spec="kernel.BactrianScaleOperator" parameter="@BDDeathRate.t:{name}" upper="10.0" weight="3.0"/>
+""",
+        'logs': """            <log idref="BirthDeath.t:{name}"/>
+            <log idref="BDBirthRate.t:{name}"/>
+            <log idref="BDDeathRate.t:{name}"/>
+""",
+    },
+}
+
+SUBSTITUTION_BLOCKS = {
+    'mutationdeath': {
+        'data_type': 'standard',
+        'user_data_type': '        <userDataType id="StandardData.0" spec="beast.base.evolution.datatype.StandardData" ambiguities="" nrOfStates="2"/>',
+        'state': "",
+        'priors': "",
+        'model': """                        <substModel id="MutationDeathModel.s:{name}" spec="MutationDeathModel">
+                            <parameter id="deathprob.s:{name}" spec="parameter.RealParameter" estimate="false" lower="0.0" name="deathprob">{death_prob}</parameter>
+                            <frequencies id="freqs.s:{name}" spec="Frequencies">
+                                <parameter id="RealParameter.1" spec="parameter.RealParameter" dimension="2" lower="0.0" name="frequencies">1.0 0.0</parameter>
+                            </frequencies>
+                        </substModel>
+""",
+        'operators': "",
+        'logs': "",
+    },
+    'covarion': {
+        'data_type': 'twoStateCovarion',
+        'user_data_type': '        <userDataType id="TwoStateCovarion.0" spec="beast.base.evolution.datatype.TwoStateCovarion"/>',
+        'state': """            <parameter id="bcov_alpha.s:{name}" spec="parameter.RealParameter" lower="1.0E-4" name="stateNode" upper="1.0">0.5</parameter>
+            <parameter id="bcov_s.s:{name}" spec="parameter.RealParameter" lower="1.0E-4" name="stateNode" upper="Infinity">0.5</parameter>
+            <parameter id="frequencies.s:{name}" spec="parameter.RealParameter" dimension="2" lower="0.0" name="stateNode" upper="1.0">0.5 0.5</parameter>
+""",
+        'priors': """                <prior id="bcov_alpha_prior.s:{name}" name="distribution" x="@bcov_alpha.s:{name}">
+                    <Uniform id="Uniform.bcov_alpha" name="distr" upper="Infinity"/>
+                </prior>
+                <prior id="bcov_s_prior.s:{name}" name="distribution" x="@bcov_s.s:{name}">
+                    <Gamma id="Gamma.bcov_s" name="distr">
+                        <parameter id="RealParameter.bcov_s.alpha" spec="parameter.RealParameter" estimate="false" name="alpha">0.05</parameter>
+                        <parameter id="RealParameter.bcov_s.beta" spec="parameter.RealParameter" estimate="false" name="beta">10.0</parameter>
+                    </Gamma>
+                </prior>
+""",
+        'model': """                        <substModel id="covarion.s:{name}" spec="BinaryCovarion" alpha="@bcov_alpha.s:{name}" switchRate="@bcov_s.s:{name}" vfrequencies="@frequencies.s:{name}">
+                            <parameter id="hiddenfrequencies.s:{name}" spec="parameter.RealParameter" dimension="2" lower="0.0" name="hfrequencies" upper="1.0">0.5 0.5</parameter>
+                            <frequencies id="dummyfrequencies.s:{name}" spec="Frequencies" data="@{name}" estimate="false"/>
+                        </substModel>
+""",
+        'operators': """        <operator id="bcovAlphaScaler.s:{name}" spec="ScaleOperator" parameter="@bcov_alpha.s:{name}" scaleFactor="0.75" weight="0.1"/>
+        <operator id="bcovSwitchParamScaler.s:{name}" spec="ScaleOperator" parameter="@bcov_s.s:{name}" scaleFactor="0.75" weight="0.1"/>
+        <operator id="frequenciesDelta.s:{name}" spec="operator.DeltaExchangeOperator" delta="0.01" weight="0.1">
+            <parameter idref="frequencies.s:{name}"/>
+        </operator>
+""",
+        'logs': """            <log idref="bcov_alpha.s:{name}"/>
+            <log idref="bcov_s.s:{name}"/>
+            <log idref="frequencies.s:{name}"/>
+""",
+    },
+    'ctmc': {
+        'data_type': 'standard',
+        'user_data_type': '        <userDataType id="StandardData.0" spec="beast.base.evolution.datatype.StandardData" ambiguities="" nrOfStates="2"/>',
+        'state': """            <parameter id="freqParameter.s:{name}" spec="parameter.RealParameter" dimension="2" lower="0.0" name="stateNode" upper="1.0">0.5 0.5</parameter>
+""",
+        'priors': "",
+        'model': """                        <substModel id="ctmc.s:{name}" spec="GeneralSubstitutionModel">
+                            <parameter id="rates.s:{name}" spec="parameter.RealParameter" dimension="2" estimate="false" lower="0.0" name="rates">1.0 1.0</parameter>
+                            <frequencies id="estimatedFreqs.s:{name}" spec="Frequencies" frequencies="@freqParameter.s:{name}"/>
+                        </substModel>
+""",
+        'operators': """        <operator id="FrequenciesExchanger.s:{name}" spec="operator.DeltaExchangeOperator" delta="0.01" weight="0.1">
+            <parameter idref="freqParameter.s:{name}"/>
+        </operator>
+""",
+        'logs': """            <log idref="freqParameter.s:{name}"/>
+""",
+    },
+}
+
+GAMMA_BLOCKS = {
+    'state': """            <parameter id="gammaShape.s:{name}" spec="parameter.RealParameter" lower="0.1" name="stateNode">1.0</parameter>
+""",
+    'priors': """                <prior id="GammaShapePrior.s:{name}" name="distribution" x="@gammaShape.s:{name}">
+                    <Exponential id="Exponential.gammaShape" name="distr">
+                        <parameter id="RealParameter.gammaShape.mean" spec="parameter.RealParameter" estimate="false" name="mean">1.0</parameter>
+                    </Exponential>
+                </prior>
+""",
+    'operators': """        <operator id="gammaShapeScaler.s:{name}" spec="ScaleOperator" parameter="@gammaShape.s:{name}" scaleFactor="0.5" weight="0.1"/>
+""",
+    'logs': """            <log idref="gammaShape.s:{name}"/>
+""",
+}
+
+FIXED_GAMMA_SHAPE = """                        <parameter id="gammaShape.s:{name}" spec="parameter.RealParameter" estimate="false" lower="0.1" name="shape">1.0</parameter>
+"""
+
+DISTRIBUTIONS = {
+    'normal': ('Normal', ('mean', 'sigma')),
+    'lognormal': ('LogNormal', ('M', 'S')),
+    'uniform': ('Uniform', ('lower', 'upper')),
+}
+
+def _num(value):
+    """Format a number the way BEAUti writes it (1.0, 2.75, 10000000)."""
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return str(int(value))
+    return repr(float(value))
+
+def _tip_dates(tip_dates, taxa):
+    """Format the date trait value exactly as BEAUti lays it out."""
+    missing = [taxon for taxon in taxa if taxon not in tip_dates]
+    if missing:
+        raise ValueError(f"No tip date for {', '.join(missing)}")
+    pairs = ",\n\n".join(f"{taxon}={_num(tip_dates[taxon])}" for taxon in taxa)
+    return " " * 36 + pairs + " " * 16
+
+def _mrca_prior(prior_id, taxa, dist, params, declared, name, index):
+    """
+    One MRCAPrior block. Taxa are declared the first time they appear and
+    referenced with idref afterwards.
+    """
+
+    element, param_names = DISTRIBUTIONS[dist]
+    taxa_xml = ""
+    for taxon in taxa:
+        if taxon in declared:
+            taxa_xml += f'                        <taxon idref="{taxon}"/>\n'
+        else:
+            taxa_xml += f'                        <taxon id="{taxon}" spec="Taxon"/>\n'
+            declared.add(taxon)
+
+    # The root prior keeps BEAUti's ids (Normal.2, RealParameter.11/12)
+    if index == 0:
+        dist_id, param_ids = f"{element}.2", ["RealParameter.11", "RealParameter.12"]
+    else:
+        dist_id = f"{element}.{prior_id}"
+        param_ids = [f"RealParameter.{prior_id}.{p}" for p in param_names]
+
+    params_xml = "".join(
+        f'                        <parameter id="{pid}" spec="parameter.RealParameter" '
+        f'estimate="false" name="{pname}">{_num(value)}</parameter>\n'
+        for pid, pname, value in zip(param_ids, param_names, params)
+    )
+
+    return (f'                <distribution id="MRCA:{prior_id}.prior" spec="beast.base.evolution.tree.MRCAPrior" tree="@Tree.t:{name}">\n'
+            f'                    <taxonset id="MRCA:{prior_id}" spec="TaxonSet">\n'
+            f'{taxa_xml}'
+            f'                    </taxonset>\n'
+            f'                    <{element} id="{dist_id}" name="distr">\n'
+            f'{params_xml}'
+            f'                    </{element}>\n'
+            f'                </distribution>\n')
+
+def _check(value, choices, what):
+    if value not in choices:
+        raise ValueError(f"Unknown {what} '{value}' (choose from {', '.join(choices)})")
+
+def generate_xml(settings, matrix=None, run_spec="MCMC", run_attributes=None):
+    """
+    Return BEAST 2.7 XML for one analysis.
+
+    settings follows DEFAULT_SETTINGS; matrix is a packed cognate matrix
+    (loaded from settings['data'] if None). run_spec and run_attributes
+    replace the MCMC element, e.g. for path-sampling steps.
+    """
+
+    s = {**DEFAULT_SETTINGS, **settings}
+    _check(s['substitution'], SUBSTITUTION_MODELS, "substitution model")
+    _check(s['clock'], CLOCKS, "clock")
+    _check(s['tree_prior'], TREE_PRIORS, "tree prior")
+
+    if matrix is None:
+        matrix = load_matrix(s['data'])
+    if s['remove_constant']:
+        matrix = to_matrix(site_patterns(matrix, 'constant'))
+
+    taxa = [str(taxon) for taxon in matrix['languages']]
+    name = s['name']
+    clock = CLOCK_BLOCKS[s['clock']]
+    tree_prior = TREE_PRIOR_BLOCKS[s['tree_prior']]
+    substitution = SUBSTITUTION_BLOCKS[s['substitution']]
+    gamma = GAMMA_BLOCKS if s['gamma_categories'] else dict.fromkeys(GAMMA_BLOCKS, "")
+
+    # Root-height and clade calibrations
+    declared = set()
+    mrca_priors, mrca_logs = "", ""
+    calibrations = list(s['calibrations'])
+    if s['root_sigma'] is not None:
+        calibrations.insert(0, (name, taxa, 'normal', (s['root_mean'], s['root_sigma'])))
+    for i, (prior_id, clade, dist, params) in enumerate(calibrations):
+        mrca_priors += _mrca_prior(prior_id, clade, dist, params, declared, name,
+                                   i if s['root_sigma'] is not None else i + 1)
+        mrca_logs += f'            <log idref="MRCA:{prior_id}.prior"/>\n'
+
+    attributes = dict(run_attributes or {})
+    if s['sample_from_prior']:
+        attributes['sampleFromPrior'] = 'true'
+
+    fields = {
+        'name': name,
+        'n_branches': 2 * len(taxa) - 2,
+        'death_prob': _num(s['death_prob']),
+        'prefix': tree_prior['prefix'],
+    }
+
+    def fill(block):
+        return block.format(**fields)
+
+    xml = HEADER.format(
+        name=name,
+        data_type=substitution['data_type'],
+        sequences=to_beast_sequences(matrix),
+        user_data_type=substitution['user_data_type'],
+    )
+    xml += RUN.format(
+        name=name,
+        run_spec=run_spec,
+        chain_length=_num(int(s['chain_length'])),
+        run_attributes="".join(f' {key}="{value}"' for key, value in attributes.items()),
+        store_every=_num(int(s['store_every'])),
+        tip_dates=_tip_dates(s['tip_dates'], taxa),
+        state=fill(clock['state'] + substitution['state'] + gamma['state'] + tree_prior['state']),
+        priors=fill(tree_prior['priors'] + clock['priors'] + substitution['priors'] + gamma['priors']) + mrca_priors,
+        site_attributes=(f' gammaCategoryCount="{s["gamma_categories"]}" shape="@gammaShape.s:{name}"'
+                         if s['gamma_categories'] else ""),
+        gamma_shape="" if s['gamma_categories'] else fill(FIXED_GAMMA_SHAPE),
+        substitution_model=fill(substitution['model']),
+        branch_rate_model=fill(clock['model']),
+        operators=fill(clock['operators'] + tree_prior['operators'] + TREE_OPERATORS
+                       + substitution['operators'] + gamma['operators']),
+        log_every=_num(int(s['log_every'])),
+        logs=fill(clock['logs'] + tree_prior['logs'] + substitution['logs'] + gamma['logs']) + mrca_logs,
+        clock_id=fill(clock['id']),
+    )
+    return xml
+
+def parse_distribution(spec):
+    """Parse a BEASTling distribution such as "normal(2.323, 0.15)"."""
+    match = re.fullmatch(r"\s*(\w+)\s*\(\s*([^,]+?)\s*,\s*([^)]+?)\s*\)\s*", spec)
+    if not match or match.group(1).lower() not in DISTRIBUTIONS:
+        raise ValueError(f"Unsupported calibration: {spec}")
+    return match.group(1).lower(), (float(match.group(2)), float(match.group(3)))
+
+def settings_from_config(path):
+    """
+    Read model settings from a BEASTling configuration file.
+
+    Single-language calibrations become tip dates (the distribution's
+    centre); multi-language calibrations become MRCA priors.
+    """
+
+    config = configparser.ConfigParser()
+    config.optionxform = str  # keep language names as written
+    config.read(path)
+
+    settings = {}
+    if config.has_option('admin', 'basename'):
+        settings['name'] = config.get('admin', 'basename')
+    if config.has_section('MCMC'):
+        settings['chain_length'] = config.getint('MCMC', 'chainlength', fallback=DEFAULT_SETTINGS['chain_length'])
+        settings['sample_from_prior'] = config.getboolean('MCMC', 'sample_from_prior', fallback=False)
+
+    for section in config.sections():
+        if section.startswith('model'):
+            model = config.get(section, 'model', fallback='mutationdeath').lower()
+            settings['substitution'] = 'ctmc' if model in ('binaryctmc', 'bsvs') else model
+            settings['data'] = config.get(section, 'data', fallback=DEFAULT_SETTINGS['data'])
+            if config.getboolean(section, 'rate_variation', fallback=False):
+                settings['gamma_categories'] = 4
+            settings['remove_constant'] = config.getboolean(section, 'remove_constant_features', fallback=False)
+        elif section.startswith('clock'):
+            settings['clock'] = config.get(section, 'type', fallback='strict').lower()
+
+    if config.has_section('tree_prior'):
+        settings['tree_prior'] = config.get('tree_prior', 'model', fallback='yule').lower()
+
+    if config.has_section('calibration'):
+        tip_dates, calibrations = {}, []
+        for clade, spec in config.items('calibration'):
+            dist, params = parse_distribution(spec)
+            taxa = sorted(taxon.strip() for taxon in clade.split(','))
+            if len(taxa) == 1:
+                tip_dates[taxa[0]] = params[0] if dist != 'uniform' else sum(params) / 2
+            else:
+                calibrations.append(('+'.join(taxa), taxa, dist, params))
+        if tip_dates:
+            settings['tip_dates'] = {**DEFAULT_SETTINGS['tip_dates'], **tip_dates}
+        settings['calibrations'] = calibrations
+
+    return settings
+
+def parse_grid_values(spec):
+    """Parse "a,b,c" or "start:stop:n" (inclusive linspace) into values."""
+    if ':' in spec:
+        start, stop, num = spec.split(':')
+        return [round(float(v), 10) for v in np.linspace(float(start), float(stop), int(num))]
+    values = []
+    for value in spec.split(','):
+        try:
+            values.append(int(value) if value.strip().lstrip('-').isdigit() else float(value))
+        except ValueError:
+            values.append(value.strip())
+    return values
+
+def _value_tag(value):
+    return _num(value) if isinstance(value, (int, float)) else str(value)
+
+def write_grid(settings, grid, output_dir, name_template=None, matrix=None):
+    """
+    Write one XML per point of a parameter grid.
+
+    grid maps setting names to value lists; every combination is written
+    to output_dir as <name>_<key><value>....xml. Returns the paths written.
+    """
+
+    s = {**DEFAULT_SETTINGS, **settings}
+    if matrix is None:
+        matrix = load_matrix(s['data'])
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    keys = list(grid)
+    paths = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        point = dict(zip(keys, values))
+        if name_template:
+            stem = name_template.format(**{**s, **point})
+        else:
+            stem = "_".join([s['name']] + [f"{key}{_value_tag(value)}" for key, value in point.items()])
+        path = output_dir / f"{stem}.xml"
+        path.write_text(generate_xml({**s, **point}, matrix))
+        paths.append(path)
+
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate BEAST 2.7 XML (optionally a parameter grid).")
+    parser.add_argument("--config", help="BEASTling configuration to take model settings from")
+    parser.add_argument("--data", help="binary matrix (wide CSV or packed .npz)")
+    parser.add_argument("--tip-date", action="append", default=[], metavar="LANG=KYA")
+    parser.add_argument("--root-prior", metavar="MEAN,SIGMA",
+                        help='Normal prior on the root height (default 4.5,1.5, also with --config), or "none"')
+    parser.add_argument("--substitution", choices=SUBSTITUTION_MODELS)
+    parser.add_argument("--clock", choices=CLOCKS)
+    parser.add_argument("--tree-prior", choices=TREE_PRIORS)
+    parser.add_argument("--chain-length", type=int)
+    parser.add_argument("--grid", action="append", default=[], metavar="KEY=VALUES",
+                        help="vary a setting: a,b,c or start:stop:n; repeat for a full grid")
+    parser.add_argument("--name-template", help="output stem, e.g. dravidian_{root_sigma}")
+    parser.add_argument("-o", "--output", default="results/xml",
+                        help="output directory (grid) or .xml file")
+    args = parser.parse_args(argv)
+
+    settings = settings_from_config(args.config) if args.config else {}
+    if args.data:
+        settings['data'] = args.data
+    if args.tip_date:
+        tip_dates = dict(settings.get('tip_dates', DEFAULT_SETTINGS['tip_dates']))
+        for spec in args.tip_date:
+            taxon, value = spec.split('=')
+            tip_dates[taxon] = float(value)
+        settings['tip_dates'] = tip_dates
+    if args.root_prior:
+        if args.root_prior.lower() == 'none':
+            settings['root_sigma'] = None
+        else:
+            settings['root_mean'], settings['root_sigma'] = map(float, args.root_prior.split(','))
+    for key in ('substitution', 'clock', 'tree_prior', 'chain_length'):
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+
+    grid = {}
+    for spec in args.grid:
+        key, values = spec.split('=', 1)
+        grid[key.replace('-', '_')] = parse_grid_values(values)
+    if args.config and not args.root_prior and not {'root_mean', 'root_sigma'} & set(grid):
+        print(f"⚠ {args.config} has no root prior: using the default Normal({DEFAULT_SETTINGS['root_mean']}, "
+              f"{DEFAULT_SETTINGS['root_sigma']}) (--root-prior MEAN,SIGMA or none to change it)")
+
+    if grid:
+        paths = write_grid(settings, grid, args.output, args.name_template)
+        print(f"✓ Wrote {len(paths)} XML files to {args.output}")
+    else:
+        output = Path(args.output)
+        if output.suffix != '.xml':
+            output = output / f"{settings.get('name', DEFAULT_SETTINGS['name'])}.xml"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(generate_xml(settings))
+        print(f"✓ Wrote {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# scripts/benchmark_binary_encoding.py
+"""Benchmark the vectorized cognate-to-binary encoder on synthetic wordlists."""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from extract_4lang import encode_binary
+
+SIZES = [10_000, 100_000, 1_000_000]
+N_LANGS = 20
+WORDS_PER_CONCEPT = 200  # rows per concept across all languages
+CLASSES_PER_CONCEPT = 8
+
+def make_wordlist(n_rows, seed=42):
+    """Create a LingPy-like wordlist with n_rows (DOCULECT, CONCEPT, COGID) rows."""
+
+    rng = np.random.default_rng(seed)
+    n_concepts = max(1, n_rows // WORDS_PER_CONCEPT)
+
+    concept_idx = rng.integers(0, n_concepts, n_rows)
+
+    # Cognate IDs are unique per concept, as in DravLex
+    return pd.DataFrame({
+        'DOCULECT': np.array([f"Lang{i:02d}" for i in range(N_LANGS)], dtype=object)[
+            rng.integers(0, N_LANGS, n_rows)],
+        'CONCEPT': np.array([f"concept{i}" for i in range(n_concepts)], dtype=object)[
+            concept_idx],
+        'COGID': concept_idx * CLASSES_PER_CONCEPT + rng.integers(1, CLASSES_PER_CONCEPT + 1, n_rows)
+    })
+
+def benchmark(sizes=SIZES, repeats=3):
+    """Time encode_binary for each wordlist size and report per-row cost."""
+
+    print("="*70)
+    print("BINARY ENCODING BENCHMARK")
+    print("="*70)
+    print(f"\n{'Rows':>12} {'Features':>10} {'Best (s)':>10} {'ns/row':>10}")
+    print("-"*46)
+
+    languages = [f"Lang{i:02d}" for i in range(N_LANGS)]
+    results = []
+    for n_rows in sizes:
+        df = make_wordlist(n_rows)
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            _, binary_wide = encode_binary(df, languages)
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        results.append((n_rows, best))
+        print(f"{n_rows:>12,} {binary_wide.shape[1]:>10,} {best:>10.3f} "
+              f"{best / n_rows * 1e9:>10.0f}")
+
+    # Linear scaling means the per-row cost stays flat as the wordlist grows
+    (n_small, t_small), (n_large, t_large) = results[0], results[-1]
+    ratio = (t_large / n_large) / (t_small / n_small)
+    print(f"\nPer-row cost ratio ({n_large:,} vs {n_small:,} rows): {ratio:.2f}x")
+
+    return results
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,221 @@
+# scripts/cognate_matrix.py
+"""
+Bit-packed binary cognate matrices.
+
+A packed matrix stores each language's presence/absence row as bits
+(np.packbits), with the language and feature names alongside. It is kept
+on disk as a compressed .npz and exported to the dense CSV, NEXUS and BEAST
+<sequence value=...> forms without building an intermediate DataFrame:
+
+    python scripts/cognate_matrix.py data/processed/dravidian_beastling.csv cognates.npz
+    python scripts/cognate_matrix.py cognates.npz dravidian_4lang.nex
+"""
+
+import csv
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from alignment_writer import write_nexus
+
+def pack_matrix(languages, features, values, missing=None):
+    """
+    Pack a languages x features 0/1 array.
+
+    missing is an optional boolean mask of unknown cells ('?'), packed the
+    same way; it is None when the matrix is complete.
+    """
+
+    values = np.asarray(values)
+    if values.shape != (len(languages), len(features)):
+        raise ValueError(f"Matrix shape {values.shape} does not match "
+                         f"{len(languages)} languages x {len(features)} features")
+
+    if missing is not None:
+        missing = np.asarray(missing, dtype=bool)
+        missing = np.packbits(missing, axis=1) if missing.any() else None
+
+    return {
+        'languages': np.asarray(languages, dtype=str),
+        'features': np.asarray(features, dtype=str),
+        'bits': np.packbits(values.astype(bool), axis=1),
+        'missing': missing
+    }
+
+def pack_frame(binary_wide):
+    """Pack a wide DataFrame (languages as rows, features as columns)."""
+    values = binary_wide.to_numpy()
+    missing = pd.isna(binary_wide).to_numpy()
+    return pack_matrix(binary_wide.index, binary_wide.columns,
+                       np.where(missing, 0, values), missing)
+
+def read_csv(path):
+    """
+    Read a wide binary CSV (Language column + one column per feature).
+
+    Rows are parsed straight from bytes and packed one at a time, so the
+    dense matrix never exists as Python objects.
+    """
+
+    with open(path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode()]))
+        width = 2 * (len(header) - 1) - 1
+        languages, bits, gaps = [], [], []
+        for line in f:
+            line = line.rstrip(b'\r\n')
+            if not line:
+                continue
+            if line.startswith(b'"'):
+                name, *cells = next(csv.reader([line.decode()]))
+                cells = ','.join(cells).encode()
+            else:
+                name, _, cells = line.decode().partition(',')
+                cells = cells.encode()
+
+            row = np.frombuffer(cells, dtype=np.uint8)
+            if len(row) == width:
+                row = row[::2]
+            else:
+                # Irregular row (empty cells): fall back to splitting
+                row = np.array([cell[:1] or b'?' for cell in cells.split(b',')], dtype='S1').view(np.uint8)
+            languages.append(name)
+            bits.append(np.packbits(row == ord('1')))
+            gaps.append(np.packbits(row == ord('?')))
+
+    features = header[1:]
+    gaps = np.array(gaps, dtype=np.uint8).reshape(len(languages), -1)
+    return {
+        'languages': np.asarray(languages, dtype=str),
+        'features': np.asarray(features, dtype=str),
+        'bits': np.array(bits, dtype=np.uint8).reshape(len(languages), -1),
+        'missing': gaps if gaps.any() else None
+    }
+
+def n_features(matrix):
+    return len(matrix['features'])
+
+def unpack(matrix, missing_value=None):
+    """
+    Unpack to a dense uint8 array (or int8 with missing_value for '?' cells).
+    """
+
+    values = np.unpackbits(matrix['bits'], axis=1, count=n_features(matrix))
+    if missing_value is not None and matrix['missing'] is not None:
+        values = values.astype(np.int8)
+        values[unpack_missing(matrix)] = missing_value
+    return values
+
+def unpack_missing(matrix):
+    """Dense boolean mask of missing cells."""
+    if matrix['missing'] is None:
+        return np.zeros((len(matrix['languages']), n_features(matrix)), dtype=bool)
+    return np.unpackbits(matrix['missing'], axis=1, count=n_features(matrix)).astype(bool)
+
+def to_frame(matrix):
+    """Dense wide DataFrame, as written by extract_4lang."""
+    return pd.DataFrame(
+        unpack(matrix).astype(int),
+        index=pd.Index(matrix['languages'], name='Language'),
+        columns=pd.Index(matrix['features'], name='Feature')
+    )
+
+def encode_rows(matrix, symbols=b"01", missing=b"?"):
+    """
+    Yield (language, row) with each row as one byte string of state symbols.
+
+    Rows are unpacked one at a time and encoded through a lookup table, so
+    exporters never hold more than one dense row in memory.
+    """
+
+    table = np.frombuffer(symbols + missing, dtype=np.uint8)
+    for i, language in enumerate(matrix['languages']):
+        row = np.unpackbits(matrix['bits'][i], count=n_features(matrix))
+        if matrix['missing'] is not None:
+            gaps = np.unpackbits(matrix['missing'][i], count=n_features(matrix)).astype(bool)
+            row[gaps] = len(symbols)
+        yield str(language), table[row].tobytes()
+
+def save_packed(matrix, path):
+    """Save a packed matrix as a compressed .npz."""
+    arrays = {key: value for key, value in matrix.items() if value is not None}
+    np.savez_compressed(path, **arrays)
+
+def load_packed(path):
+    """Load a packed matrix saved with save_packed."""
+    with np.load(path) as data:
+        return {
+            'languages': data['languages'],
+            'features': data['features'],
+            'bits': data['bits'],
+            'missing': data['missing'] if 'missing' in data.files else None
+        }
+
+def load_matrix(path):
+    """Load a packed .npz or a wide binary CSV."""
+    path = Path(path)
+    return load_packed(path) if path.suffix == '.npz' else read_csv(path)
+
+def _csv_line(fields):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(fields)
+    return buffer.getvalue().encode()
+
+def to_csv(matrix, path):
+    """
+    Write the wide CSV (same bytes as DataFrame.to_csv of the wide matrix).
+    """
+
+    with open(path, 'wb') as f:
+        f.write(_csv_line(['Language', *matrix['features']]))
+        # Interleave symbols with commas: 0,1,1,...
+        line = np.full(2 * n_features(matrix), ord(','), dtype=np.uint8)
+        line[-1] = ord('\n')
+        for language, row in encode_rows(matrix):
+            line[::2] = np.frombuffer(row, dtype=np.uint8)
+            f.write(_csv_line([language])[:-1] + b',' + line.tobytes())
+
+def to_nexus(matrix, path, interleave=0, charsets=False):
+    """Write a NEXUS DATA block for BEAUti import (see alignment_writer)."""
+    write_nexus(path, matrix['languages'], unpack(matrix, missing_value=-1),
+                interleave, matrix['features'] if charsets else None, charsets)
+
+def to_beast_sequences(matrix, indent=8):
+    """Return the BEAST <sequence> elements of an alignment, one per language."""
+
+    pad = ' ' * indent
+    return ''.join(
+        f'{pad}<sequence id="seq_{language}" spec="Sequence" taxon="{language}" '
+        f'totalcount="2" value="{row.decode()}"/>\n'
+        for language, row in encode_rows(matrix)
+    )
+
+def convert(source, target):
+    """Convert between .csv, .npz, .nex and BEAST sequence (.xml) forms."""
+
+    matrix = load_matrix(source)
+    suffix = Path(target).suffix
+    if suffix == '.npz':
+        save_packed(matrix, target)
+    elif suffix == '.csv':
+        to_csv(matrix, target)
+    elif suffix in ('.nex', '.nexus'):
+        to_nexus(matrix, target)
+    elif suffix == '.xml':
+        Path(target).write_text(to_beast_sequences(matrix))
+    else:
+        raise ValueError(f"Unknown output format: {target}")
+
+    print(f"✓ {source} -> {target} "
+          f"({len(matrix['languages'])} languages x {n_features(matrix)} features, "
+          f"{matrix['bits'].nbytes:,} bytes packed)")
+    return matrix
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python scripts/cognate_matrix.py SOURCE TARGET "
+              "(.csv, .npz, .nex or .xml)")
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
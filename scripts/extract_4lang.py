@@ -1,111 +1,281 @@
 # scripts/extract_4lang.py
-"""Extract Telugu, Tamil, Kannada, Malayalam and convert to binary format."""
+"""
+Extract any set of DravLex languages and convert to binary format.
 
+Defaults to Telugu, Tamil, Kannada, Malayalam. Several language subsets can
+be extracted from a single read of the raw TSV:
+
+    python scripts/extract_4lang.py
+    python scripts/extract_4lang.py --languages all
+    python scripts/extract_4lang.py --subset sd1=Tamil,Malayalam,Kannada --subset Telugu,Tamil
+"""
+
+import argparse
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+from cognate_matrix import pack_frame, save_packed
+
 RAW_DIR = Path("data/raw/2018_02_26_lingpy_analyses_for_RSOS_SI_ SI_robustness_cognate_coding")
 PROCESSED_DIR = Path("data/processed")
 
-# Target languages - check exact names in languages.csv first
-TARGET_LANGS = {
-    "Telugu": "Telugu",
-    "Tamil": "Tamil", 
-    "Kannada": "Kannada",
-    "Malayalam": "Malayalam"
-}
-
-def extract_cognate_data():
-    """Extract 4-language cognate data from DravLex."""
-    
+# Default languages - check exact names in languages.csv first
+DEFAULT_LANGUAGES = ["Telugu", "Tamil", "Kannada", "Malayalam"]
+
+def _language_column(df):
+    """Return the doculect column of a LingPy wordlist."""
+    # Might be 'DOCULECT', 'Language', or 'Language_ID'
+    return 'DOCULECT' if 'DOCULECT' in df.columns else 'Language'
+
+def index_wordlist(df):
+    """
+    Build a columnar index of all (DOCULECT, CONCEPT, COGID) triples.
+
+    Every (concept, cognate class) pair becomes one feature. The index holds
+    a languages x features presence array plus the first row at which each
+    language attests each feature, which is enough to derive the binary
+    matrix of any language subset without touching the rows again.
+    """
+
+    lang_col = _language_column(df)
+
+    # Drop missing concepts and missing/zero cognate IDs
+    cogids = pd.to_numeric(df['COGID'], errors='coerce')
+    valid = (df['CONCEPT'].notna() & cogids.notna() & (cogids != 0)).to_numpy()
+    rows = np.flatnonzero(valid)
+    concepts = df['CONCEPT'].to_numpy()[valid]
+    cogids = cogids.to_numpy()[valid].astype('int64')
+
+    # One code per (concept, cogid) and per language
+    feature_codes, feature_keys = pd.factorize(
+        pd.MultiIndex.from_arrays([concepts, cogids])
+    )
+    lang_codes, languages = pd.factorize(df[lang_col].to_numpy()[valid])
+    feature_concepts = feature_keys.get_level_values(0).to_numpy()
+
+    shape = (len(languages), len(feature_keys))
+    presence = np.zeros(shape, dtype=bool)
+    presence[lang_codes, feature_codes] = True
+    first_row = np.full(shape, len(df), dtype=np.int64)
+    np.minimum.at(first_row, (lang_codes, feature_codes), rows)
+
+    feature_names = (
+        pd.Series(feature_concepts, dtype=str)
+        + '_' + pd.Series(feature_keys.get_level_values(1)).astype(str)
+    ).to_numpy()
+
+    return {
+        'languages': pd.Index(languages),
+        'presence': presence,
+        'first_row': first_row,
+        'feature_names': feature_names,
+        'concept_rank': pd.factorize(feature_concepts, sort=True)[0]
+    }
+
+@lru_cache(maxsize=None)
+def _load_wordlist(path, mtime_ns):
+    """Read and index a LingPy TSV; cached per file version."""
+    df = pd.read_csv(path, sep="\t")
+    return df, index_wordlist(df)
+
+def load_wordlist(path=RAW_DIR / "DravLex.tsv"):
+    """Load a LingPy TSV and its columnar index, parsing each file only once."""
+    path = Path(path).resolve()
+    return _load_wordlist(path, path.stat().st_mtime_ns)
+
+def resolve_languages(languages, available):
+    """Expand "all" to every doculect in the wordlist; unknown doculects are an error."""
+    if isinstance(languages, str):
+        languages = [languages]
+    if list(languages) == ["all"]:
+        return list(available)
+    missing = [lang for lang in languages if lang not in set(available)]
+    if missing:
+        raise ValueError(f"No data for {', '.join(missing)} "
+                         f"(available: {', '.join(sorted(available))})")
+    return list(languages)
+
+def select_binary(index, languages, subset_features=True):
+    """
+    Slice the binary matrix of a language subset out of a wordlist index.
+
+    Features are ordered by concept and then by first appearance, exactly
+    like iterating groupby(CONCEPT) and COGID.unique(). With subset_features,
+    only cognate classes attested in the subset are kept, as if the wordlist
+    had been filtered to these languages first.
+    """
+
+    languages = list(languages)
+    rows = index['languages'].get_indexer(languages)
+    found = rows >= 0
+
+    n_features = len(index['feature_names'])
+    presence = np.zeros((len(languages), n_features), dtype=np.int64)
+    presence[found] = index['presence'][rows[found]]
+
+    if subset_features:
+        keep = np.flatnonzero(presence.any(axis=0))
+        first_row = index['first_row'][rows[found]].min(axis=0, initial=np.iinfo(np.int64).max)
+    else:
+        keep = np.arange(n_features)
+        first_row = index['first_row'].min(axis=0)
+
+    order = keep[np.lexsort((first_row[keep], index['concept_rank'][keep]))]
+    presence = presence[:, order]
+    feature_names = index['feature_names'][order]
+
+    binary_df = pd.DataFrame({
+        'Language': np.tile(np.asarray(languages, dtype=object), len(feature_names)),
+        'Feature': np.repeat(feature_names, len(languages)),
+        'Value': presence.T.ravel()
+    })
+
+    # Wide format (languages as rows, features as columns), sorted like a pivot
+    binary_wide = pd.DataFrame(
+        presence,
+        index=pd.Index(languages, name='Language'),
+        columns=pd.Index(feature_names, name='Feature')
+    ).sort_index().sort_index(axis=1)
+
+    return binary_df, binary_wide
+
+def encode_binary(df, languages):
+    """
+    Encode (DOCULECT, CONCEPT, COGID) triples as a binary presence/absence matrix.
+
+    Features come from every row of df; languages without data get all-zero
+    rows. All rows are coded in one scatter into a dense languages x features
+    array, so the cost is linear in the wordlist size.
+    """
+    return select_binary(index_wordlist(df), languages, subset_features=False)
+
+def extract_cognate_data(languages=DEFAULT_LANGUAGES, raw_dir=RAW_DIR,
+                         output_dir=PROCESSED_DIR, tag=None):
+    """Extract the cognate data of a language set from DravLex."""
+
     # Load the main data (TSV is the LingPy format)
     print("Loading DravLex.tsv...")
-    df = pd.read_csv(RAW_DIR / "DravLex.tsv", sep="\t")
-    
+    df, index = load_wordlist(Path(raw_dir) / "DravLex.tsv")
+
     # Check column names (common LingPy columns: ID, DOCULECT, CONCEPT, IPA, TOKENS, COGID)
     print(f"Columns: {df.columns.tolist()}\n")
-    
-    # Filter for 4 languages
-    # Adjust column name if needed (might be 'DOCULECT', 'Language', or 'Language_ID')
-    lang_col = 'DOCULECT' if 'DOCULECT' in df.columns else 'Language'
-    
-    target_lang_values = list(TARGET_LANGS.values())
-    df_filtered = df[df[lang_col].isin(target_lang_values)].copy()
-    
+
+    languages = resolve_languages(languages, index['languages'])
+    tag = tag or f"{len(languages)}lang"
+    lang_col = _language_column(df)
+    df_filtered = df[df[lang_col].isin(languages)].copy()
+
     print(f"Filtered to {len(df_filtered)} entries")
     print(f"Languages: {df_filtered[lang_col].unique()}")
     print(f"Concepts: {df_filtered['CONCEPT'].nunique() if 'CONCEPT' in df_filtered.columns else 'Check column'}")
-    
+
     # Save intermediate filtered data
-    df_filtered.to_csv(PROCESSED_DIR / "dravlex_4lang.csv", index=False)
-    print(f"\nSaved: {PROCESSED_DIR / 'dravlex_4lang.csv'}")
-    
+    output_dir = Path(output_dir)
+    df_filtered.to_csv(output_dir / f"dravlex_{tag}.csv", index=False)
+    print(f"\nSaved: {output_dir / f'dravlex_{tag}.csv'}")
+
     return df_filtered
 
-def convert_to_binary(df):
+def save_binary(binary_df, binary_wide, output_dir=PROCESSED_DIR, tag="4lang", packed=False):
+    """Write the long and wide binary matrices (and optionally a bit-packed .npz)."""
+
+    print(f"\nBinary matrix shape: {binary_wide.shape}")
+    print(f"Languages: {len(binary_wide)}")
+    print(f"Features (cognate classes): {len(binary_wide.columns)}")
+
+    # Save both formats
+    output_dir = Path(output_dir)
+    binary_df.to_csv(output_dir / f"cognates_{tag}_long.csv", index=False)
+    binary_wide.to_csv(output_dir / f"cognates_{tag}_wide.csv")
+
+    print(f"\nSaved: {output_dir / f'cognates_{tag}_long.csv'}")
+    print(f"Saved: {output_dir / f'cognates_{tag}_wide.csv'}")
+
+    if packed:
+        save_packed(pack_frame(binary_wide), output_dir / f"cognates_{tag}.npz")
+        print(f"Saved: {output_dir / f'cognates_{tag}.npz'}")
+
+def convert_to_binary(df, languages=DEFAULT_LANGUAGES, output_dir=PROCESSED_DIR, tag=None,
+                      packed=False):
     """
     Convert cognate classes to binary presence/absence matrix.
-    
+
     LingPy format has COGID (cognate ID) for each word.
     Same COGID across languages = cognate.
     """
-    
-    lang_col = 'DOCULECT' if 'DOCULECT' in df.columns else 'Language'
-    concept_col = 'CONCEPT'
-    cogid_col = 'COGID'
-    
-    # Create binary matrix
-    binary_data = []
-    
-    # Group by concept
-    for concept, concept_df in df.groupby(concept_col):
-        # Get all unique cognate classes for this concept
-        cognate_classes = concept_df[cogid_col].unique()
-        
-        # For each cognate class, create a binary feature
-        for cog_id in cognate_classes:
-            if pd.isna(cog_id) or cog_id == 0:  # Skip missing data
-                continue
-                
-            feature_name = f"{concept}_{int(cog_id)}"
-            
-            # Check which languages have this cognate
-            for lang in TARGET_LANGS.values():
-                lang_data = concept_df[concept_df[lang_col] == lang]
-                has_cognate = int(cog_id in lang_data[cogid_col].values)
-                
-                binary_data.append({
-                    'Language': lang,
-                    'Feature': feature_name,
-                    'Value': has_cognate
-                })
-    
-    binary_df = pd.DataFrame(binary_data)
-    
-    # Pivot to wide format (languages as rows, features as columns)
-    binary_wide = binary_df.pivot(index='Language', columns='Feature', values='Value')
-    binary_wide = binary_wide.fillna(0).astype(int)
-    
-    print(f"\nBinary matrix shape: {binary_wide.shape}")
-    print(f"Languages: {len(binary_wide)}")
-    print(f"Features (cognate classes): {len(binary_wide.columns)}")
-    
-    # Save both formats
-    binary_df.to_csv(PROCESSED_DIR / "cognates_4lang_long.csv", index=False)
-    binary_wide.to_csv(PROCESSED_DIR / "cognates_4lang_wide.csv")
-    
-    print(f"\nSaved: {PROCESSED_DIR / 'cognates_4lang_long.csv'}")
-    print(f"Saved: {PROCESSED_DIR / 'cognates_4lang_wide.csv'}")
-    
+
+    languages = resolve_languages(languages, df[_language_column(df)].unique())
+    binary_df, binary_wide = encode_binary(df, languages)
+    save_binary(binary_df, binary_wide, output_dir, tag or f"{len(languages)}lang", packed)
+
     return binary_df, binary_wide
 
-if __name__ == "__main__":
-    # Extract 4-language data
-    df_4lang = extract_cognate_data()
-    
+def extract_subsets(subsets, raw_dir=RAW_DIR, output_dir=PROCESSED_DIR, save=True,
+                    packed=False):
+    """
+    Emit binary matrices for many language subsets from one read of DravLex.
+
+    subsets maps a tag to a list of languages (or "all"). The raw TSV is
+    parsed and indexed once; each subset is then a slice of the index.
+    """
+
+    print("Loading DravLex.tsv...")
+    df, index = load_wordlist(Path(raw_dir) / "DravLex.tsv")
+
+    results = {}
+    for tag, languages in subsets.items():
+        languages = resolve_languages(languages, index['languages'])
+        binary_df, binary_wide = select_binary(index, languages)
+        print(f"  {tag}: {binary_wide.shape[0]} languages x {binary_wide.shape[1]} features")
+        if save:
+            binary_df.to_csv(Path(output_dir) / f"cognates_{tag}_long.csv", index=False)
+            binary_wide.to_csv(Path(output_dir) / f"cognates_{tag}_wide.csv")
+        if packed:
+            save_packed(pack_frame(binary_wide), Path(output_dir) / f"cognates_{tag}.npz")
+        results[tag] = (binary_df, binary_wide)
+
+    return results
+
+def parse_subset(spec):
+    """Parse a "tag=Lang1,Lang2" or "Lang1,Lang2" subset specification."""
+    tag, _, languages = spec.rpartition('=')
+    languages = [lang.strip() for lang in languages.split(',') if lang.strip()]
+    return tag or f"{len(languages)}lang", languages
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--languages", nargs="+", default=DEFAULT_LANGUAGES,
+                        help='doculects to extract, or "all" (default: %(default)s)')
+    parser.add_argument("--subset", action="append", default=[], metavar="[TAG=]LANG,LANG",
+                        help="extract a language subset; repeat for a sweep")
+    parser.add_argument("--tag", help="output name tag (default: <n>lang)")
+    parser.add_argument("--raw-dir", type=Path, default=RAW_DIR)
+    parser.add_argument("--output-dir", type=Path, default=PROCESSED_DIR)
+    parser.add_argument("--packed", action="store_true",
+                        help="also write a bit-packed cognates_<tag>.npz")
+    args = parser.parse_args(argv)
+
+    if args.subset:
+        subsets = {}
+        for spec in args.subset:
+            tag, languages = parse_subset(spec)
+            if tag in subsets:
+                tag = f"{tag}_{len(subsets)}"
+            subsets[tag] = languages
+        return extract_subsets(subsets, args.raw_dir, args.output_dir, packed=args.packed)
+
+    # Extract language data
+    df = extract_cognate_data(args.languages, args.raw_dir, args.output_dir, args.tag)
+
     # Convert to binary
-    binary_long, binary_wide = convert_to_binary(df_4lang)
-    
+    return convert_to_binary(df, args.languages, args.output_dir, args.tag, args.packed)
+
+if __name__ == "__main__":
+    main()
+
     print("\n" + "=" * 60)
     print("Data preparation complete!")
     print("=" * 60)
@@ -7,6 +7,26 @@ import seaborn as sns
 import numpy as np
 from pathlib import Path
 
+from beast_trees import clade_ages, read_trees
+from hpd import hpd, hpd_intervals
+from log_cache import load_log
+from mcc_tree import mcc_tree, print_clades, write_nexus
+from mcmc_diagnostics import MAX_RHAT, MIN_ESS, diagnose, passes, print_diagnostics
+
+# Trace columns used by the summaries and plots
+LOG_COLUMNS = ['posterior', 'likelihood', 'Tree.height', 'ucldMean', 'birthRate', 'Tree.treeLength']
+
+# Posterior trees ($(filebase)-$(tree).trees) and the MCC summary tree
+TREES_FILE = Path("dravidian_beauti_full-dravidian_4lang.trees")
+MCC_FILE = Path("results/final/dravidian_mcc.tree")
+
+# Divergences dated from the posterior trees (MRCA of each taxon set)
+CLADES = {
+    'Proto-Dravidian': ['Telugu', 'Tamil', 'Kannada', 'Malayalam'],
+    'Proto-South Dravidian': ['Tamil', 'Kannada', 'Malayalam'],
+    'Tamil-Malayalam': ['Tamil', 'Malayalam'],
+}
+
 # Set style
 sns.set_style("whitegrid")
 plt.rcParams['figure.dpi'] = 300
@@ -16,10 +36,10 @@ def analyze_full_results():
     
     # Load log
     print("Loading full analysis results...")
-    df = pd.read_csv("dravidian_beauti_full.log", sep="\t", comment="#")
+    df = load_log("dravidian_beauti_full.log", LOG_COLUMNS)
     
-    # Remove 10% burnin
-    burnin_samples = int(len(df) * 0.1)
+    # Burn-in detected from the posterior trace (at least 10%)
+    diagnostics, burnin_samples = diagnose(df, min_burnin=0.1)
     df_post = df.iloc[burnin_samples:]
     
     print(f"\n{'='*70}")
@@ -31,8 +51,7 @@ def analyze_full_results():
     
     mean_age = tree_height.mean()
     median_age = tree_height.median()
-    hpd_lower = tree_height.quantile(0.025)
-    hpd_upper = tree_height.quantile(0.975)
+    hpd_lower, hpd_upper = hpd(tree_height.to_numpy(), 0.95)
     
     print(f"\nYour 4-language analysis:")
     print(f"  Mean:      {mean_age:.2f} kya (thousand years ago)")
@@ -47,26 +66,47 @@ def analyze_full_results():
     print("LANGUAGE DIVERGENCE ESTIMATES")
     print(f"{'='*70}")
     
-    # Calculate approx divergence times based on tree height
-    print(f"\nEstimated divergence ages (from present):")
-    print(f"  Proto-Dravidian:     ~{mean_age:.0f} kya")
-    print(f"  Tamil (attested):    2.323 kya (300 BCE)")
-    print(f"  Telugu (attested):   1.45 kya (575 CE)")
-    print(f"  Kannada (attested):  1.575 kya (450 CE)")
-    print(f"  Malayalam (attested): 1.195 kya (830 CE)")
+    # MRCA ages of each clade in every posterior tree
+    divergences = None
+    trees = None
+    if TREES_FILE.exists():
+        trees = read_trees(TREES_FILE, burnin=burnin_samples / len(df))
+        divergences = divergence_table(trees, CLADES)
+        
+        print(f"\nEstimated divergence ages (from {len(trees['states'])} posterior trees):")
+        print(f"  {'Clade':<24} {'Mean':>6} {'Median':>7} {'95% HPD':>16} {'P(mono)':>8}")
+        for name, row in divergences.iterrows():
+            hpd_str = f"[{row['hpd_lower']:.2f}, {row['hpd_upper']:.2f}]"
+            print(f"  {name:<24} {row['mean']:>6.2f} {row['median']:>7.2f} "
+                  f"{hpd_str:>16} {row['monophyly']:>8.2f}")
+    else:
+        print(f"\n⚠ {TREES_FILE} not found - only the root age (Tree.height) is available")
     
     # Convergence diagnostics
     print(f"\n{'='*70}")
     print("CONVERGENCE DIAGNOSTICS")
     print(f"{'='*70}")
     
-    print(f"\nPosterior:")
-    print(f"  Starting: {df['posterior'].iloc[0]:.2f}")
-    print(f"  Final:    {df['posterior'].iloc[-1]:.2f}")
-    print(f"  Mean:     {df_post['posterior'].mean():.2f}")
-    
-    print(f"\nLikelihood:")
-    print(f"  Mean: {df_post['likelihood'].mean():.2f}")
+    print_diagnostics(diagnostics, burnin_samples, len(df))
+    converged = passes(diagnostics)
+    if converged:
+        print(f"\n✓ All parameters have ESS ≥ {MIN_ESS}")
+    else:
+        print(f"\n⚠ Some parameters have ESS < {MIN_ESS} (or R-hat > {MAX_RHAT}) - run a longer chain")
+    
+    # Maximum clade credibility tree (replaces TreeAnnotator)
+    clades = None
+    if trees is not None:
+        print(f"\n{'='*70}")
+        print("MAXIMUM CLADE CREDIBILITY TREE")
+        print(f"{'='*70}")
+        
+        MCC_FILE.parent.mkdir(parents=True, exist_ok=True)
+        mcc = mcc_tree(trees)
+        write_nexus(mcc, MCC_FILE)
+        print_clades(mcc)
+        print(f"\n✓ Saved: {MCC_FILE}")
+        clades = mcc['clades']
     
     # Create comprehensive plots
     create_publication_plots(df, df_post, mean_age, hpd_lower, hpd_upper)
@@ -78,21 +118,40 @@ def analyze_full_results():
         'hpd_lower': hpd_lower,
         'hpd_upper': hpd_upper,
         'total_samples': len(df),
-        'post_burnin_samples': len(df_post)
+        'post_burnin_samples': len(df_post),
+        'ess': diagnostics['ess'].to_dict(),
+        'converged': converged,
+        'clades': clades,
+        'divergences': divergences
     }
     
     return df_post, summary
 
+def divergence_table(trees, clades):
+    """Mean, median, 95% HPD and monophyly probability of each clade's age."""
+    
+    ages, monophyletic = clade_ages(trees, clades)
+    intervals = hpd_intervals(ages, [0.95])[0]
+    
+    return pd.DataFrame({
+        'mean': ages.mean(axis=0),
+        'median': np.median(ages, axis=0),
+        'hpd_lower': intervals[:, 0],
+        'hpd_upper': intervals[:, 1],
+        'monophyly': monophyletic.mean(axis=0)
+    }, index=list(clades))
+
 def create_publication_plots(df, df_post, mean_age, hpd_lower, hpd_upper):
     """Create publication-quality plots."""
     
     fig = plt.figure(figsize=(16, 12))
     gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
+    burnin = len(df) - len(df_post)
     
     # 1. Posterior trace
     ax1 = fig.add_subplot(gs[0, :2])
     ax1.plot(df['posterior'], alpha=0.5, linewidth=0.3, color='steelblue')
-    ax1.axvline(len(df)*0.1, color='red', linestyle='--', label='Burnin (10%)', linewidth=2)
+    ax1.axvline(burnin, color='red', linestyle='--', label=f'Burnin ({100*burnin/len(df):.0f}%)', linewidth=2)
     ax1.set_xlabel('MCMC Sample')
     ax1.set_ylabel('Log Posterior')
     ax1.set_title('A. MCMC Trace: Posterior', fontsize=12, fontweight='bold')
@@ -102,7 +161,7 @@ def create_publication_plots(df, df_post, mean_age, hpd_lower, hpd_upper):
     # 2. Likelihood trace
     ax2 = fig.add_subplot(gs[0, 2])
     ax2.plot(df['likelihood'], alpha=0.5, linewidth=0.3, color='darkgreen')
-    ax2.axvline(len(df)*0.1, color='red', linestyle='--', linewidth=2)
+    ax2.axvline(burnin, color='red', linestyle='--', linewidth=2)
     ax2.set_xlabel('MCMC Sample')
     ax2.set_ylabel('Log Likelihood')
     ax2.set_title('B. Likelihood Trace', fontsize=12, fontweight='bold')
@@ -111,7 +170,7 @@ def create_publication_plots(df, df_post, mean_age, hpd_lower, hpd_upper):
     # 3. Tree Height trace (Proto-Dravidian age)
     ax3 = fig.add_subplot(gs[1, :2])
     ax3.plot(df['Tree.height'], alpha=0.5, linewidth=0.3, color='darkred')
-    ax3.axvline(len(df)*0.1, color='red', linestyle='--', linewidth=2)
+    ax3.axvline(burnin, color='red', linestyle='--', linewidth=2)
     ax3.axhline(4.65, color='blue', linestyle=':', label='Kolipakam et al. (2018): 4.65 kya', linewidth=2)
     ax3.set_xlabel('MCMC Sample')
     ax3.set_ylabel('Age (kya)')
@@ -135,7 +194,7 @@ def create_publication_plots(df, df_post, mean_age, hpd_lower, hpd_upper):
     # 5. Clock Rate trace
     ax5 = fig.add_subplot(gs[2, 0])
     ax5.plot(df['ucldMean'], alpha=0.5, linewidth=0.3, color='purple')
-    ax5.axvline(len(df)*0.1, color='red', linestyle='--', linewidth=2)
+    ax5.axvline(burnin, color='red', linestyle='--', linewidth=2)
     ax5.set_xlabel('MCMC Sample')
     ax5.set_ylabel('Clock Rate')
     ax5.set_title('E. Relaxed Clock Mean', fontsize=12, fontweight='bold')
@@ -144,7 +203,7 @@ def create_publication_plots(df, df_post, mean_age, hpd_lower, hpd_upper):
     # 6. Birth Rate
     ax6 = fig.add_subplot(gs[2, 1])
     ax6.plot(df['birthRate'], alpha=0.5, linewidth=0.3, color='green')
-    ax6.axvline(len(df)*0.1, color='red', linestyle='--', linewidth=2)
+    ax6.axvline(burnin, color='red', linestyle='--', linewidth=2)
     ax6.set_xlabel('MCMC Sample')
     ax6.set_ylabel('Birth Rate')
     ax6.set_title('F. Yule Birth Rate', fontsize=12, fontweight='bold')
@@ -153,7 +212,7 @@ def create_publication_plots(df, df_post, mean_age, hpd_lower, hpd_upper):
     # 7. Tree Length
     ax7 = fig.add_subplot(gs[2, 2])
     ax7.plot(df['Tree.treeLength'], alpha=0.5, linewidth=0.3, color='brown')
-    ax7.axvline(len(df)*0.1, color='red', linestyle='--', linewidth=2)
+    ax7.axvline(burnin, color='red', linestyle='--', linewidth=2)
     ax7.set_xlabel('MCMC Sample')
     ax7.set_ylabel('Tree Length')
     ax7.set_title('G. Total Tree Length', fontsize=12, fontweight='bold')
@@ -205,6 +264,6 @@ if __name__ == "__main__":
     print("ANALYSIS COMPLETE!")
     print(f"{'='*70}")
     print("\nNext steps:")
-    print("1. Visualize tree: treeannotator + FigTree")
+    print(f"1. Visualize tree: open {MCC_FILE} in FigTree")
     print("2. Check trace files in Tracer")
     print("3. Write up results!")
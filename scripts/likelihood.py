@@ -0,0 +1,377 @@
+# scripts/likelihood.py
+"""
+Felsenstein-pruning likelihood for binary cognate data.
+
+Implements the substitution models of the Dravidian analyses:
+
+    mutation_death   BEAST's MutationDeathModel (shipped XMLs): state 0 is
+                     lost at rate deathprob, state 1 is absorbing, root in 0
+    binary_ctmc      two-state reversible CTMC (BEASTling binaryctmc)
+    binary_covarion  BEAST's BinaryCovarion (config/dravidian.conf,
+                     drav_cov_est_ucln_yule.xml): visible 0/1 times a hidden
+                     slow (rate alpha) / fast class with switching rate s
+
+Data come pattern-compressed from site_patterns (with its ascertainment
+correction), and all patterns and rate categories are pruned together as
+one batched matrix product per branch. Transition matrices are cached per
+branch length, so a proposal that changes one branch recomputes one
+matrix. Discrete gamma categories follow BEAST's SiteModel (quantiles at
+(2i+1)/2K, rescaled to mean 1).
+
+    python scripts/likelihood.py data/processed/dravidian_beastling.csv \\
+        --tree "((Tamil:1.2,Malayalam:1.2):0.8,(Kannada:1.5,Telugu:1.5):0.5);" --model covarion
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+# -- substitution models -------------------------------------------------
+
+def _eigen_model(name, Q, frequencies, tip_partials):
+    """Model dict whose P(t) = V exp(Lambda t) V^-1 from one eigendecomposition."""
+
+    eigenvalues, vectors = np.linalg.eig(Q)
+    if np.abs(eigenvalues.imag).max() > 1e-10:
+        raise ValueError(f"{name}: complex eigenvalues")
+    eigenvalues, vectors = eigenvalues.real, vectors.real
+    inverse = np.linalg.inv(vectors)
+
+    def transition(t):
+        t = np.asarray(t, dtype=float)
+        # (..., S, S) = V diag(exp(l t)) V^-1 for every t at once
+        scaled = vectors * np.exp(np.multiply.outer(t, eigenvalues))[..., None, :]
+        return np.maximum(scaled @ inverse, 0.0)
+
+    return {
+        'name': name,
+        'Q': Q,
+        'frequencies': np.asarray(frequencies, dtype=float),
+        'tip_partials': tip_partials,
+        'transition': transition,
+    }
+
+def normalize(Q, frequencies):
+    """Scale a rate matrix to one expected transition per unit time."""
+    Q = Q - np.diag(Q.sum(axis=1))
+    return Q / -(frequencies @ np.diag(Q))
+
+# Observed state (row; last row = missing '?') -> partial likelihood
+BINARY_TIPS = np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+COVARION_TIPS = np.array([[1.0, 0.0, 1.0, 0.0], [0.0, 1.0, 0.0, 1.0], [1.0, 1.0, 1.0, 1.0]])
+
+def mutation_death(death_prob=0.1):
+    """
+    BEAST's MutationDeathModel with two states and frequencies (1, 0).
+
+    P(t) = [[exp(-d t), 1 - exp(-d t)], [0, 1]].
+    """
+
+    def transition(t):
+        alive = np.exp(-death_prob * np.asarray(t, dtype=float))
+        P = np.zeros(alive.shape + (2, 2))
+        P[..., 0, 0] = alive
+        P[..., 0, 1] = 1 - alive
+        P[..., 1, 1] = 1.0
+        return P
+
+    return {
+        'name': 'mutationdeath',
+        'Q': np.array([[-death_prob, death_prob], [0.0, 0.0]]),
+        'frequencies': np.array([1.0, 0.0]),
+        'tip_partials': BINARY_TIPS,
+        'transition': transition,
+    }
+
+def binary_ctmc(frequencies=(0.5, 0.5)):
+    """Two-state CTMC with equilibrium frequencies, normalised to rate 1."""
+    frequencies = np.asarray(frequencies, dtype=float)
+    Q = normalize(np.array([[0.0, frequencies[1]], [frequencies[0], 0.0]]), frequencies)
+    return _eigen_model('ctmc', Q, frequencies, BINARY_TIPS)
+
+def binary_covarion(alpha=0.5, switch_rate=0.5, frequencies=(0.5, 0.5),
+                    hidden_frequencies=(0.5, 0.5), mode='BEAST'):
+    """
+    BEAST's BinaryCovarion: states (0 slow, 1 slow, 0 fast, 1 fast).
+
+    Visible changes happen at rate alpha * p in the slow class and p in
+    the fast class. The hidden class switches at rate s in BEAST mode (the
+    default), or s * h of the target class in REVERSIBLE mode. Frequencies
+    are p x h, and Q is normalised like GeneralSubstitutionModel (switches
+    included).
+    """
+
+    p0, p1 = frequencies
+    h0, h1 = hidden_frequencies
+    to_slow, to_fast = (switch_rate * h0, switch_rate * h1) if mode == 'REVERSIBLE' \
+        else (switch_rate, switch_rate)
+    Q = np.array([
+        [0.0, alpha * p1, to_fast, 0.0],
+        [alpha * p0, 0.0, 0.0, to_fast],
+        [to_slow, 0.0, 0.0, p1],
+        [0.0, to_slow, p0, 0.0],
+    ])
+    pi = np.array([p0 * h0, p1 * h0, p0 * h1, p1 * h1])
+    return _eigen_model('covarion', normalize(Q, pi), pi, COVARION_TIPS)
+
+MODELS = {
+    'mutationdeath': mutation_death,
+    'ctmc': binary_ctmc,
+    'covarion': binary_covarion,
+}
+
+# -- rate heterogeneity ---------------------------------------------------
+
+def _gamma_p(a, x):
+    """Regularised lower incomplete gamma P(a, x) (series / continued fraction)."""
+    if x <= 0:
+        return 0.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-16:
+            n += 1
+            term *= x / n
+            total += term
+        return total * math.exp(log_prefix)
+
+    # Lentz's continued fraction for Q(a, x)
+    b = x + 1 - a
+    c, d = 1e300, 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = 1 / (d if abs(d) > 1e-300 else 1e-300)
+        c = b + an / c
+        c = c if abs(c) > 1e-300 else 1e-300
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-16:
+            break
+    return 1.0 - h * math.exp(log_prefix)
+
+def gamma_quantile(p, shape, scale=1.0):
+    """Quantile of a Gamma(shape, scale) distribution (Newton with bisection)."""
+
+    # Wilson-Hilferty starting point
+    z = math.sqrt(2) * _erfinv(2 * p - 1)
+    x = max(shape * (1 - 1 / (9 * shape) + z / (3 * math.sqrt(shape))) ** 3, 1e-12)
+    lo, hi = 0.0, math.inf
+    for _ in range(200):
+        f = _gamma_p(shape, x) - p
+        if f > 0:
+            hi = x
+        else:
+            lo = x
+        density = math.exp((shape - 1) * math.log(x) - x - math.lgamma(shape))
+        step = f / density if density > 0 else math.inf
+        new = x - step
+        if not (lo < new < hi):
+            new = (lo + hi) / 2 if math.isfinite(hi) else 2 * x
+        if abs(new - x) <= 1e-14 * max(x, 1e-300):
+            x = new
+            break
+        x = new
+    return x * scale
+
+def _erfinv(y):
+    """Inverse error function (Giles' approximation refined by Newton steps)."""
+    w = -math.log((1 - y) * (1 + y))
+    if w < 5:
+        w -= 2.5
+        coeffs = [2.81022636e-08, 3.43273939e-07, -3.5233877e-06, -4.39150654e-06,
+                  0.00021858087, -0.00125372503, -0.00417768164, 0.246640727, 1.50140941]
+    else:
+        w = math.sqrt(w) - 3
+        coeffs = [-0.000200214257, 0.000100950558, 0.00134934322, -0.00367342844,
+                  0.00573950773, -0.0076224613, 0.00943887047, 1.00167406, 2.83297682]
+    x = 0.0
+    for c in coeffs:
+        x = x * w + c
+    x *= y
+    for _ in range(2):
+        x -= (math.erf(x) - y) / (2 / math.sqrt(math.pi) * math.exp(-x * x))
+    return x
+
+def site_rates(gamma_shape=None, categories=1, proportion_invariant=0.0):
+    """
+    Category rates and weights of BEAST's SiteModel.
+
+    Gamma categories take the Gamma(shape, 1/shape) quantile at the middle
+    of each of `categories` equal-probability bins, rescaled to mean 1.
+    """
+
+    if gamma_shape is None or categories <= 1:
+        rates = np.ones(1)
+    else:
+        rates = np.array([gamma_quantile((2 * i + 1) / (2 * categories), gamma_shape, 1 / gamma_shape)
+                          for i in range(categories)])
+        rates /= rates.mean()
+    weights = np.full(len(rates), (1 - proportion_invariant) / len(rates))
+    if proportion_invariant > 0:
+        rates = rates / (1 - proportion_invariant)
+    return rates, weights
+
+# -- pruning ---------------------------------------------------------------
+
+# Partials are rescaled at every internal node above this many taxa
+RESCALE_TIPS = 24
+
+class TransitionCache:
+    """
+    P(t) matrices of one model and site-rate set, reused per branch.
+
+    The last few branch-length vectors and their matrix stacks are kept;
+    a new tree starts from the closest one and recomputes only the
+    branches whose length changed (an MCMC move touches a few branches,
+    and a rejected move returns to the previous tree).
+    """
+
+    def __init__(self, model, rates=(1.0,), slots=2):
+        self.model = model
+        self.rates = np.asarray(rates, dtype=float)
+        self.slots = slots
+        self._recent = []          # (lengths, P), most recent first
+
+    def __call__(self, lengths):
+        """Stack of P matrices: branches x categories x S x S."""
+        lengths = np.array(lengths, dtype=float)
+        best, changed = None, None
+        for i, (known, P) in enumerate(self._recent):
+            if known.shape == lengths.shape:
+                differs = known != lengths
+                if changed is None or differs.sum() < changed.sum():
+                    best, changed = i, differs
+        if best is None:
+            P = self.model['transition'](np.multiply.outer(lengths, self.rates))
+        else:
+            P = self._recent.pop(best)[1]
+            if changed.any():
+                P = P.copy()
+                P[changed] = self.model['transition'](np.multiply.outer(lengths[changed], self.rates))
+        self._recent.insert(0, (lengths, P))
+        del self._recent[self.slots:]
+        return P
+
+def site_log_likelihoods(parent, length, patterns, model, rates=(1.0,), rate_weights=(1.0,),
+                         proportion_invariant=0.0, cache=None):
+    """
+    Log-likelihood of each site pattern on one tree.
+
+    parent/length describe the tree as in beast_trees (tips first, in the
+    row order of patterns; children before parents; root last), with
+    branch lengths in expected substitutions. patterns is taxa x patterns
+    (-1 = missing).
+    """
+
+    parent = np.asarray(parent)
+    n_nodes = len(parent)
+    n_tips = (n_nodes + 1) // 2
+    cache = cache or TransitionCache(model, rates)
+    P = cache(np.asarray(length)[:-1])                     # branches x C x S x S
+
+    n_categories = len(cache.rates)
+    n_patterns = patterns.shape[1]
+    n_states = len(model['frequencies'])
+
+    # Tip messages: P applied to each observed state's partial vector,
+    # gathered for every tip and pattern at once (tips x C x patterns x S)
+    tip_messages = P[:n_tips] @ model['tip_partials'].T    # tips x C x S x observed
+    messages = tip_messages[np.arange(n_tips)[:, None], :, :, patterns].transpose(0, 2, 1, 3)
+    partials = np.ones((n_nodes - n_tips, n_categories, n_patterns, n_states))
+    for tip in range(n_tips):
+        partials[parent[tip] - n_tips] *= messages[tip]
+
+    log_scale = np.zeros(n_patterns)
+    rescale = n_tips > RESCALE_TIPS
+    for node in range(n_tips, n_nodes - 1):
+        partial = partials[node - n_tips]
+        if rescale:
+            # Keep deep trees away from underflow
+            scale = partial.max(axis=(0, 2))
+            partial /= scale[None, :, None]
+            log_scale += np.log(scale)
+        partials[parent[node] - n_tips] *= partial @ P[node].swapaxes(1, 2)
+
+    root = partials[-1] @ model['frequencies']             # C x patterns
+    site = np.asarray(rate_weights) @ root
+    if proportion_invariant > 0:
+        # Invariant sites: constant patterns at their state's frequency
+        observed = np.where(patterns >= 0, patterns, 0)
+        constant = (observed == observed[0]).all(axis=0)
+        site = site + proportion_invariant * constant * model['frequencies'][observed[0]]
+    return np.log(site) + log_scale
+
+def log_likelihood(parent, length, data, model, rates=(1.0,), rate_weights=(1.0,),
+                   proportion_invariant=0.0, cache=None):
+    """
+    Log-likelihood of a site_patterns dataset on one tree, conditioned on
+    the sites not being any of its excluded (unobservable) patterns.
+    """
+
+    n_patterns = len(data['weights'])
+    patterns = data['patterns']
+    if data['excluded'].size:
+        patterns = np.concatenate([patterns, data['excluded']], axis=1)
+    values = site_log_likelihoods(parent, length, patterns, model, rates, rate_weights,
+                                  proportion_invariant, cache)
+    total = data['weights'] @ values[:n_patterns]
+    if n_patterns < len(values):
+        total -= data['weights'].sum() * np.log1p(-np.exp(values[n_patterns:]).sum())
+    return float(total)
+
+def model_from_settings(settings):
+    """Substitution model and site rates for beast_xml-style settings."""
+    substitution = settings.get('substitution', 'mutationdeath')
+    if substitution == 'mutationdeath':
+        model = mutation_death(settings.get('death_prob', 0.1))
+    else:
+        model = MODELS[substitution]()
+    categories = settings.get('gamma_categories', 0)
+    rates, weights = site_rates(settings.get('gamma_shape', 1.0) if categories else None, categories)
+    return model, rates, weights
+
+def main(argv=None):
+    from beast_trees import parse_newick
+    from cognate_matrix import load_matrix
+    from site_patterns import ASCERTAINMENT, n_sites, site_patterns
+
+    parser = argparse.ArgumentParser(description="Score a tree against the binary cognate matrix.")
+    parser.add_argument("data", help="wide binary CSV or packed .npz")
+    parser.add_argument("--tree", required=True, help="Newick tree (branch lengths in substitutions)")
+    parser.add_argument("--model", choices=sorted(MODELS), default="mutationdeath")
+    parser.add_argument("--gamma-categories", type=int, default=0)
+    parser.add_argument("--gamma-shape", type=float, default=1.0)
+    parser.add_argument("--ascertainment", choices=ASCERTAINMENT,
+                        help="condition on no all-absent (or constant) sites")
+    args = parser.parse_args(argv)
+
+    data = site_patterns(load_matrix(args.data), args.ascertainment)
+    taxa = list(data['taxa'])
+    parent, length, _ = parse_newick(args.tree, {name: i for i, name in enumerate(taxa)})
+
+    model, rates, rate_weights = model_from_settings({
+        'substitution': args.model,
+        'gamma_categories': args.gamma_categories,
+        'gamma_shape': args.gamma_shape,
+    })
+    cache = TransitionCache(model, rates)
+    value = log_likelihood(parent, length, data, model, rates, rate_weights, cache=cache)
+
+    repeats = 2000
+    start = time.perf_counter()
+    for _ in range(repeats):
+        log_likelihood(parent, length, data, model, rates, rate_weights, cache=cache)
+    elapsed = (time.perf_counter() - start) / repeats
+
+    print(f"✓ log-likelihood ({args.model}): {value:.6f}")
+    print(f"  {len(taxa)} taxa, {n_sites(data)} sites, {len(data['weights'])} patterns, "
+          f"{1e6 * elapsed:.0f} µs per evaluation")
+
+if __name__ == "__main__":
+    main()
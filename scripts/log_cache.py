@@ -0,0 +1,103 @@
+# scripts/log_cache.py
+"""
+Columnar binary cache for BEAST trace logs.
+
+The first load of a .log parses it once and stores every column as its own
+.npy file in <log>.cache/, with a meta.json recording the log's size and
+mtime. Later loads memory-map only the requested columns, and the cache is
+rebuilt automatically when the log changes:
+
+    python scripts/log_cache.py results/sensitivity/*/*.log
+"""
+
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from beast_log import read_log
+
+def cache_path(log_file):
+    """results/x.log -> results/x.log.cache/"""
+    return Path(f"{log_file}.cache")
+
+def _signature(log_file):
+    stat = os.stat(log_file)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _file_name(i, column):
+    """Column file name: position plus a filesystem-safe version of the name."""
+    return f"{i:03d}_{re.sub(r'[^A-Za-z0-9_.-]', '_', column)}.npy"
+
+def read_meta(log_file):
+    """Return the cache metadata if the cache matches the log, else None."""
+    meta_file = cache_path(log_file) / "meta.json"
+    if not meta_file.exists():
+        return None
+    meta = json.loads(meta_file.read_text())
+    return meta if meta['source'] == _signature(log_file) else None
+
+def build_cache(log_file):
+    """Parse a log once and write one .npy per column (atomically)."""
+
+    signature = _signature(log_file)
+    df = read_log(log_file)
+
+    cache = cache_path(log_file)
+    tmp = cache.with_name(cache.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    files = {}
+    for i, column in enumerate(df.columns):
+        files[column] = _file_name(i, column)
+        np.save(tmp / files[column], df[column].to_numpy())
+
+    meta = {'source': signature, 'n_samples': len(df), 'columns': files}
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    shutil.rmtree(cache, ignore_errors=True)
+    tmp.rename(cache)
+    return meta
+
+def load_columns(log_file, columns=None):
+    """
+    Column name -> read-only memory-mapped array.
+
+    Only the requested columns are opened; the cache is (re)built first if
+    it is missing or older than the log.
+    """
+
+    meta = read_meta(log_file) or build_cache(log_file)
+    names = columns or list(meta['columns'])
+    missing = [name for name in names if name not in meta['columns']]
+    if missing:
+        raise KeyError(f"{log_file} has no column(s) {', '.join(missing)}")
+
+    cache = cache_path(log_file)
+    return {name: np.load(cache / meta['columns'][name], mmap_mode='r') for name in names}
+
+def load_log(log_file, columns=None):
+    """The requested columns of a log as a DataFrame (via the cache)."""
+    return pd.DataFrame(load_columns(log_file, columns))
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/log_cache.py LOG [LOG ...]")
+        sys.exit(1)
+
+    for log_file in sys.argv[1:]:
+        start = time.time()
+        meta = read_meta(log_file) or build_cache(log_file)
+        built = time.time() - start
+
+        start = time.time()
+        load_columns(log_file, list(meta['columns'])[:1])
+        print(f"✓ {log_file}: {meta['n_samples']} samples x {len(meta['columns'])} columns "
+              f"(cache {built:.2f}s, load {1000 * (time.time() - start):.1f} ms)")
@@ -0,0 +1,296 @@
+# scripts/marginal_likelihood.py
+"""
+Marginal likelihoods and Bayes factors between model configurations.
+
+Each configuration is run as K + 1 power-posterior steps, prior x
+likelihood^beta with beta_k = (k / K)^(1 / alpha) (BEAST's
+MODEL_SELECTION schedule, alpha = 0.3), and the log marginal likelihood
+is estimated from the likelihoods each step sampled:
+
+    path sampling      sum_k (beta_k+1 - beta_k) (E_k[log L] + E_k+1[log L]) / 2
+    stepping stone     sum_k log E_k[L^(beta_k+1 - beta_k)]
+
+Steps are independent, so they run in parallel: as BEAST jobs through
+run_beast_jobs (one PathSamplingStep XML per step), or in-process with
+mcmc.Chain on a process pool (--in-process, same model as mcmc.py).
+Every step is keyed by a hash of its content (the step XML, or the
+in-process settings, beta, length and seed): re-running the command
+skips finished steps, resumes interrupted BEAST jobs, and shares steps
+between comparisons that contain the same configuration.
+
+    python scripts/marginal_likelihood.py --config config/dravidian.conf \\
+        --compare substitution=covarion,ctmc --compare tree_prior=yule,birthdeath \\
+        --compare clock=relaxed,strict --steps 24 --step-length 1000000 --cpus 8
+    python scripts/marginal_likelihood.py --in-process --compare clock=relaxed,strict \\
+        --steps 16 --step-length 200000
+
+Marginal likelihoods need proper priors: unbounded Uniform(0, inf)
+priors (the Yule birth rate) are given the birth-death model's upper
+bound in the step XMLs.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from beast_xml import DEFAULT_SETTINGS, generate_xml, parse_grid_values, settings_from_config
+from cognate_matrix import load_matrix
+from log_cache import load_columns
+
+OUTPUT_DIR = Path("results/marginal_likelihood")
+STEP_SPEC = "modelselection.inference.PathSamplingStep"
+ALPHA = 0.3
+BURNIN = 0.5                    # BEAST's burnInPercentage default
+PROPER_UPPER = 1000.0           # upper bound given to Uniform(0, inf) priors
+
+def step_betas(n_steps, alpha=ALPHA):
+    """Powers 0 = beta_0 < ... < beta_K = 1, quantiles of Beta(alpha, 1)."""
+    return (np.arange(n_steps + 1) / n_steps) ** (1 / alpha)
+
+def content_key(text):
+    return hashlib.sha256(text.encode()).hexdigest()[:12]
+
+def make_proper(xml, upper=PROPER_UPPER):
+    """
+    Bound Uniform(0, inf) priors on parameters that have no upper bound of
+    their own (bounded ones already integrate to a constant). Returns the
+    XML and the ids of the priors changed.
+    """
+
+    bounded = {match.group(1) for match in re.finditer(
+        r'<parameter id="([^"]+)"[^>]*\supper="(?!Infinity)[^"]+"', xml)}
+    changed = []
+
+    def bound(match):
+        if match.group(2) in bounded:
+            return match.group(0)
+        changed.append(match.group(1))
+        return match.group(0).replace('upper="Infinity"', f'upper="{upper:g}"')
+
+    xml = re.sub(r'<prior id="([^"]+)" name="distribution" x="@([^"]+)">\s*<Uniform [^>]*upper="Infinity"',
+                 bound, xml)
+    return xml, changed
+
+# -- configurations --------------------------------------------------------
+
+def configurations(base, comparisons):
+    """
+    Settings of every configuration: comparisons maps a setting to the
+    values to compare, each varied alone from base. Returns
+    ({label: settings}, {setting: [labels]}).
+    """
+
+    configs, groups = {}, {}
+    for key, values in comparisons.items():
+        groups[key] = []
+        for value in values:
+            settings = {**base, key: value}
+            label = f"{key}={value}"
+            configs[label] = settings
+            groups[key].append(label)
+    return configs, groups
+
+# -- BEAST steps -----------------------------------------------------------
+
+def write_steps(configs, betas, step_length, output_dir=OUTPUT_DIR, matrix=None):
+    """
+    Write one PathSamplingStep XML per configuration and beta, named by a
+    hash of its content (identical steps are written once). Returns
+    {label: [xml path per beta]}.
+    """
+
+    xml_dir = Path(output_dir) / "xml"
+    xml_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for label, settings in configs.items():
+        s = {**DEFAULT_SETTINGS, **settings, 'chain_length': step_length, 'sample_from_prior': False}
+        data = matrix if matrix is not None else load_matrix(s['data'])
+        paths[label] = []
+        for beta in betas:
+            xml = generate_xml(s, data, run_spec=STEP_SPEC, run_attributes={'beta': f"{beta:.10g}"})
+            xml, changed = make_proper(xml)
+            if changed and beta == betas[0]:
+                print(f"  ⚠ {label}: improper {', '.join(changed)} bounded at {PROPER_UPPER:g}")
+            path = xml_dir / f"step_{content_key(xml)}.xml"
+            if not path.exists():
+                path.write_text(xml)
+            paths[label].append(path)
+    return paths
+
+def run_beast_steps(paths, output_dir=OUTPUT_DIR, cpus=None, threads=1, beast="beast", beagle=True):
+    """Run every distinct step XML through run_beast_jobs; returns {xml: log path}."""
+
+    from run_beast_jobs import plan_jobs, run_jobs
+
+    xmls = sorted({path for steps in paths.values() for path in steps})
+    jobs = plan_jobs(xmls, Path(output_dir) / "steps", threads=threads)
+    manifest = run_jobs(jobs, Path(output_dir) / "manifest.json", cpus, beast, beagle)
+    logs = {}
+    for job in jobs.values():
+        status = manifest['jobs'][Path(job['xml']).stem]['status']
+        if status == 'done':
+            logs[Path(job['xml'])] = Path(job['workdir']) / f"{Path(job['xml']).stem}.log"
+    return logs
+
+# -- in-process steps ------------------------------------------------------
+
+def _in_process_step(args):
+    settings, beta, step_length, log_every, seed, path = args
+    from mcmc import Chain, run_chain
+
+    chain = Chain(settings, seed=seed)
+    chain.power = beta
+    prefix = path.with_suffix('')
+    _, log_path, trees_path = run_chain(settings, prefix, step_length, log_every, seed, chain, quiet=True)
+    likelihood = np.asarray(load_columns(log_path, ['likelihood'])['likelihood'], dtype=float)
+    tmp = path.with_suffix('.tmp.npy')
+    np.save(tmp, likelihood)
+    tmp.replace(path)
+    for p in (log_path, trees_path):
+        p.unlink()
+    return path
+
+def run_in_process_steps(configs, betas, step_length, log_every, seed=1, output_dir=OUTPUT_DIR,
+                         processes=None):
+    """
+    Run every step with mcmc.Chain on a process pool. Each step's
+    likelihood trace is cached as <hash>.npy (of the settings, data file,
+    beta, length and seed); returns {label: [paths]}.
+    """
+
+    step_dir = Path(output_dir) / "in_process"
+    step_dir.mkdir(parents=True, exist_ok=True)
+    paths, todo = {}, {}
+    for label, settings in configs.items():
+        s = {**DEFAULT_SETTINGS, **settings, 'sample_from_prior': False}
+        data_key = hashlib.sha256(Path(s['data']).read_bytes()).hexdigest()
+        paths[label] = []
+        for beta in betas:
+            spec = json.dumps({'settings': s, 'data': data_key, 'beta': float(beta), 'length': step_length,
+                               'log_every': log_every, 'seed': seed}, sort_keys=True, default=str)
+            path = step_dir / f"step_{content_key(spec)}.npy"
+            paths[label].append(path)
+            if not path.exists():
+                todo[path] = (s, float(beta), step_length, log_every, seed, path)
+
+    print(f"Running {len(todo)} in-process steps ({sum(map(len, paths.values())) - len(todo)} cached)...")
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+        for path in pool.map(_in_process_step, todo.values()):
+            print(f"  ✓ {path.name}")
+    return paths
+
+# -- estimators ------------------------------------------------------------
+
+def _logsumexp(x):
+    m = x.max()
+    return m + math.log(np.exp(x - m).sum())
+
+def path_sampling(betas, likelihoods):
+    """Thermodynamic integration of E_beta[log L] (trapezoid rule)."""
+    means = np.array([np.mean(l) for l in likelihoods])
+    return float(np.sum(np.diff(betas) * (means[1:] + means[:-1]) / 2))
+
+def stepping_stone(betas, likelihoods):
+    """Product of importance-sampled ratios between consecutive steps (Xie et al. 2011)."""
+    return float(sum(_logsumexp(d * np.asarray(l)) - math.log(len(l))
+                     for d, l in zip(np.diff(betas), likelihoods[:-1])))
+
+def estimate(betas, likelihoods, burnin=BURNIN):
+    """Both estimates from per-step likelihood traces (burn-in dropped from each)."""
+    kept = [np.asarray(l, dtype=float)[int(len(l) * burnin):] for l in likelihoods]
+    return {'path_sampling': path_sampling(betas, kept), 'stepping_stone': stepping_stone(betas, kept)}
+
+def interpret(log_bf):
+    """Kass & Raftery (1995) scale on 2 ln BF."""
+    x = 2 * abs(log_bf)
+    return ("not worth more than a mention" if x < 2 else "positive" if x < 6
+            else "strong" if x < 10 else "very strong")
+
+def bayes_factors(results, groups, estimator='stepping_stone'):
+    """ln BF of each configuration against the first of its comparison."""
+    rows = []
+    for key, labels in groups.items():
+        reference = labels[0]
+        for label in labels[1:]:
+            log_bf = results[label][estimator] - results[reference][estimator]
+            rows.append((key, label, reference, log_bf))
+    return rows
+
+def print_results(results, groups):
+    print(f"\n{'Configuration':<32} {'Path sampling':>15} {'Stepping stone':>15}")
+    print("-" * 64)
+    for label, res in results.items():
+        print(f"{label:<32} {res['path_sampling']:>15.3f} {res['stepping_stone']:>15.3f}")
+
+    print(f"\n{'Comparison':<44} {'ln BF':>8}  Evidence")
+    print("-" * 70)
+    for key, label, reference, log_bf in bayes_factors(results, groups):
+        winner = label if log_bf > 0 else reference
+        print(f"{label + ' vs ' + reference:<44} {log_bf:>8.2f}  {interpret(log_bf)} for {winner}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Marginal likelihoods and Bayes factors by power posteriors.")
+    parser.add_argument("--config", help="BEASTling .conf for the base settings")
+    parser.add_argument("--compare", action="append", default=[], metavar="KEY=VALUES",
+                        help="setting to compare, e.g. substitution=covarion,ctmc (repeatable)")
+    parser.add_argument("--steps", type=int, default=24, help="K: K + 1 powers from 0 to 1")
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--step-length", type=int, default=1_000_000)
+    parser.add_argument("--log-every", type=int, default=1000)
+    parser.add_argument("--burnin", type=float, default=BURNIN, help="fraction dropped from each step")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--in-process", action="store_true", help="run steps with mcmc.Chain, not BEAST")
+    parser.add_argument("--cpus", type=int, help="total thread budget / processes")
+    parser.add_argument("--threads", type=int, default=1, help="BEAST threads per step")
+    parser.add_argument("--beast", default="beast", help="BEAST executable")
+    parser.add_argument("--no-beagle", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the estimates here")
+    args = parser.parse_args(argv)
+
+    base = settings_from_config(args.config) if args.config else {}
+    base['log_every'] = args.log_every
+    comparisons = {}
+    for spec in args.compare or ["clock=relaxed,strict"]:
+        key, values = spec.split('=', 1)
+        comparisons[key.replace('-', '_')] = parse_grid_values(values)
+    configs, groups = configurations(base, comparisons)
+    betas = step_betas(args.steps, args.alpha)
+
+    print("=" * 70)
+    print(f"MARGINAL LIKELIHOODS: {len(configs)} configurations x {len(betas)} steps "
+          f"of {args.step_length:,} states")
+    print("=" * 70)
+
+    if args.in_process:
+        paths = run_in_process_steps(configs, betas, args.step_length, args.log_every, args.seed,
+                                     args.output_dir, args.cpus)
+        traces = {label: [np.load(p) for p in steps] for label, steps in paths.items()}
+    else:
+        paths = write_steps(configs, betas, args.step_length, args.output_dir)
+        logs = run_beast_steps(paths, args.output_dir, args.cpus, args.threads, args.beast,
+                               not args.no_beagle)
+        traces = {}
+        for label, steps in paths.items():
+            if all(p in logs for p in steps):
+                traces[label] = [load_columns(logs[p], ['likelihood'])['likelihood'] for p in steps]
+            else:
+                print(f"  ✗ {label}: steps unfinished (rerun the same command to resume)")
+
+    results = {label: estimate(betas, trace, args.burnin) for label, trace in traces.items()}
+    complete = {key: labels for key, labels in groups.items() if all(l in results for l in labels)}
+    print_results(results, complete)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'betas': betas.tolist(), 'results': results}, indent=2))
+        print(f"\n✓ Saved: {args.json}")
+
+if __name__ == "__main__":
+    main()
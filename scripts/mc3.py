@@ -0,0 +1,319 @@
+# scripts/mc3.py
+"""
+Several in-process chains at once (mcmc.Chain), one process per chain.
+
+Two modes:
+
+    replicates   independent chains on a process pool, for R-hat; their
+                 post-burn-in samples are combined into one log
+    heated       Metropolis-coupled MCMC (MC3): chain k targets the
+                 posterior to the power 1 / (1 + k * delta); every
+                 --swap-every states all chains meet at a barrier, publish
+                 their posteriors in shared memory and propose one swap of
+                 adjacent temperatures. Only the cold chain is logged.
+
+Either way the output is a single BEAST-compatible PREFIX.log and
+PREFIX-<name>.trees (LogCombiner layout: Sample renumbered in order);
+the per-chain PREFIX_k files are removed once merged:
+
+    python scripts/mc3.py results/mcmc/replicates --chains 4 --chain-length 1000000
+    python scripts/mc3.py results/mcmc/tight_mc3 --chains 4 --heated --root-sigma 0.5
+"""
+
+import argparse
+import math
+import multiprocessing as mp
+import os
+import queue as queue_module
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from beast_log import read_log
+from beast_xml import DEFAULT_SETTINGS
+from mcmc import Chain, output_paths, run_chain
+
+def temperatures(n_chains, delta=0.1):
+    """Incremental heating: T_k = 1 + k * delta (chain 0 is cold)."""
+    return [1.0 + delta * k for k in range(n_chains)]
+
+def _chain_prefix(prefix, index):
+    prefix = Path(prefix)
+    return prefix.with_name(f"{prefix.name}_{index + 1}")
+
+# -- merging -----------------------------------------------------------------
+
+def merge_logs(paths, output, burnin=0.0, log_every=None):
+    """
+    Concatenate trace logs (dropping a burn-in fraction of each) into one
+    log with Sample renumbered 0, log_every, 2 * log_every, ...
+    """
+
+    frames = []
+    for path in paths:
+        df = read_log(path)
+        frames.append(df.iloc[int(len(df) * burnin):])
+    merged = np.concatenate([df.to_numpy() for df in frames])
+    columns = list(frames[0].columns)
+    if log_every is None:
+        samples = frames[0]['Sample'].to_numpy()
+        log_every = int(samples[1] - samples[0]) if len(samples) > 1 else 1
+    merged[:, columns.index('Sample')] = np.arange(len(merged)) * log_every
+
+    with open(output, 'w') as f:
+        f.write(f"# Combined from {', '.join(str(p) for p in paths)}\n")
+        f.write("\t".join(columns) + "\n")
+        for row in merged:
+            f.write(f"{int(row[0])}\t" + "\t".join(repr(float(v)) for v in row[1:]) + "\n")
+    return len(merged)
+
+TREE_LINE = re.compile(r"^tree\s+STATE_(\d+)\s*=\s*(.*)$")
+
+def _tree_lines(path):
+    """(header, [(state, newick), ...]) of a trees file written by mcmc."""
+    header, trees = [], []
+    with open(path) as f:
+        for line in f:
+            match = TREE_LINE.match(line.strip())
+            if match:
+                trees.append((int(match.group(1)), match.group(2)))
+            elif not trees and not line.strip().lower().startswith('end;'):
+                header.append(line)
+    return "".join(header), trees
+
+def merge_trees(paths, output, burnin=0.0, log_every=1):
+    """Trees counterpart of merge_logs."""
+
+    header, merged = None, []
+    for path in paths:
+        file_header, trees = _tree_lines(path)
+        header = header or file_header
+        merged.extend(newick for _, newick in trees[int(len(trees) * burnin):])
+    with open(output, 'w') as f:
+        f.write(header)
+        for i, newick in enumerate(merged):
+            f.write(f"tree STATE_{i * log_every} = {newick}\n")
+        f.write("End;\n")
+    return len(merged)
+
+# -- independent replicates ------------------------------------------------
+
+def _replicate(args):
+    settings, prefix, chain_length, log_every, seed = args
+    chain, log_path, trees_path = run_chain(settings, prefix, chain_length, log_every, seed, quiet=True)
+    return str(log_path), str(trees_path), chain.acceptance()
+
+def run_replicates(settings, prefix, n_chains, chain_length, log_every, seed=None, processes=None):
+    """Run n_chains independent chains in a process pool; return their (log, trees) paths."""
+
+    seeds = np.random.SeedSequence(seed).generate_state(n_chains)
+    jobs = [(settings, _chain_prefix(prefix, i), chain_length, log_every, int(seeds[i]))
+            for i in range(n_chains)]
+    with ProcessPoolExecutor(max_workers=processes or min(n_chains, os.cpu_count())) as pool:
+        return list(pool.map(_replicate, jobs))
+
+# -- Metropolis coupling ---------------------------------------------------
+
+def _coupled_chain(rank, settings, prefix, n_chains, chain_length, log_every, swap_every,
+                   delta, seed, shm_name, barrier):
+    """
+    One member of the coupled chains. Every process draws the swap
+    proposals from the same seeded generator, so all of them reach the
+    same decision from the shared posteriors without further messages.
+    """
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    posterior = np.ndarray((n_chains,), dtype=float, buffer=shm.buf)
+    betas = [1 / t for t in temperatures(n_chains, delta)]
+    levels = list(range(n_chains))          # temperature level of each rank
+    swap_rng = np.random.default_rng(seed)
+    accepted = proposed = 0
+
+    chain = Chain(settings, seed=int(np.random.SeedSequence([seed, rank]).generate_state(1)[0]))
+    chain.beta = betas[rank]
+    log_path, trees_path = output_paths(_chain_prefix(prefix, rank), chain.settings['name'])
+    with open(log_path, 'w') as log, open(trees_path, 'w') as trees:
+        log.write(chain.log_header())
+        trees.write(chain.trees_header())
+        if rank == 0:
+            log.write(chain.log_line())
+            trees.write(chain.tree_line())
+
+        while chain.sample < chain_length:
+            for _ in range(min(swap_every, chain_length - chain.sample)):
+                chain.step()
+                chain.sample += 1
+                if chain.sample % log_every == 0 and levels[rank] == 0:
+                    log.write(chain.log_line())
+                    trees.write(chain.tree_line())
+
+            posterior[rank] = chain.values['posterior']
+            barrier.wait()
+            k = int(swap_rng.integers(n_chains - 1))
+            u = swap_rng.random()
+            i, j = levels.index(k), levels.index(k + 1)
+            log_alpha = (betas[k] - betas[k + 1]) * (posterior[j] - posterior[i])
+            proposed += 1
+            if log_alpha >= 0 or u < math.exp(log_alpha):
+                levels[i], levels[j] = k + 1, k
+                accepted += 1
+            barrier.wait()
+            chain.beta = betas[levels[rank]]
+        trees.write("End;\n")
+
+    del posterior
+    shm.close()
+    return accepted, proposed
+
+def _coupled_entry(queue, *args):
+    try:
+        queue.put((args[0], _coupled_chain(*args)))
+    except BaseException as error:
+        queue.put((args[0], error))
+        raise
+
+def run_coupled(settings, prefix, n_chains, chain_length, log_every, swap_every=100, delta=0.1, seed=None):
+    """
+    Run n_chains Metropolis-coupled chains, one process each, writing
+    each one's cold-chain samples to PREFIX_k (see merge_coupled). Returns
+    the swap acceptance rate. If a chain fails, the others are stopped
+    (the barrier is aborted) and its error is raised here.
+    """
+
+    seed = int(np.random.SeedSequence(seed).generate_state(1)[0])
+    shm = shared_memory.SharedMemory(create=True, size=8 * n_chains)
+    barrier = mp.Barrier(n_chains)
+    queue = mp.Queue()
+    workers = []
+    try:
+        workers = [mp.Process(target=_coupled_entry,
+                              args=(queue, rank, settings, prefix, n_chains, chain_length, log_every,
+                                    swap_every, delta, seed, shm.name, barrier))
+                   for rank in range(n_chains)]
+        for worker in workers:
+            worker.start()
+        results = {}
+        while len(results) < n_chains:
+            try:
+                rank, result = queue.get(timeout=1.0)
+            except queue_module.Empty:
+                for rank, worker in enumerate(workers):
+                    if worker.exitcode not in (None, 0) and rank not in results:
+                        raise RuntimeError(f"Coupled chain {rank} exited with status {worker.exitcode}")
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            results[rank] = result
+        for worker in workers:
+            worker.join()
+    except BaseException:
+        barrier.abort()
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+        raise
+    finally:
+        shm.close()
+        shm.unlink()
+
+    accepted, proposed = results[0]
+    return accepted / proposed if proposed else 0.0
+
+def merge_coupled(prefix, n_chains, name):
+    """Interleave the cold-chain rows written by each coupled process, by Sample."""
+
+    parts = [output_paths(_chain_prefix(prefix, rank), name) for rank in range(n_chains)]
+    log_path, trees_path = output_paths(prefix, name)
+
+    rows, header = [], None
+    for part_log, _ in parts:
+        with open(part_log) as f:
+            header = next(f)
+            rows.extend(f)
+    rows.sort(key=lambda line: int(line.split('\t', 1)[0]))
+    with open(log_path, 'w') as f:
+        f.write(f"# Cold chain of {n_chains} coupled chains\n")
+        f.write(header)
+        f.writelines(rows)
+
+    trees, tree_header = [], None
+    for _, part_trees in parts:
+        file_header, lines = _tree_lines(part_trees)
+        tree_header = tree_header or file_header
+        trees.extend(lines)
+    trees.sort()
+    with open(trees_path, 'w') as f:
+        f.write(tree_header)
+        f.writelines(f"tree STATE_{state} = {newick}\n" for state, newick in trees)
+        f.write("End;\n")
+
+    for part_log, part_trees in parts:
+        part_log.unlink()
+        part_trees.unlink()
+    return log_path, trees_path
+
+def main(argv=None):
+    from mcmc_diagnostics import diagnose, print_diagnostics
+    from log_cache import cache_path, load_columns
+
+    parser = argparse.ArgumentParser(description="Run replicate or Metropolis-coupled chains in parallel.")
+    parser.add_argument("output", help="output prefix: writes PREFIX.log and PREFIX-<name>.trees")
+    parser.add_argument("--chains", type=int, default=os.cpu_count())
+    parser.add_argument("--heated", action="store_true", help="Metropolis coupling instead of replicates")
+    parser.add_argument("--delta", type=float, default=0.1, help="temperature increment between chains")
+    parser.add_argument("--swap-every", type=int, default=100)
+    parser.add_argument("--burnin", type=float, default=0.1, help="replicates: fraction dropped from each")
+    parser.add_argument("--model", choices=("mutationdeath", "covarion", "ctmc"))
+    parser.add_argument("--root-sigma", type=float)
+    parser.add_argument("--chain-length", type=int, default=1_000_000)
+    parser.add_argument("--log-every", type=int, default=1000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    settings = {}
+    if args.model:
+        settings['substitution'] = args.model
+    if args.root_sigma is not None:
+        settings['root_sigma'] = args.root_sigma
+    name = {**DEFAULT_SETTINGS, **settings}['name']
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+
+    print("=" * 70)
+    mode = f"{args.chains} coupled chains" if args.heated else f"{args.chains} replicate chains"
+    print(f"MCMC: {mode} x {args.chain_length:,} states -> {args.output}")
+    print("=" * 70)
+
+    if args.heated:
+        rate = run_coupled(settings, args.output, args.chains, args.chain_length, args.log_every,
+                           args.swap_every, args.delta, args.seed)
+        log_path, trees_path = merge_coupled(args.output, args.chains, name)
+        temps = ", ".join(f"{t:.2f}" for t in temperatures(args.chains, args.delta))
+        print(f"\nTemperatures: {temps}")
+        print(f"Swap acceptance: {rate:.3f}")
+    else:
+        runs = run_replicates(settings, args.output, args.chains, args.chain_length, args.log_every, args.seed)
+        logs = [log for log, _, _ in runs]
+        columns = [load_columns(log) for log in logs]
+        table, burnin = diagnose(columns[0], args.burnin, replicates=columns[1:])
+        print_diagnostics(table, burnin, len(columns[0]['Sample']))
+        del columns
+
+        log_path, trees_path = output_paths(args.output, name)
+        n = merge_logs(logs, log_path, args.burnin, args.log_every)
+        merge_trees([trees for _, trees, _ in runs], trees_path, args.burnin, args.log_every)
+        print(f"\nCombined {n:,} post-burn-in samples from {len(logs)} chains")
+        for log, trees, _ in runs:
+            Path(log).unlink()
+            Path(trees).unlink()
+            shutil.rmtree(cache_path(log), ignore_errors=True)
+
+    print(f"\n✓ Saved: {log_path}")
+    print(f"✓ Saved: {trees_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# scripts/mcc_tree.py
+"""
+Maximum clade credibility tree from a BEAST posterior (TreeAnnotator in NumPy).
+
+Every internal node of every sampled tree is hashed by its taxon bitset;
+one np.unique over all of them gives the clade frequencies, and the tree
+with the largest sum of log clade credibilities is the MCC tree. Its nodes
+are annotated with the mean, median and 95% HPD of the heights of the same
+clade across the posterior, and written as a FigTree-readable NEXUS file:
+
+    python scripts/mcc_tree.py dravidian_beauti_full-dravidian_4lang.trees results/final/mcc.tree
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from beast_trees import clade_masks, read_trees
+from hpd import hpd
+
+def clade_ids(trees):
+    """
+    Clade number of every internal node (trees x internal nodes) plus the
+    unique clade bitsets and their counts.
+    """
+
+    n_tips = len(trees['taxa'])
+    masks = clade_masks(trees)[:, n_tips:]
+    n_trees, n_internal, n_words = masks.shape
+    flat = masks.reshape(-1, n_words)
+    if n_words == 1:
+        clades, inverse, counts = np.unique(flat[:, 0], return_inverse=True, return_counts=True)
+        clades = clades[:, None]
+    else:
+        clades, inverse, counts = np.unique(flat, axis=0, return_inverse=True, return_counts=True)
+    return inverse.reshape(n_trees, n_internal), clades, counts
+
+def clade_taxa(mask, taxa):
+    """Taxon names in a bitset."""
+    return [name for i, name in enumerate(taxa) if int(mask[i // 64]) >> (i % 64) & 1]
+
+def mcc_tree(trees, heights='median', level=0.95):
+    """
+    Pick the MCC tree and annotate its internal nodes.
+
+    heights chooses the node heights of the summary tree: 'median', 'mean'
+    or 'keep' (the sampled tree's own). Returns a dict with the tree index,
+    its parent array, node heights, the per-node annotations and a clade
+    table (one row per internal node).
+    """
+
+    ids, clades, counts = clade_ids(trees)
+    n_trees = len(ids)
+    n_tips = len(trees['taxa'])
+    credibility = counts / n_trees
+
+    # Sum of log clade credibilities; ties go to the first tree
+    scores = np.log(credibility)[ids].sum(axis=1)
+    best = int(scores.argmax())
+
+    # Group every sampled internal-node height by clade
+    flat_ids = ids.ravel()
+    order = np.argsort(flat_ids, kind='stable')
+    starts = np.searchsorted(flat_ids[order], np.arange(len(clades) + 1))
+    internal_heights = trees['height'][:, n_tips:].ravel()[order]
+    internal_meta = {key: values[:, n_tips:].ravel()[order] for key, values in trees['meta'].items()}
+
+    node_height = trees['height'][best].copy()
+    rows = []
+    annotations = [{} for _ in range(2 * n_tips - 1)]
+    for node in range(n_tips, 2 * n_tips - 1):
+        clade = ids[best, node - n_tips]
+        sample = internal_heights[starts[clade]:starts[clade + 1]]
+        lower, upper = hpd(sample, level) if len(sample) > 1 else (sample[0], sample[0])
+        note = {
+            'posterior': credibility[clade],
+            'height': sample.mean(),
+            'height_median': np.median(sample),
+            f'height_{level:.0%}_HPD': (lower, upper),
+        }
+        for key, values in internal_meta.items():
+            note[key] = np.nanmean(values[starts[clade]:starts[clade + 1]])
+        annotations[node] = note
+
+        if heights == 'median':
+            node_height[node] = note['height_median']
+        elif heights == 'mean':
+            node_height[node] = note['height']
+
+        rows.append({
+            'clade': '+'.join(clade_taxa(clades[clade], trees['taxa'])),
+            'posterior': credibility[clade],
+            'mean': note['height'],
+            'median': note['height_median'],
+            'hpd_lower': lower,
+            'hpd_upper': upper,
+        })
+
+    # Tips: metadata means over all trees (tip heights are fixed by the dates)
+    for tip in range(n_tips):
+        annotations[tip] = {key: np.nanmean(values[:, tip]) for key, values in trees['meta'].items()}
+
+    return {
+        'index': best,
+        'state': int(trees['states'][best]),
+        'taxa': trees['taxa'],
+        'parent': trees['parent'][best],
+        'height': node_height,
+        'annotations': annotations,
+        'clades': pd.DataFrame(rows).sort_values('mean', ascending=False, ignore_index=True),
+        'n_trees': n_trees,
+        'n_clades': len(clades),
+    }
+
+def _format_annotation(note):
+    parts = []
+    for key, value in note.items():
+        if isinstance(value, tuple):
+            parts.append(f"{key}={{{value[0]:.10g},{value[1]:.10g}}}")
+        else:
+            parts.append(f"{key}={value:.10g}")
+    return f"[&{','.join(parts)}]" if parts else ""
+
+def to_newick(tree):
+    """Newick string of an annotated summary tree (tips as TRANSLATE numbers)."""
+
+    parent, height = tree['parent'], tree['height']
+    children = [[] for _ in parent]
+    for node, p in enumerate(parent):
+        if p >= 0:
+            children[p].append(node)
+
+    def write(node):
+        note = _format_annotation(tree['annotations'][node])
+        label = f"({','.join(write(child) for child in children[node])})" if children[node] else str(node + 1)
+        p = parent[node]
+        length = height[p] - height[node] if p >= 0 else 0.0
+        return f"{label}{note}:{length:.10g}"
+
+    return write(len(parent) - 1) + ";"
+
+def write_nexus(tree, path):
+    """Write the summary tree as NEXUS (taxa, translate and one tree)."""
+
+    taxa = tree['taxa']
+    with open(path, 'w') as f:
+        f.write("#NEXUS\n\nBegin taxa;\n")
+        f.write(f"\tDimensions ntax={len(taxa)};\n\t\tTaxlabels\n")
+        for name in taxa:
+            f.write(f"\t\t\t{name} \n")
+        f.write("\t\t\t;\nEnd;\nBegin trees;\n\tTranslate\n")
+        f.write(",\n".join(f"\t\t   {i + 1} {name}" for i, name in enumerate(taxa)))
+        f.write("\n;\n")
+        f.write(f"tree TREE1 = [&R] {to_newick(tree)}\nEnd;\n")
+
+def summarize_trees(trees_file, output=None, burnin=0.1, heights='median'):
+    """Read a .trees file, build the MCC tree and optionally write it."""
+
+    trees = read_trees(trees_file, burnin)
+    tree = mcc_tree(trees, heights)
+    if output:
+        write_nexus(tree, output)
+    return tree
+
+def print_clades(tree):
+    """Print the MCC clades with their support and ages."""
+
+    print(f"\nMCC tree: state {tree['state']} ({tree['n_trees']} trees, "
+          f"{tree['n_clades']} distinct clades)")
+    print(f"\n{'Clade':<40} {'Posterior':>10} {'Median':>8} {'95% HPD':>18}")
+    print("-" * 80)
+    for _, row in tree['clades'].iterrows():
+        hpd_str = f"[{row['hpd_lower']:.2f}, {row['hpd_upper']:.2f}]"
+        print(f"{row['clade'][:40]:<40} {row['posterior']:>10.3f} {row['median']:>8.2f} {hpd_str:>18}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maximum clade credibility tree (TreeAnnotator replacement).")
+    parser.add_argument("trees", help="BEAST posterior .trees file")
+    parser.add_argument("output", nargs="?", help="annotated NEXUS tree to write")
+    parser.add_argument("--burnin", type=float, default=0.1, help="fraction (or number) of trees")
+    parser.add_argument("--heights", choices=("median", "mean", "keep"), default="median")
+    args = parser.parse_args(argv)
+
+    tree = summarize_trees(args.trees, args.output, args.burnin, args.heights)
+    print_clades(tree)
+    if args.output:
+        print(f"\n✓ Saved: {args.output}")
+
+if __name__ == "__main__":
+    main()
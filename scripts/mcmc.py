@@ -0,0 +1,703 @@
+# scripts/mcmc.py
+"""
+In-process MCMC for quick dating runs (the shipped BEAST model in Python).
+
+Model, as in results/xml/dravidian_*_prior.xml:
+
+    tree        tip-dated (date trait, forward in time), Yule or birth-death
+                (BirthDeathGernhard08) prior, as the settings' tree_prior
+    birthRate   Uniform(0, inf) (Yule); birth-death: BDBirthRate
+                Uniform(0, 1000), BDDeathRate Uniform(0, 1)
+    clock       uncorrelated lognormal: one rate category per branch,
+                ucldMean ~ Gamma(0.01, 100), ucldStdev ~ Gamma(0.5396, 0.3819)
+    root        MRCA prior Normal(root_mean, root_sigma), plus any calibrations
+    data        site patterns (site_patterns) under the settings' substitution
+                model (likelihood: MutationDeathModel, CTMC or covarion)
+
+With gamma_categories the site rates use a fixed gamma shape (the
+settings' gamma_shape, default 1.0): the XMLs estimate gammaShape, the
+chain does not.
+
+Operators follow BEAST's: scale (ucldMean, ucldStdev, birth and death
+rates, root),
+up-down (ucldMean up, node heights down), uniform node height, subtree
+slide, narrow and wide exchange, Wilson-Balding, and the rate-category
+random walk / swap / uniform moves. Random numbers are drawn in batches.
+The chain writes a BEAST-style trace log and .trees file, so everything
+downstream (beast_log, mcmc_diagnostics, mcc_tree) reads it unchanged:
+
+    python scripts/mcmc.py results/mcmc/dravidian --chain-length 1000000
+    python scripts/mcmc.py results/mcmc/tight --root-sigma 0.5 --model covarion
+    python scripts/mcmc.py results/mcmc/config --config config/dravidian.conf
+"""
+
+import argparse
+import math
+import time
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+
+from beast_xml import DEFAULT_SETTINGS, settings_from_config
+from cognate_matrix import load_matrix
+from likelihood import TransitionCache, log_likelihood, model_from_settings
+from mcc_tree import to_newick
+from prior_sampler import birth_death_logpdf
+from site_patterns import site_patterns
+
+# Gamma (shape, scale) priors of the shipped XMLs
+PRIORS = {
+    'ucldMean': (0.01, 100.0),
+    'ucldStdev': (0.5396, 0.3819),
+}
+
+# Operator weights of the shipped XMLs (BICEPS epoch/stretch moves omitted)
+OPERATORS = {
+    'ucldMeanScaler': 1.0,
+    'ucldStdevScaler': 3.0,
+    'CategoriesRandomWalk': 10.0,
+    'CategoriesSwap': 10.0,
+    'CategoriesUniform': 10.0,
+    'UpDown': 3.0,
+    'BirthRateScaler': 3.0,
+    'DeathRateScaler': 3.0,
+    'RootScaler': 3.0,
+    'Uniform': 30.0,
+    'SubtreeSlide': 15.0,
+    'Narrow': 15.0,
+    'Wide': 3.0,
+    'WilsonBalding': 3.0,
+}
+
+# Operators that leave the tree likelihood unchanged
+PRIOR_ONLY = {'BirthRateScaler', 'DeathRateScaler'}
+
+RELAXED_ONLY = {'ucldStdevScaler', 'CategoriesRandomWalk', 'CategoriesSwap', 'CategoriesUniform'}
+
+BIRTH_DEATH_ONLY = {'DeathRateScaler'}
+
+SCALE_FACTORS = {
+    'ucldMeanScaler': 0.5,
+    'ucldStdevScaler': 0.5,
+    'UpDown': 0.75,
+    'BirthRateScaler': 0.75,
+    'DeathRateScaler': 0.75,
+    'RootScaler': 0.75,
+}
+
+SLIDE_SIZE = 1.0
+RNG_BATCH = 65536
+
+LOG_COLUMNS = ['posterior', 'likelihood', 'prior', 'treeLikelihood', 'Tree.height', 'Tree.treeLength',
+               'ucldMean', 'ucldStdev', 'rate.mean', 'rate.variance', 'rate.coefficientOfVariation',
+               'YuleModel', 'birthRate', 'MRCA.prior']
+
+# Columns of the birth-death XMLs in place of YuleModel and birthRate
+BIRTH_DEATH_COLUMNS = ['BirthDeath', 'BDBirthRate', 'BDDeathRate']
+
+# Upper bound of the birth-death XMLs' Uniform prior on BDBirthRate
+BIRTH_RATE_UPPER = 1000.0
+
+def gamma_logpdf(x, shape, scale):
+    return (shape - 1) * math.log(x) - x / scale - math.lgamma(shape) - shape * math.log(scale)
+
+def normal_logpdf(x, mean, sigma):
+    return -0.5 * ((x - mean) / sigma) ** 2 - math.log(sigma) - 0.5 * math.log(2 * math.pi)
+
+def calibration_logpdf(x, dist, params):
+    if dist == 'normal':
+        return normal_logpdf(x, *params)
+    if dist == 'lognormal':
+        return normal_logpdf(math.log(x), *params) - math.log(x) if x > 0 else -math.inf
+    lower, upper = params
+    return -math.log(upper - lower) if lower <= x <= upper else -math.inf
+
+def yule_logpdf(height, n_tips, birth_rate):
+    """BEAST's YuleModel (rho = 1, not conditioned on the root): heights of internal nodes, root last."""
+    return (n_tips - 1) * math.log(birth_rate) - birth_rate * (sum(height[n_tips:]) + height[-1])
+
+def children_of(parent):
+    children = [[] for _ in parent]
+    for node, p in enumerate(parent):
+        if p >= 0:
+            children[p].append(node)
+    return children
+
+def tip_heights(settings, taxa):
+    """Tip heights from forward dates: the youngest tip is at height 0."""
+    dates = [settings['tip_dates'][taxon] for taxon in taxa]
+    return [max(dates) - date for date in dates]
+
+def random_tree(tips, rng, spread=0.5):
+    """Random topology above fixed tip heights (parent list, height list)."""
+
+    n_tips = len(tips)
+    parent = [-1] * (2 * n_tips - 1)
+    height = list(tips) + [0.0] * (n_tips - 1)
+    lineages = list(range(n_tips))
+    for node in range(n_tips, 2 * n_tips - 1):
+        a, b = rng.choice(len(lineages), 2, replace=False)
+        first, second = lineages[a], lineages[b]
+        height[node] = max(height[first], height[second]) + rng.exponential(spread)
+        parent[first] = parent[second] = node
+        lineages = [x for x in lineages if x not in (first, second)] + [node]
+    return parent, height
+
+class Chain:
+    """
+    One Metropolis-Hastings chain over the dating model.
+
+    The state is plain lists: parent (root -1), height, category (rate
+    category of the branch above each node) and the scalar parameters.
+    Internal nodes are kept numbered by height, so children precede
+    parents and the root is last, as the likelihood expects. temperature
+    heats the whole posterior (for Metropolis coupling).
+    """
+
+    def __init__(self, settings=None, data=None, seed=None, temperature=1.0, operators=None):
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        s = self.settings
+        if s['tree_prior'] not in ('yule', 'birthdeath'):
+            raise ValueError(f"Unknown tree prior '{s['tree_prior']}' (expected 'yule' or 'birthdeath')")
+        self.birth_death = s['tree_prior'] == 'birthdeath'
+        self.tree_prior_id = 'BirthDeath' if self.birth_death else 'YuleModel'
+        self.log_columns = LOG_COLUMNS
+        if self.birth_death:
+            i = LOG_COLUMNS.index('YuleModel')
+            self.log_columns = LOG_COLUMNS[:i] + BIRTH_DEATH_COLUMNS + LOG_COLUMNS[i + 2:]
+
+        if data is None:
+            data = site_patterns(load_matrix(s['data']), 'constant' if s['remove_constant'] else None)
+        self.data = data
+        self.taxa = [str(taxon) for taxon in data['taxa']]
+        self.n_tips = len(self.taxa)
+        self.n_nodes = 2 * self.n_tips - 1
+
+        self.model, self.site_rates, self.site_weights = model_from_settings(s)
+        self.cache = TransitionCache(self.model, self.site_rates)
+        self.relaxed = s['clock'] == 'relaxed'
+        self.beta = 1.0 / temperature
+        # Likelihood power of a path-sampling step (prior x likelihood^power)
+        self.power = 1.0
+
+        # Standard normal quantiles of the rate categories (one per branch)
+        n_categories = self.n_nodes - 1
+        self.z = np.array([NormalDist().inv_cdf((k + 0.5) / n_categories) for k in range(n_categories)])
+
+        self.calibrations = []
+        if s['root_sigma'] is not None:
+            self.calibrations.append(('root', None, 'normal', (s['root_mean'], s['root_sigma'])))
+        for prior_id, clade, dist, params in s['calibrations']:
+            mask = sum(1 << self.taxa.index(taxon) for taxon in clade)
+            self.calibrations.append((prior_id, mask, dist, params))
+
+        weights = dict(operators or OPERATORS)
+        if not self.relaxed:
+            weights = {name: w for name, w in weights.items() if name not in RELAXED_ONLY}
+        if not self.birth_death:
+            weights = {name: w for name, w in weights.items() if name not in BIRTH_DEATH_ONLY}
+        self.operator_names = list(weights)
+        w = np.array(list(weights.values()))
+        self.operator_p = w / w.sum()
+        self.accepted = dict.fromkeys(self.operator_names, 0)
+        self.proposed = dict.fromkeys(self.operator_names, 0)
+
+        self.rng = np.random.default_rng(seed)
+        self._refill()
+
+        tips = tip_heights(s, self.taxa)
+        parent, height = random_tree(tips, self.rng, spread=s['root_mean'] / self.n_tips)
+        self.state = {
+            'parent': parent,
+            'height': height,
+            'category': [0] * self.n_nodes,
+            'ucldMean': 1.0,
+            'ucldStdev': 0.1 if self.relaxed else 0.0,
+            'birthRate': 1.0,
+        }
+        if self.birth_death:
+            self.state['deathRate'] = 0.5
+        self._relabel(self.state)
+        self.values = self.evaluate(self.state)
+        self.sample = 0
+
+    # -- random numbers --------------------------------------------------
+
+    def _refill(self):
+        """Draw the next batch of operator choices and uniforms."""
+        self._ops = self.rng.choice(len(self.operator_names), RNG_BATCH, p=self.operator_p).tolist()
+        self._u = self.rng.random(6 * RNG_BATCH).tolist()
+        self._i_op = self._i_u = 0
+
+    def uniform(self):
+        if self._i_u == len(self._u):
+            self._u = self.rng.random(6 * RNG_BATCH).tolist()
+            self._i_u = 0
+        value = self._u[self._i_u]
+        self._i_u += 1
+        return value
+
+    def randint(self, n):
+        return int(self.uniform() * n)
+
+    def scale_factor(self, f):
+        return f + self.uniform() * (1 / f - f)
+
+    # -- model -----------------------------------------------------------
+
+    def _relabel(self, state):
+        """Renumber internal nodes by increasing height (root last)."""
+
+        n_tips = self.n_tips
+        height = state['height']
+        order = sorted(range(n_tips, self.n_nodes), key=height.__getitem__)
+        if order == list(range(n_tips, self.n_nodes)):
+            return
+        new_index = list(range(self.n_nodes))
+        for new, old in enumerate(order, start=n_tips):
+            new_index[old] = new
+        nodes = list(range(n_tips)) + order
+        state['parent'] = [new_index[state['parent'][old]] if state['parent'][old] >= 0 else -1 for old in nodes]
+        state['height'] = [height[old] for old in nodes]
+        state['category'] = [state['category'][old] for old in nodes]
+
+    def branch_rates(self, state):
+        """Clock rate of every node's branch (root entry unused)."""
+        S = state['ucldStdev']
+        rates = state['ucldMean'] * np.exp(S * self.z - 0.5 * S * S)
+        return rates[state['category']] if self.relaxed else np.full(self.n_nodes, state['ucldMean'])
+
+    def mrca_heights(self, state):
+        """Height of each calibrated clade's MRCA."""
+
+        height = state['height']
+        if all(mask is None for _, mask, _, _ in self.calibrations):
+            return [height[-1]] * len(self.calibrations)
+        masks = [1 << i for i in range(self.n_tips)] + [0] * (self.n_tips - 1)
+        for node, p in enumerate(state['parent'][:-1]):
+            masks[p] |= masks[node]
+        heights = []
+        for _, mask, _, _ in self.calibrations:
+            if mask is None:
+                heights.append(height[-1])
+            else:
+                heights.append(min(h for h, m in zip(height, masks) if m & mask == mask))
+        return heights
+
+    def tree_prior(self, state):
+        """Log density of the tree prior and of the priors on its rates."""
+        r = state['birthRate']
+        if not self.birth_death:
+            return yule_logpdf(state['height'], self.n_tips, r), 0.0
+        a = state['deathRate']
+        if not (r <= BIRTH_RATE_UPPER and a < 1.0):
+            return -math.inf, -math.inf
+        heights = np.array(state['height'][self.n_tips:])[None]
+        tree = float(birth_death_logpdf(heights, np.array([r]), np.array([a]))[0])
+        return tree, -math.log(BIRTH_RATE_UPPER)
+
+    def log_prior(self, state):
+        tree, rates = self.tree_prior(state)
+        mrca = sum(calibration_logpdf(h, dist, params)
+                   for h, (_, _, dist, params) in zip(self.mrca_heights(state), self.calibrations))
+        prior = tree + rates + mrca + gamma_logpdf(state['ucldMean'], *PRIORS['ucldMean'])
+        if self.relaxed:
+            prior += gamma_logpdf(state['ucldStdev'], *PRIORS['ucldStdev'])
+        return prior, tree, mrca
+
+    def log_likelihood(self, state, rates=None):
+        if self.settings['sample_from_prior']:
+            return 0.0
+        height = np.array(state['height'])
+        parent = np.array(state['parent'])
+        rates = self.branch_rates(state) if rates is None else rates
+        length = np.zeros(self.n_nodes)
+        length[:-1] = (height[parent[:-1]] - height[:-1]) * rates[:-1]
+        return log_likelihood(parent, length, self.data, self.model, self.site_rates,
+                              self.site_weights, cache=self.cache)
+
+    def evaluate(self, state, likelihood=None):
+        prior, tree, mrca = self.log_prior(state)
+        if likelihood is None:
+            likelihood = self.log_likelihood(state)
+        return {
+            'posterior': prior + likelihood,
+            'likelihood': likelihood,
+            'prior': prior,
+            self.tree_prior_id: tree,
+            'MRCA.prior': mrca,
+        }
+
+    # -- sampling --------------------------------------------------------
+
+    def step(self):
+        """Propose one move and accept or reject it; returns the operator name."""
+
+        if self._i_op == RNG_BATCH:
+            self._refill()
+        name = self.operator_names[self._ops[self._i_op]]
+        self._i_op += 1
+        self.proposed[name] += 1
+
+        current = self.state
+        proposal = {
+            **current,
+            'parent': current['parent'][:],
+            'height': current['height'][:],
+            'category': current['category'][:],
+        }
+        log_hr = PROPOSALS[name](self, proposal)
+        if log_hr == -math.inf:
+            return name
+        if not _heights_valid(proposal['parent'], proposal['height']):
+            return name
+
+        self._relabel(proposal)
+        values = self.evaluate(proposal, self.values['likelihood'] if name in PRIOR_ONLY else None)
+        delta = values['posterior'] - self.values['posterior']
+        if self.power != 1.0:
+            delta -= (1.0 - self.power) * (values['likelihood'] - self.values['likelihood'])
+        log_alpha = self.beta * delta + log_hr
+        if log_alpha >= 0 or self.uniform() < math.exp(log_alpha):
+            self.state, self.values = proposal, values
+            self.accepted[name] += 1
+        return name
+
+    def run(self, n_steps, log=None, trees=None, log_every=1000):
+        """Advance n_steps states, logging every log_every."""
+        for _ in range(n_steps):
+            self.step()
+            self.sample += 1
+            if self.sample % log_every == 0:
+                if log:
+                    log.write(self.log_line())
+                if trees:
+                    trees.write(self.tree_line())
+
+    # -- output ----------------------------------------------------------
+
+    def log_record(self):
+        """The current state as a dict of log_columns values."""
+
+        state = self.state
+        height = np.array(state['height'])
+        parent = np.array(state['parent'][:-1])
+        times = height[parent] - height[:-1]
+        rates = self.branch_rates(state)[:-1]
+        mean = (rates * times).sum() / times.sum()
+        if self.birth_death:
+            birth = {'BDBirthRate': state['birthRate'], 'BDDeathRate': state['deathRate']}
+        else:
+            birth = {'birthRate': state['birthRate']}
+        return {
+            **self.values,
+            'treeLikelihood': self.values['likelihood'],
+            'Tree.height': height[-1],
+            'Tree.treeLength': times.sum(),
+            'ucldMean': state['ucldMean'],
+            'ucldStdev': state['ucldStdev'],
+            'rate.mean': mean,
+            'rate.variance': rates.var(),
+            'rate.coefficientOfVariation': rates.std() / mean,
+            **birth,
+        }
+
+    def log_header(self):
+        return "Sample\t" + "\t".join(self.log_columns) + "\n"
+
+    def log_line(self):
+        record = self.log_record()
+        return f"{self.sample}\t" + "\t".join(repr(float(record[c])) for c in self.log_columns) + "\n"
+
+    def trees_header(self):
+        taxa = self.taxa
+        lines = ["#NEXUS", "", "Begin taxa;", f"\tDimensions ntax={len(taxa)};", "\t\tTaxlabels"]
+        lines += [f"\t\t\t{name} " for name in taxa]
+        lines += ["\t\t\t;", "End;", "Begin trees;", "\tTranslate"]
+        lines.append(",\n".join(f"\t\t   {i + 1} {name}" for i, name in enumerate(taxa)))
+        return "\n".join(lines) + "\n;\n"
+
+    def tree_line(self):
+        rates = self.branch_rates(self.state)
+        tree = {
+            'parent': self.state['parent'],
+            'height': self.state['height'],
+            'annotations': [{'rate': rate} for rate in rates],
+        }
+        return f"tree STATE_{self.sample} = {to_newick(tree)}\n"
+
+    def acceptance(self):
+        return {name: self.accepted[name] / self.proposed[name]
+                for name in self.operator_names if self.proposed[name]}
+
+def _heights_valid(parent, height):
+    return all(height[p] > height[node] for node, p in enumerate(parent) if p >= 0)
+
+# -- operators -------------------------------------------------------------
+# Each takes (chain, proposal), edits the proposal in place and returns
+# the log Hastings ratio (-inf to reject outright).
+
+def _scale_parameter(key, factor_name):
+    def propose(chain, state):
+        scale = chain.scale_factor(SCALE_FACTORS[factor_name])
+        state[key] *= scale
+        return -math.log(scale)
+    return propose
+
+def root_scaler(chain, state):
+    scale = chain.scale_factor(SCALE_FACTORS['RootScaler'])
+    state['height'][-1] *= scale
+    return -math.log(scale)
+
+def up_down(chain, state):
+    """ucldMean up, all internal node heights down (tips are fixed)."""
+    scale = chain.scale_factor(SCALE_FACTORS['UpDown'])
+    state['ucldMean'] *= scale
+    height = state['height']
+    for node in range(chain.n_tips, chain.n_nodes):
+        height[node] /= scale
+    return (1 - (chain.n_tips - 1) - 2) * math.log(scale)
+
+def uniform_node(chain, state):
+    """New height for a random non-root internal node, uniform between its children and parent."""
+    if chain.n_tips < 3:
+        return -math.inf
+    node = chain.n_tips + chain.randint(chain.n_tips - 2)
+    height = state['height']
+    lower = max(height[child] for child in children_of(state['parent'])[node])
+    upper = height[state['parent'][node]]
+    height[node] = lower + chain.uniform() * (upper - lower)
+    return 0.0
+
+def _intersecting_edges(node, at, children, height, found):
+    """Nodes at or below `node` whose branch crosses height `at`."""
+    if height[node] < at:
+        found.append(node)
+    else:
+        for child in children[node]:
+            _intersecting_edges(child, at, children, height, found)
+    return found
+
+def subtree_slide(chain, state):
+    """BEAST's SubtreeSlide: move a node's parent up or down, re-attaching where it lands."""
+
+    parent, height = state['parent'], state['height']
+    children = children_of(parent)
+    node = chain.randint(chain.n_nodes - 1)          # any non-root node
+    p = parent[node]
+    sibling = next(c for c in children[p] if c != node)
+    grandparent = parent[p]
+    old = height[p]
+    new = old + SLIDE_SIZE * (chain.uniform() - 0.5)
+
+    if new > old:
+        if grandparent >= 0 and height[grandparent] < new:
+            # Climb until the branch spanning the new height
+            below, above = grandparent, parent[grandparent]
+            while above >= 0 and height[above] < new:
+                below, above = above, parent[above]
+            # Detach p (the sibling takes its place), re-attach above `below`
+            parent[sibling] = grandparent
+            parent[p] = above
+            parent[below] = p
+            height[p] = new
+            children = children_of(parent)
+            sources = len(_intersecting_edges(below, old, children, height, []))
+            return -math.log(sources)
+        height[p] = new
+        return 0.0
+
+    if height[node] > new:
+        return -math.inf
+    if height[sibling] > new:
+        targets = _intersecting_edges(sibling, new, children, height, [])
+        if not targets:
+            return -math.inf
+        target = targets[chain.randint(len(targets))]
+        # Detach p: the sibling takes its place (becoming root if p was)
+        parent[sibling] = grandparent
+        parent[p] = parent[target]
+        parent[target] = p
+        height[p] = new
+        return math.log(len(targets))
+    height[p] = new
+    return 0.0
+
+def _valid_grandparents(parent, n_tips):
+    """Internal nodes with at least one internal child."""
+    return len({p for node, p in enumerate(parent) if node >= n_tips and p >= 0})
+
+def narrow_exchange(chain, state):
+    """BEAST's narrow Exchange: swap a node with its parent's sibling."""
+
+    parent, height = state['parent'], state['height']
+    n_tips = chain.n_tips
+    if n_tips < 3:
+        return -math.inf
+    children = children_of(parent)
+    grandparents = sorted({p for node, p in enumerate(parent) if node >= n_tips and p >= 0})
+    before = len(grandparents)
+    grandparent = grandparents[chain.randint(before)]
+    a, b = children[grandparent]
+    middle, uncle = (a, b) if height[a] >= height[b] else (b, a)
+    if middle < n_tips:
+        return -math.inf
+    node = children[middle][chain.randint(2)]
+    parent[node], parent[uncle] = grandparent, middle
+    return math.log(before) - math.log(_valid_grandparents(parent, n_tips))
+
+def wide_exchange(chain, state):
+    """BEAST's wide Exchange: swap the subtrees of two random nodes."""
+
+    parent, height = state['parent'], state['height']
+    i = chain.randint(chain.n_nodes - 1)
+    j = chain.randint(chain.n_nodes - 1)
+    pi, pj = parent[i], parent[j]
+    if i == j or pi == pj or j == pi or i == pj:
+        return -math.inf
+    if not (height[j] < height[pi] and height[i] < height[pj]):
+        return -math.inf
+    parent[i], parent[j] = pj, pi
+    return 0.0
+
+def wilson_balding(chain, state):
+    """BEAST's WilsonBalding: prune a subtree and regraft it on a random branch."""
+
+    parent, height = state['parent'], state['height']
+    i = chain.randint(chain.n_nodes - 1)
+    while True:
+        j = chain.randint(chain.n_nodes)
+        if j != i and (parent[j] < 0 or height[parent[j]] > height[i]):
+            break
+    ip, jp = parent[i], parent[j]
+    if jp < 0 or ip == j or jp == ip:
+        return -math.inf
+    grandparent = parent[ip]
+    if grandparent < 0:
+        return -math.inf
+    sibling = next(c for c in children_of(parent)[ip] if c != i)
+
+    new_min = max(height[i], height[j])
+    new_range = height[jp] - new_min
+    old_range = height[grandparent] - max(height[i], height[sibling])
+
+    parent[sibling] = grandparent
+    parent[j] = ip
+    parent[ip] = jp
+    height[ip] = new_min + chain.uniform() * new_range
+    return math.log(new_range) - math.log(old_range)
+
+def categories_random_walk(chain, state):
+    node = chain.randint(chain.n_nodes - 1)
+    value = state['category'][node] + (1 if chain.uniform() < 0.5 else -1)
+    if not 0 <= value < chain.n_nodes - 1:
+        return -math.inf
+    state['category'][node] = value
+    return 0.0
+
+def categories_swap(chain, state):
+    i = chain.randint(chain.n_nodes - 1)
+    j = chain.randint(chain.n_nodes - 1)
+    category = state['category']
+    if category[i] == category[j]:
+        return -math.inf
+    category[i], category[j] = category[j], category[i]
+    return 0.0
+
+def categories_uniform(chain, state):
+    state['category'][chain.randint(chain.n_nodes - 1)] = chain.randint(chain.n_nodes - 1)
+    return 0.0
+
+PROPOSALS = {
+    'ucldMeanScaler': _scale_parameter('ucldMean', 'ucldMeanScaler'),
+    'ucldStdevScaler': _scale_parameter('ucldStdev', 'ucldStdevScaler'),
+    'CategoriesRandomWalk': categories_random_walk,
+    'CategoriesSwap': categories_swap,
+    'CategoriesUniform': categories_uniform,
+    'UpDown': up_down,
+    'BirthRateScaler': _scale_parameter('birthRate', 'BirthRateScaler'),
+    'DeathRateScaler': _scale_parameter('deathRate', 'DeathRateScaler'),
+    'RootScaler': root_scaler,
+    'Uniform': uniform_node,
+    'SubtreeSlide': subtree_slide,
+    'Narrow': narrow_exchange,
+    'Wide': wide_exchange,
+    'WilsonBalding': wilson_balding,
+}
+
+def output_paths(prefix, name):
+    """BEAST's $(filebase).log and $(filebase)-$(tree).trees."""
+    prefix = Path(prefix)
+    return prefix.with_name(prefix.name + ".log"), prefix.with_name(f"{prefix.name}-{name}.trees")
+
+def run_chain(settings, prefix, chain_length=None, log_every=None, seed=None, chain=None, quiet=False):
+    """Run one chain to completion, writing the trace log and trees file."""
+
+    chain = chain or Chain(settings, seed=seed)
+    s = chain.settings
+    chain_length = int(chain_length or s['chain_length'])
+    log_every = int(log_every or s['log_every'])
+    log_path, trees_path = output_paths(prefix, s['name'])
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    with open(log_path, 'w') as log, open(trees_path, 'w') as trees:
+        log.write(f"# mcmc.py: {s['name']}, seed {seed}\n")
+        log.write(chain.log_header())
+        trees.write(chain.trees_header())
+        if chain.sample == 0:
+            log.write(chain.log_line())
+            trees.write(chain.tree_line())
+        report = max(chain_length // 10, log_every)
+        remaining = chain_length
+        while remaining > 0:
+            n = min(report, remaining)
+            chain.run(n, log, trees, log_every)
+            remaining -= n
+            if not quiet:
+                elapsed = time.perf_counter() - start
+                print(f"  {chain.sample:>12,}  posterior {chain.values['posterior']:>12.4f}  "
+                      f"({60 * (chain_length - remaining) / elapsed:,.0f} states/min)", flush=True)
+        trees.write("End;\n")
+    return chain, log_path, trees_path
+
+def print_acceptance(chain):
+    print(f"\n{'Operator':<24} {'Proposed':>10} {'Accepted':>10}")
+    print("-" * 46)
+    for name, rate in chain.acceptance().items():
+        print(f"{name:<24} {chain.proposed[name]:>10,} {rate:>10.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the dating model in-process (BEAST-style output).")
+    parser.add_argument("output", help="output prefix: writes PREFIX.log and PREFIX-<name>.trees")
+    parser.add_argument("--config", help="BEASTling .conf to take settings from (tree prior, clock, "
+                        "substitution model, gamma categories; the gamma shape stays fixed at 1.0)")
+    parser.add_argument("--data", help="binary matrix (wide CSV or packed .npz)")
+    parser.add_argument("--model", choices=("mutationdeath", "covarion", "ctmc"))
+    parser.add_argument("--root-mean", type=float)
+    parser.add_argument("--root-sigma", type=float)
+    parser.add_argument("--chain-length", type=int, default=1_000_000)
+    parser.add_argument("--log-every", type=int, default=1000)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--sample-from-prior", action="store_true")
+    args = parser.parse_args(argv)
+
+    settings = settings_from_config(args.config) if args.config else {}
+    for key, value in [('data', args.data), ('substitution', args.model), ('root_mean', args.root_mean),
+                       ('root_sigma', args.root_sigma)]:
+        if value is not None:
+            settings[key] = value
+    if args.sample_from_prior:
+        settings['sample_from_prior'] = True
+
+    print("=" * 70)
+    print(f"MCMC: {args.chain_length:,} states -> {args.output}")
+    print("=" * 70)
+    chain, log_path, trees_path = run_chain(settings, args.output, args.chain_length, args.log_every, args.seed)
+    print_acceptance(chain)
+    print(f"\n✓ Saved: {log_path}")
+    print(f"✓ Saved: {trees_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# scripts/mcmc_diagnostics.py
+"""
+MCMC convergence diagnostics for BEAST trace logs.
+
+All statistics work on a samples x columns array at once: autocorrelation
+by FFT, effective sample size with Geyer's initial monotone sequence,
+split-R-hat across replicate runs, Geweke z-scores and automatic burn-in
+detection. Gate a set of runs on ESS > 200 without opening Tracer:
+
+    python scripts/mcmc_diagnostics.py results/sensitivity/loose/dravidian_loose_prior.log
+    python scripts/mcmc_diagnostics.py results/sensitivity/loose/rep*/*.log --min-ess 200
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+MIN_ESS = 200
+MAX_RHAT = 1.05
+
+def _as_2d(x):
+    x = np.asarray(x, dtype=float)
+    return x[:, None] if x.ndim == 1 else x
+
+def autocorrelation(x, max_lag=None):
+    """
+    Autocorrelation of each column of x (samples x columns) by FFT.
+
+    Returns a (max_lag + 1) x columns array; constant columns are NaN.
+    """
+
+    x = _as_2d(x)
+    n = len(x)
+    max_lag = n - 1 if max_lag is None else min(max_lag, n - 1)
+
+    # Zero-pad to a power of two >= 2n to avoid circular wrap-around
+    size = 1 << (2 * n - 1).bit_length()
+    # Transform contiguous rows (one per column), much faster than axis=0
+    centred = np.ascontiguousarray((x - x.mean(axis=0)).T)
+    spectrum = np.fft.rfft(centred, n=size)
+    acov = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=size)[:, :max_lag + 1].T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return acov / acov[0]
+
+def ess(x):
+    """
+    Effective sample size of each column (Geyer's initial monotone sequence).
+
+    Sums of consecutive autocorrelation pairs are kept until the first
+    non-positive pair and forced to be non-increasing; ESS = n / tau with
+    tau = -1 + 2 * sum(pairs).
+    """
+
+    x = _as_2d(x)
+    n = len(x)
+    if n < 4:
+        return np.full(x.shape[1], np.nan)
+
+    rho = autocorrelation(x)
+    m = len(rho) // 2
+    pairs = rho[:2 * m:2] + rho[1:2 * m:2]
+
+    positive = np.cumprod(pairs > 0, axis=0).astype(bool)
+    monotone = np.minimum.accumulate(np.where(positive, pairs, np.inf), axis=0)
+    tau = -1 + 2 * np.where(positive, monotone, 0).sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = n / np.maximum(tau, 1 / np.log10(n))
+    return np.where(np.isfinite(rho[0]), np.minimum(result, n * np.log10(n)), np.nan)
+
+def split_rhat(chains):
+    """
+    Split-R-hat of each column across replicate chains.
+
+    chains is a list of samples x columns arrays (post burn-in). Chains are
+    cut to the shortest length and split in half, so a single chain still
+    gets a (within-run) R-hat.
+    """
+
+    chains = [_as_2d(chain) for chain in chains]
+    n = min(len(chain) for chain in chains) // 2
+    halves = np.stack([half for chain in chains
+                       for half in (chain[:n], chain[len(chain) - n:])])  # m x n x k
+
+    within = halves.var(axis=1, ddof=1).mean(axis=0)
+    between = n * halves.mean(axis=1).var(axis=0, ddof=1)
+    var_hat = (n - 1) / n * within + between / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(var_hat / within)
+
+def geweke(x, first=0.1, last=0.5):
+    """
+    Geweke z-score of each column: mean of the first 10% against the last
+    50%, with ESS-based standard errors.
+    """
+
+    x = _as_2d(x)
+    a, b = x[:int(len(x) * first)], x[len(x) - int(len(x) * last):]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se2 = a.var(axis=0, ddof=1) / ess(a) + b.var(axis=0, ddof=1) / ess(b)
+        return (a.mean(axis=0) - b.mean(axis=0)) / np.sqrt(se2)
+
+def detect_burnin(x, candidates=np.arange(0, 0.55, 0.05), z=2.0):
+    """
+    Smallest burn-in fraction after which every column passes Geweke.
+
+    Tries each candidate fraction in turn; falls back to the last one
+    when none passes. Returns the number of samples to discard.
+    """
+
+    x = _as_2d(x)
+    for fraction in candidates:
+        start = int(len(x) * fraction)
+        scores = geweke(x[start:])
+        if np.all(np.abs(scores[np.isfinite(scores)]) < z):
+            return start
+    return int(len(x) * candidates[-1])
+
+def diagnose(columns, burnin='auto', burnin_columns=('posterior',), replicates=(),
+             min_burnin=0.0):
+    """
+    Diagnostics table (one row per column) for one run.
+
+    columns maps names to sample arrays (e.g. log_cache.load_columns).
+    burnin is a sample count, a fraction (< 1) or 'auto' (detected on
+    burnin_columns, but at least min_burnin of the samples). replicates
+    are further runs (same layout) for R-hat. Returns (table, burnin).
+    """
+
+    names = [name for name in columns if name != 'Sample']
+    x = np.column_stack([columns[name] for name in names])
+
+    if burnin == 'auto':
+        monitored = [names.index(name) for name in burnin_columns if name in names]
+        burnin = max(detect_burnin(x[:, monitored] if monitored else x),
+                     int(len(x) * min_burnin))
+    elif burnin < 1:
+        burnin = int(len(x) * burnin)
+    burnin = int(burnin)
+    post = x[burnin:]
+
+    table = pd.DataFrame({
+        'mean': post.mean(axis=0),
+        'std': post.std(axis=0, ddof=1),
+        'ess': ess(post),
+        'geweke_z': geweke(post),
+    }, index=names)
+
+    # Replicates drop the same fraction of their samples
+    chains = [post]
+    for run in replicates:
+        values = np.column_stack([run[name] for name in names])
+        chains.append(values[int(len(values) * burnin / len(x)):])
+    table['rhat'] = split_rhat(chains)
+
+    return table, burnin
+
+def passes(table, min_ess=MIN_ESS, max_rhat=MAX_RHAT, columns=None):
+    """True when every (selected) column has ESS >= min_ess and R-hat <= max_rhat."""
+    table = table.loc[columns] if columns else table
+    table = table[np.isfinite(table['ess'])]  # constant columns carry no information
+    return bool((table['ess'] >= min_ess).all() and (table['rhat'] <= max_rhat).all())
+
+def print_diagnostics(table, burnin, n_samples, min_ess=MIN_ESS):
+    """Print the table in the style of the analysis scripts."""
+
+    print(f"\nBurn-in: {burnin} of {n_samples} samples ({100 * burnin / n_samples:.0f}%)")
+    print(f"\n{'Parameter':<28} {'Mean':>12} {'ESS':>10} {'Geweke z':>10} {'R-hat':>8}")
+    print("-" * 72)
+    for name, row in table.iterrows():
+        mark = "✓" if not np.isfinite(row['ess']) or row['ess'] >= min_ess else "⚠"
+        print(f"{name[:28]:<28} {row['mean']:>12.4g} {row['ess']:>10.0f} "
+              f"{row['geweke_z']:>10.2f} {row['rhat']:>8.3f} {mark}")
+
+def main(argv=None):
+    from log_cache import load_columns
+
+    parser = argparse.ArgumentParser(description="ESS, Geweke and R-hat for BEAST logs.")
+    parser.add_argument("logs", nargs="+", help="one log, or replicate logs of the same model")
+    parser.add_argument("--burnin", default="auto",
+                        help='"auto", a fraction (0.1) or a number of samples')
+    parser.add_argument("--min-ess", type=float, default=MIN_ESS)
+    parser.add_argument("--columns", nargs="+", help="columns to gate on (default: all)")
+    args = parser.parse_args(argv)
+
+    burnin = args.burnin if args.burnin == 'auto' else float(args.burnin)
+    runs = [load_columns(log) for log in args.logs]
+    table, burnin = diagnose(runs[0], burnin, replicates=runs[1:])
+    print_diagnostics(table, burnin, len(runs[0]['Sample']), args.min_ess)
+
+    ok = passes(table, args.min_ess, columns=args.columns)
+    print(f"\n{'✓ Converged' if ok else '✗ Not converged'} (ESS ≥ {args.min_ess:.0f}, R-hat ≤ {MAX_RHAT})")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
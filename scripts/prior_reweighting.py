@@ -0,0 +1,209 @@
+# scripts/prior_reweighting.py
+"""
+Posteriors under a different root-height prior, by reweighting one run.
+
+The loose, medium and tight analyses differ only in the sigma of the
+root MRCA Normal. Samples from one of them (the loose run has the widest
+support) are reweighted to any other Normal(mean, sigma) on the root:
+
+    log w_s = log N(h_s; mean, sigma) - log N(h_s; mean_0, sigma_0)
+
+The weights are Pareto-smoothed (PSIS: the largest weights are replaced
+by expected order statistics of a generalized Pareto fitted with the
+Zhang & Stephens estimator). The fitted shape k-hat says whether this
+can be trusted: above 0.7 (or with too few effective samples left) the
+estimate is unreliable and a real run is needed. A whole grid of sigmas
+is evaluated at once.
+
+    python scripts/prior_reweighting.py results/sensitivity/loose/dravidian_loose_prior.log
+    python scripts/prior_reweighting.py loose.log --sigma 1.0 0.5 --root-mean 4.5
+    python scripts/prior_reweighting.py loose.log --grid 0.25 3 24 --csv results/reweighted.csv
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from log_cache import load_columns
+from mcmc_diagnostics import MIN_ESS, diagnose
+
+K_WARN = 0.7
+
+def log_weights(heights, sigmas, root_mean=4.5, old_sigma=1.5, old_mean=None):
+    """Log density ratios new / old prior: sigmas x samples."""
+    h = np.asarray(heights, dtype=float)[None, :]
+    s = np.atleast_1d(np.asarray(sigmas, dtype=float))[:, None]
+    old_mean = root_mean if old_mean is None else old_mean
+    new = -0.5 * ((h - root_mean) / s) ** 2 - np.log(s)
+    old = -0.5 * ((h - old_mean) / old_sigma) ** 2 - math.log(old_sigma)
+    return new - old
+
+def gpd_fit(x, prior_strength=3, weak_prior=10):
+    """
+    Generalized Pareto (k, sigma) of exceedances, Zhang & Stephens (2009)
+    with the weakly informative shrinkage of k towards 0.5 used by PSIS.
+
+    x is rows x n, each row sorted ascending; returns arrays k, sigma.
+    """
+
+    x = np.atleast_2d(x)
+    n = x.shape[1]
+    m = 30 + int(math.sqrt(n))
+    b = 1 - np.sqrt(m / (np.arange(1, m + 1) - 0.5))
+    theta = b[None, :] / (prior_strength * x[:, int(n / 4 + 0.5) - 1, None]) + 1 / x[:, -1, None]
+    k = np.log1p(-theta[:, :, None] * x[:, None, :]).mean(axis=2)
+    profile = n * (np.log(-theta / k) - k - 1)
+    w = np.exp(profile - profile.max(axis=1, keepdims=True))
+    w /= w.sum(axis=1, keepdims=True)
+    theta_hat = (theta * w).sum(axis=1)
+    k = np.log1p(-theta_hat[:, None] * x).mean(axis=1)
+    sigma = -k / theta_hat
+    k = (n * k + weak_prior * 0.5) / (n + weak_prior)
+    return k, sigma
+
+def gpd_quantile(p, k, sigma):
+    """Quantiles of a generalized Pareto (rows of k, sigma against p)."""
+    k, sigma = k[:, None], sigma[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q = sigma * np.expm1(-k * np.log1p(-p[None, :])) / k
+    return np.where(np.abs(k) < 1e-12, -sigma * np.log1p(-p[None, :]), q)
+
+def psis(log_w):
+    """
+    Pareto-smoothed importance weights of each row of log_w.
+
+    Returns (weights normalised per row, k_hat per row).
+    """
+
+    log_w = np.atleast_2d(np.asarray(log_w, dtype=float))
+    log_w = log_w - log_w.max(axis=1, keepdims=True)
+    n_rows, n = log_w.shape
+    tail = int(math.ceil(min(0.2 * n, 3 * math.sqrt(n))))
+    if tail < 5:
+        weights = np.exp(log_w)
+        return weights / weights.sum(axis=1, keepdims=True), np.full(n_rows, np.inf)
+
+    order = np.argsort(log_w, axis=1)
+    rows = np.arange(n_rows)[:, None]
+    sorted_lw = log_w[rows, order]
+    cutoff = np.exp(sorted_lw[:, -tail - 1])
+    exceed = np.exp(sorted_lw[:, -tail:]) - cutoff[:, None]
+
+    # Rows without a proper tail (flat weights) are left as they are
+    proper = (exceed > 0).all(axis=1)
+    k_hat = np.zeros(n_rows)
+    smoothed = sorted_lw.copy()
+    if proper.any():
+        k, sigma = gpd_fit(exceed[proper])
+        k_hat[proper] = k
+        p = (np.arange(tail) + 0.5) / tail
+        q = np.log(gpd_quantile(p, k, sigma) + cutoff[proper, None])
+        smoothed[proper, -tail:] = np.minimum(q, 0.0)       # never above the largest raw weight
+    log_w[rows, order] = smoothed
+
+    weights = np.exp(log_w)
+    return weights / weights.sum(axis=1, keepdims=True), k_hat
+
+def weighted_hpd(values, weights, level=0.95):
+    """Narrowest interval holding `level` of the weight, for each row of weights."""
+
+    order = np.argsort(values)
+    x = np.asarray(values)[order]
+    intervals = []
+    for w in np.atleast_2d(weights)[:, order]:
+        cumulative = np.concatenate([[0.0], np.cumsum(w)])
+        upper = np.searchsorted(cumulative, cumulative[:-1] + level * cumulative[-1])
+        valid = upper < len(cumulative)
+        starts = np.flatnonzero(valid)
+        ends = upper[valid] - 1
+        best = np.argmin(x[ends] - x[starts])
+        intervals.append((x[starts[best]], x[ends[best]]))
+    return np.array(intervals)
+
+def reweight(heights, sigmas, root_mean=4.5, old_sigma=1.5, old_mean=None, mcmc_ess=None):
+    """
+    Summaries of the root height under each new sigma: a DataFrame with
+    sigma, mean, median, hpd_lower, hpd_upper, k_hat, ess and reliable
+    (k_hat <= K_WARN and ess >= MIN_ESS).
+
+    ess is the importance-sampling ESS, scaled by mcmc_ess / n when the
+    run's own ESS is given (the samples are autocorrelated).
+    """
+
+    h = np.asarray(heights, dtype=float)
+    sigmas = np.atleast_1d(np.asarray(sigmas, dtype=float))
+    weights, k_hat = psis(log_weights(h, sigmas, root_mean, old_sigma, old_mean))
+
+    order = np.argsort(h)
+    cumulative = np.cumsum(weights[:, order], axis=1)
+    medians = h[order][np.argmax(cumulative >= 0.5, axis=1)]
+    intervals = weighted_hpd(h, weights)
+    is_ess = 1.0 / (weights ** 2).sum(axis=1)
+    ess = is_ess * (mcmc_ess / len(h)) if mcmc_ess is not None else is_ess
+
+    return pd.DataFrame({
+        'sigma': sigmas,
+        'mean': weights @ h,
+        'median': medians,
+        'hpd_lower': intervals[:, 0],
+        'hpd_upper': intervals[:, 1],
+        'k_hat': k_hat,
+        'ess': ess,
+        'reliable': (k_hat <= K_WARN) & (ess >= MIN_ESS),
+    })
+
+def print_reweighted(table, n_samples):
+    print(f"\n{'σ':>6} {'Mean':>8} {'Median':>8} {'95% HPD':>18} {'k-hat':>7} {'ESS':>8}")
+    print("-" * 60)
+    for _, row in table.iterrows():
+        hpd_str = f"[{row['hpd_lower']:.2f}, {row['hpd_upper']:.2f}]"
+        flag = "" if row['reliable'] else " ⚠"
+        print(f"{row['sigma']:>6.2f} {row['mean']:>8.3f} {row['median']:>8.3f} {hpd_str:>18} "
+              f"{row['k_hat']:>7.2f} {row['ess']:>8.0f}{flag}")
+    heavy = table.loc[table['k_hat'] > K_WARN, 'sigma']
+    if len(heavy):
+        print(f"\n⚠ k-hat > {K_WARN} for σ = {', '.join(f'{s:.2f}' for s in heavy)}: "
+              f"the {n_samples:,} samples do not cover that prior; run it instead")
+    few = table.loc[(table['k_hat'] <= K_WARN) & (table['ess'] < MIN_ESS), 'sigma']
+    if len(few):
+        print(f"\n⚠ ESS < {MIN_ESS} for σ = {', '.join(f'{s:.2f}' for s in few)}: "
+              f"a longer source run (or a run nearer that prior) is needed")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reweight a posterior log to other root-height priors.")
+    parser.add_argument("log", help="BEAST trace log (e.g. the loose run)")
+    parser.add_argument("--old-sigma", type=float, default=1.5, help="root prior sigma of the run")
+    parser.add_argument("--old-mean", type=float, help="root prior mean of the run (default --root-mean)")
+    parser.add_argument("--root-mean", type=float, default=4.5)
+    parser.add_argument("--sigma", type=float, nargs="+", default=[1.0, 0.5])
+    parser.add_argument("--grid", type=float, nargs=3, metavar=("FROM", "TO", "N"),
+                        help="evenly spaced sigmas instead of --sigma")
+    parser.add_argument("--burnin", default="auto", help="samples, fraction or 'auto' (at least 10%%)")
+    parser.add_argument("--csv", help="write the table here")
+    args = parser.parse_args(argv)
+
+    columns = load_columns(args.log, ['posterior', 'Tree.height'])
+    burnin = args.burnin if args.burnin == 'auto' else float(args.burnin)
+    diagnostics, burnin = diagnose(columns, burnin, min_burnin=0.1)
+    heights = np.asarray(columns['Tree.height'][burnin:])
+    sigmas = np.linspace(args.grid[0], args.grid[1], int(args.grid[2])) if args.grid else args.sigma
+
+    print("=" * 70)
+    print(f"Reweighting {args.log}: root ~ N({args.old_mean or args.root_mean}, {args.old_sigma})")
+    print("=" * 70)
+    start = time.perf_counter()
+    table = reweight(heights, sigmas, args.root_mean, args.old_sigma, args.old_mean,
+                     mcmc_ess=diagnostics.loc['Tree.height', 'ess'])
+    elapsed = time.perf_counter() - start
+    print(f"\n{len(heights):,} samples after burn-in, {len(table)} priors in {elapsed * 1000:.1f} ms")
+    print_reweighted(table, len(heights))
+
+    if args.csv:
+        table.to_csv(args.csv, index=False)
+        print(f"\n✓ Saved: {args.csv}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# scripts/run_beast_jobs.py
+"""
+Run many BEAST XMLs concurrently within a CPU budget.
+
+Each job gets its own working directory (results/sensitivity/<name>/), seed
+and thread count; BEAST writes its $(filebase) outputs there directly. Job
+status is kept in a manifest, so an interrupted or failed sweep picks up
+where it stopped (finished jobs are skipped, partial chains are resumed):
+
+    python scripts/run_beast_jobs.py results/xml/dravidian_*_prior.xml --threads 3
+    python scripts/run_beast_jobs.py results/xml/*.xml --replicates 4 --cpus 32
+    python scripts/run_beast_jobs.py results/xml/*.xml --beast tests/stub_beast.py
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+OUTPUT_DIR = Path("results/sensitivity")
+
+def job_label(xml):
+    """results/xml/dravidian_loose_prior.xml -> loose"""
+    return Path(xml).stem.removeprefix('dravidian_').removesuffix('_prior')
+
+def plan_jobs(xmls, output_dir=OUTPUT_DIR, replicates=1, threads=1, seed=1):
+    """
+    One job per XML and replicate.
+
+    Replicate chains run in <label>/rep<k>/ with consecutive seeds; a single
+    replicate runs in <label>/ like the original run_sensitivity.sh layout.
+    Two XMLs with the same label would share a working directory and
+    manifest entry, so that is an error.
+    """
+
+    jobs, labels = {}, {}
+    for i, xml in enumerate(xmls):
+        label = job_label(xml)
+        if label in labels:
+            raise ValueError(f"{labels[label]} and {xml} both map to job '{label}' "
+                             f"(rename one of them or run them with separate --output-dir)")
+        labels[label] = xml
+        for rep in range(replicates):
+            name = label if replicates == 1 else f"{label}/rep{rep + 1}"
+            jobs[name] = {
+                'xml': str(xml),
+                'workdir': str(Path(output_dir) / name),
+                'seed': seed + i * replicates + rep,
+                'threads': threads,
+                'status': 'pending',
+            }
+    return jobs
+
+def load_manifest(path):
+    path = Path(path)
+    if not path.exists():
+        return {'jobs': {}}
+    return json.loads(path.read_text())
+
+def save_manifest(manifest, path):
+    """Write the manifest atomically (a crash never leaves it half-written)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(manifest, indent=2))
+    tmp.replace(path)
+
+def merge_jobs(manifest, jobs):
+    """
+    Add planned jobs to the manifest, keeping the status and seed of jobs
+    already recorded for the same XML.
+    """
+
+    for name, job in jobs.items():
+        old = manifest['jobs'].get(name)
+        if old and old['xml'] == job['xml']:
+            old['threads'] = job['threads']
+            continue
+        manifest['jobs'][name] = job
+    return manifest
+
+def outputs(job):
+    """BEAST output files of a job ($(filebase).log, .trees, .xml.state)."""
+    workdir, stem = Path(job['workdir']), Path(job['xml']).stem
+    return sorted(str(p) for p in workdir.glob(f"{stem}*") if p.suffix != '.xml')
+
+def _command(job, beast, beagle, resume):
+    xml = Path(job['xml']).name
+    cmd = [beast, '-threads', str(job['threads']), '-seed', str(job['seed'])]
+    if beagle:
+        cmd.append('-beagle_CPU')
+    cmd.append('-resume' if resume else '-overwrite')
+    return cmd + [xml]
+
+def _start(job, beast, beagle):
+    """Launch one BEAST process in the job's working directory."""
+
+    workdir = Path(job['workdir'])
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    # Run a copy of the XML so the .state file and outputs stay in workdir
+    xml = workdir / Path(job['xml']).name
+    shutil.copyfile(job['xml'], xml)
+
+    state = xml.with_name(xml.name + '.state')
+    resume = job['status'] in ('failed', 'interrupted', 'running') and state.exists()
+    cmd = _command(job, beast, beagle, resume)
+
+    job.update(status='running', command=cmd, started=time.time(), resumed=resume)
+    job.pop('returncode', None)
+    job.pop('error', None)
+    with open(workdir / 'beast.out', 'ab') as stdout:
+        return subprocess.Popen(cmd, cwd=workdir, stdout=stdout, stderr=subprocess.STDOUT)
+
+def run_jobs(jobs, manifest_path=OUTPUT_DIR / "manifest.json", cpus=None,
+             beast="beast", beagle=True, poll=1.0, rerun=False):
+    """
+    Run jobs concurrently, never using more than `cpus` threads at once.
+
+    A job whose thread count exceeds the budget still runs, alone. Returns
+    the manifest with status, return code, timings and output files. If a
+    job cannot be started (or on Ctrl-C), the jobs already running are
+    terminated and the manifest is saved before the error is raised.
+    """
+
+    cpus = cpus or os.cpu_count() or 1
+    # Jobs run in their own working directories: make a relative path absolute
+    beast = os.path.abspath(shutil.which(beast) or beast)
+    manifest = merge_jobs(load_manifest(manifest_path), jobs)
+
+    pending = []
+    for name in jobs:
+        job = manifest['jobs'][name]
+        if job['status'] == 'done' and not rerun:
+            print(f"  ✓ {name}: already done, skipping")
+            continue
+        if rerun:
+            job['status'] = 'pending'
+        pending.append(name)
+
+    print(f"Running {len(pending)} jobs on {cpus} CPUs...")
+    running = {}
+
+    try:
+        while pending or running:
+            # Launch as many pending jobs as the thread budget allows
+            used = sum(manifest['jobs'][name]['threads'] for name in running)
+            for name in list(pending):
+                job = manifest['jobs'][name]
+                if running and used + job['threads'] > cpus:
+                    continue
+                try:
+                    running[name] = _start(job, beast, beagle)
+                except OSError as error:
+                    job.update(status='failed', error=str(error), finished=time.time())
+                    print(f"  ✗ {name}: could not start {beast}: {error}")
+                    raise
+                pending.remove(name)
+                used += job['threads']
+                print(f"  → {name}: started (seed {job['seed']}, {job['threads']} threads"
+                      f"{', resumed' if job['resumed'] else ''})")
+            save_manifest(manifest, manifest_path)
+
+            time.sleep(poll)
+
+            for name, proc in list(running.items()):
+                returncode = proc.poll()
+                if returncode is None:
+                    continue
+                job = manifest['jobs'][name]
+                job.update(
+                    status='done' if returncode == 0 else 'failed',
+                    returncode=returncode,
+                    finished=time.time(),
+                    elapsed=round(time.time() - job['started'], 1),
+                    outputs=outputs(job),
+                )
+                del running[name]
+                mark = "✓" if returncode == 0 else "✗"
+                print(f"  {mark} {name}: {job['status']} in {job['elapsed']:.0f}s")
+            save_manifest(manifest, manifest_path)
+
+    except (KeyboardInterrupt, OSError):
+        for name, proc in running.items():
+            proc.terminate()
+            proc.wait()
+            manifest['jobs'][name]['status'] = 'interrupted'
+        save_manifest(manifest, manifest_path)
+        raise
+
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run BEAST XMLs concurrently within a CPU budget.")
+    parser.add_argument("xmls", nargs="+", type=Path, help="BEAST XML files")
+    parser.add_argument("--cpus", type=int, help="total thread budget (default: all cores)")
+    parser.add_argument("--threads", type=int, default=1, help="BEAST threads per job")
+    parser.add_argument("--replicates", type=int, default=1, help="independent chains per XML")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first job")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--manifest", type=Path, help="default: <output-dir>/manifest.json")
+    parser.add_argument("--beast", default="beast", help="BEAST executable")
+    parser.add_argument("--no-beagle", action="store_true", help="do not pass -beagle_CPU")
+    parser.add_argument("--rerun", action="store_true", help="rerun jobs already done")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between status checks")
+    args = parser.parse_args(argv)
+
+    jobs = plan_jobs(args.xmls, args.output_dir, args.replicates, args.threads, args.seed)
+    manifest_path = args.manifest or args.output_dir / "manifest.json"
+    manifest = run_jobs(jobs, manifest_path, args.cpus, args.beast,
+                        not args.no_beagle, args.poll, args.rerun)
+
+    failed = [name for name in jobs if manifest['jobs'][name]['status'] != 'done']
+    print(f"\n{len(jobs) - len(failed)}/{len(jobs)} jobs done; manifest: {manifest_path}")
+    if failed:
+        print(f"  ✗ failed: {', '.join(failed)} (rerun the same command to resume)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
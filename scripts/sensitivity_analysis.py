@@ -3,12 +3,16 @@
 Comprehensive sensitivity analysis comparing three tree height priors.
 """
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 from pathlib import Path
 
+from hpd import hpd
+from log_cache import load_columns
+from mcmc_diagnostics import MIN_ESS, diagnose, passes
+from prior_sampler import sample_prior, summarize
+
 # Set style
 sns.set_style("whitegrid")
 plt.rcParams['figure.dpi'] = 300
@@ -17,30 +21,35 @@ def load_scenario(scenario_name, log_file):
     """Load and process a single scenario's results."""
     
     print(f"\nLoading {scenario_name}...")
-    df = pd.read_csv(log_file, sep="\t", comment="#")
+    # Memory-mapped from the column cache; only these columns are read
+    columns = load_columns(log_file, ['posterior', 'likelihood', 'Tree.height'])
     
-    # Remove 10% burnin
-    burnin = int(len(df) * 0.1)
-    df_post = df.iloc[burnin:]
+    # Burn-in detected from the posterior trace (at least 10%)
+    diagnostics, burnin = diagnose(columns, min_burnin=0.1)
+    tree_height = np.asarray(columns['Tree.height'][burnin:])
+    hpd_lower, hpd_upper = hpd(tree_height, 0.95)
     
     # Extract Tree Height statistics
-    tree_height = df_post['Tree.height']
-    
     stats = {
         'scenario': scenario_name,
         'mean': tree_height.mean(),
-        'median': tree_height.median(),
-        'std': tree_height.std(),
-        'hpd_lower': tree_height.quantile(0.025),
-        'hpd_upper': tree_height.quantile(0.975),
-        'hpd_width': tree_height.quantile(0.975) - tree_height.quantile(0.025),
-        'data': tree_height.values,
-        'full_df': df,
-        'post_df': df_post
+        'median': np.median(tree_height),
+        'std': tree_height.std(ddof=1),
+        'hpd_lower': hpd_lower,
+        'hpd_upper': hpd_upper,
+        'hpd_width': hpd_upper - hpd_lower,
+        'data': tree_height,
+        'burnin': burnin,
+        'ess': diagnostics.loc['Tree.height', 'ess'],
+        'converged': passes(diagnostics, MIN_ESS),
+        'diagnostics': diagnostics
     }
     
     print(f"  Mean: {stats['mean']:.2f} kya")
     print(f"  95% HPD: [{stats['hpd_lower']:.2f}, {stats['hpd_upper']:.2f}] kya")
+    print(f"  Burn-in: {burnin} samples, ESS: "
+          + ", ".join(f"{name} {row['ess']:.0f}" for name, row in diagnostics.iterrows())
+          + (" ✓" if stats['converged'] else f" ⚠ below {MIN_ESS}"))
     
     return stats
 
@@ -77,8 +86,18 @@ def compare_all_scenarios():
         stats = load_scenario(scenario['name'], scenario['log'])
         stats['color'] = scenario['color']
         stats['prior_sigma'] = scenario['prior_sigma']
+        # Effective prior on the root (tree prior x MRCA Normal), simulated directly
+        stats['prior'] = sample_prior({'root_sigma': scenario['prior_sigma']}, seed=1)
+        prior_stats = summarize(stats['prior'])
+        print(f"  Effective prior: {prior_stats['mean']:.2f} kya "
+              f"[{prior_stats['hpd_lower']:.2f}, {prior_stats['hpd_upper']:.2f}]")
+        stats['prior_hpd'] = (prior_stats['hpd_lower'], prior_stats['hpd_upper'])
         results.append(stats)
     
+    unconverged = [res['scenario'] for res in results if not res['converged']]
+    if unconverged:
+        print(f"\n⚠ ESS < {MIN_ESS} or R-hat too high: {', '.join(unconverged)} - run longer chains")
+    
     # Create comprehensive comparison plots
     create_comparison_plots(results)
     
@@ -98,10 +117,16 @@ def create_comparison_plots(results):
     
     # 1. Age distributions comparison
     ax1 = fig.add_subplot(gs[0, :])
+    bins = np.linspace(2, 8, 61)
     for res in results:
-        ax1.hist(res['data'], bins=60, alpha=0.5, color=res['color'], 
+        ax1.hist(res['data'], bins=bins, alpha=0.5, color=res['color'], 
                  label=f"{res['scenario']}: {res['mean']:.2f} kya [{res['hpd_lower']:.2f}-{res['hpd_upper']:.2f}]",
                  edgecolor='black', linewidth=0.5)
+        # Effective prior, scaled to the posterior's sample count
+        prior = res['prior']
+        counts, _ = np.histogram(prior['root_height'], bins=bins, weights=prior['weights'])
+        ax1.step(bins[:-1], counts * len(res['data']), where='post', color=res['color'],
+                 linestyle='--', linewidth=1.5)
     
     ax1.axvline(4.65, color='blue', linestyle='--', linewidth=2, 
                 label='Kolipakam et al. (2018): 4.65 kya')
@@ -109,7 +134,7 @@ def create_comparison_plots(results):
     
     ax1.set_xlabel('Proto-Dravidian Age (kya)', fontsize=12)
     ax1.set_ylabel('Frequency', fontsize=12)
-    ax1.set_title('A. Proto-Dravidian Age: Sensitivity to Tree Height Prior', 
+    ax1.set_title('A. Proto-Dravidian Age: Sensitivity to Tree Height Prior (dashed: prior)', 
                   fontsize=14, fontweight='bold')
     ax1.legend(fontsize=10, loc='upper right')
     ax1.set_xlim(2, 8)
@@ -167,10 +192,11 @@ def create_comparison_plots(results):
     # 5-7. MCMC traces for each scenario
     for i, res in enumerate(results):
         ax = fig.add_subplot(gs[2, i])
-        df = res['post_df']
-        ax.plot(df['Tree.height'], alpha=0.5, linewidth=0.3, color=res['color'])
+        samples = np.arange(res['burnin'], res['burnin'] + len(res['data']))
+        ax.plot(samples, res['data'], alpha=0.5, linewidth=0.3, color=res['color'])
         ax.axhline(res['mean'], color='red', linestyle='-', linewidth=1.5)
         ax.axhline(4.65, color='blue', linestyle='--', linewidth=1.5)
+        ax.axhspan(*res['prior_hpd'], color='gray', alpha=0.15)  # prior 95% HPD
         ax.set_xlabel('Sample', fontsize=10)
         ax.set_ylabel('Age (kya)', fontsize=10)
         ax.set_title(f'E{i+1}. {res["scenario"]} Trace', fontsize=11, fontweight='bold')
@@ -191,14 +217,14 @@ def create_summary_table(results):
     print("DETAILED RESULTS TABLE")
     print("="*70)
     
-    print(f"\n{'Scenario':<20} {'Prior σ':<10} {'Mean':<10} {'Median':<10} {'95% HPD':<25} {'Width':<10}")
+    print(f"\n{'Scenario':<20} {'Prior σ':<10} {'Mean':<10} {'Median':<10} {'95% HPD':<25} {'Width':<10} {'ESS':<10}")
     print("-"*100)
     
     for res in results:
         hpd_str = f"[{res['hpd_lower']:.2f}, {res['hpd_upper']:.2f}]"
         print(f"{res['scenario']:<20} {res['prior_sigma']:<10.1f} "
               f"{res['mean']:<10.2f} {res['median']:<10.2f} "
-              f"{hpd_str:<25} {res['hpd_width']:<10.2f}")
+              f"{hpd_str:<25} {res['hpd_width']:<10.2f} {res['ess']:<10.0f}")
     
     print("\nKolipakam et al. (2018) - 20 languages:")
     print(f"{'Original study':<20} {'N/A':<10} {'4.65':<10} {'N/A':<10} "
@@ -0,0 +1,129 @@
+# scripts/site_patterns.py
+"""
+Site-pattern compression of the binary cognate matrix.
+
+Likelihoods depend on a site only through its column of states, and with
+four languages there are at most 16 binary columns (more with '?'). The
+matrix is reduced once to its unique patterns and how often each occurs,
+so likelihood cost scales with the number of patterns, not features.
+
+Ascertainment: cognate sets absent from every language (and, with
+remove_constant_features, present in every language) are never recorded.
+site_patterns drops those columns and records the excluded patterns, and
+the likelihood conditions on a site not being one of them:
+
+    log L = sum_p w_p log L_p - N log(1 - sum_{x excluded} L_x)
+
+which is what BEAST computes for an ascertained alignment.
+
+    python scripts/site_patterns.py data/processed/dravidian_beastling.csv --ascertainment constant
+"""
+
+import argparse
+
+import numpy as np
+
+from cognate_matrix import pack_matrix, unpack
+
+ASCERTAINMENT = ('absent', 'constant')
+
+def excluded_patterns(n_taxa, ascertainment=None):
+    """Unobservable patterns (taxa x k int8): all-0, and all-1 for 'constant'."""
+    if ascertainment is None:
+        return np.zeros((n_taxa, 0), dtype=np.int8)
+    if ascertainment not in ASCERTAINMENT:
+        raise ValueError(f"Unknown ascertainment '{ascertainment}' (choose from {', '.join(ASCERTAINMENT)})")
+    states = [0] if ascertainment == 'absent' else [0, 1]
+    return np.repeat(np.array([states], dtype=np.int8), n_taxa, axis=0)
+
+def excluded_sites(values, ascertainment=None):
+    """
+    Columns that match an excluded pattern, '?' matching anything (a column
+    with no observed 1 is all-absent; with one observed state, constant).
+    """
+
+    observed = values >= 0
+    has_one = ((values == 1) & observed).any(axis=0)
+    has_zero = ((values == 0) & observed).any(axis=0)
+    if ascertainment is None:
+        return np.zeros(values.shape[1], dtype=bool)
+    if ascertainment == 'absent':
+        return ~has_one
+    return ~(has_one & has_zero)
+
+def compress(values):
+    """
+    Unique columns of a taxa x sites array and their counts.
+
+    Returns (patterns, weights, index): taxa x patterns int8, float
+    weights, and the pattern number of every site.
+    """
+
+    values = np.asarray(values, dtype=np.int8)
+    patterns, index, weights = np.unique(values, axis=1, return_inverse=True, return_counts=True)
+    return patterns, weights.astype(float), index.ravel()
+
+def site_patterns(matrix, ascertainment=None):
+    """
+    Pattern-compressed form of a packed cognate matrix.
+
+    Columns matching the excluded patterns of `ascertainment` ('absent',
+    'constant' or None) are dropped. Returns a dict with taxa, features
+    (the kept ones), patterns (taxa x patterns, -1 = missing), weights,
+    index (pattern of each kept feature), ascertainment and excluded.
+    """
+
+    values = unpack(matrix, missing_value=-1).astype(np.int8)
+    keep = ~excluded_sites(values, ascertainment)
+    patterns, weights, index = compress(values[:, keep])
+    return {
+        'taxa': np.asarray(matrix['languages'], dtype=str),
+        'features': np.asarray(matrix['features'])[keep],
+        'patterns': patterns,
+        'weights': weights,
+        'index': index,
+        'ascertainment': ascertainment,
+        'excluded': excluded_patterns(len(patterns), ascertainment),
+    }
+
+def n_sites(data):
+    return int(data['weights'].sum())
+
+def expand(data):
+    """Site-by-site values (taxa x kept features, -1 = missing)."""
+    return data['patterns'][:, data['index']]
+
+def to_matrix(data):
+    """Packed cognate matrix of the kept sites, for the alignment exporters."""
+    values = expand(data)
+    missing = values < 0
+    return pack_matrix(data['taxa'], data['features'], np.where(missing, 0, values),
+                       missing if missing.any() else None)
+
+def print_patterns(data):
+    """Print every pattern with its count."""
+
+    print(f"\n{n_sites(data)} sites, {len(data['weights'])} patterns "
+          f"(ascertainment: {data['ascertainment'] or 'none'})")
+    print(f"\n{'Pattern':<{max(len(data['taxa']), 7)}} {'Sites':>6}")
+    print("-" * 30)
+    symbols = np.array(list("01?"))
+    order = np.argsort(-data['weights'], kind='stable')
+    for p in order:
+        column = ''.join(symbols[data['patterns'][:, p]])
+        print(f"{column:<{max(len(data['taxa']), 7)}} {int(data['weights'][p]):>6}")
+    print(f"\nTaxa (row order): {', '.join(data['taxa'])}")
+
+def main(argv=None):
+    from cognate_matrix import load_matrix
+
+    parser = argparse.ArgumentParser(description="Compress a cognate matrix to site patterns.")
+    parser.add_argument("data", help="wide binary CSV or packed .npz")
+    parser.add_argument("--ascertainment", choices=ASCERTAINMENT,
+                        help="drop (and condition on) all-absent or constant columns")
+    args = parser.parse_args(argv)
+
+    print_patterns(site_patterns(load_matrix(args.data), args.ascertainment))
+
+if __name__ == "__main__":
+    main()
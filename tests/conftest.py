@@ -0,0 +1,7 @@
+# tests/conftest.py
+"""The scripts are run with scripts/ on the path (PYTHONPATH=scripts)."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# tests/stub_beast.py
+"""
+Stand-in for the BEAST executable, for testing run_beast_jobs without BEAST.
+
+Takes the same arguments run_beast_jobs passes
+(-threads N -seed S [-beagle_CPU] -overwrite|-resume file.xml), sleeps
+STUB_BEAST_SLEEP seconds (default 0.2) and writes <stem>.log, <stem>.trees
+and file.xml.state in the working directory. Every call is appended as one
+JSON line to $STUB_BEAST_CALLS, if set.
+
+If the XML stem is listed in STUB_BEAST_FAIL (comma-separated), a run
+without -resume writes the state file and exits with status 1, like a
+chain that crashed part-way; the -resume run then succeeds.
+
+    python scripts/run_beast_jobs.py results/xml/*.xml --beast tests/stub_beast.py
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+
+def main(argv):
+    xml = Path(argv[-1])
+    seed = int(argv[argv.index('-seed') + 1])
+    threads = int(argv[argv.index('-threads') + 1])
+    resume = '-resume' in argv
+    started = time.time()
+
+    time.sleep(float(os.environ.get('STUB_BEAST_SLEEP', 0.2)))
+    Path(xml.name + '.state').write_text(f"state seed={seed}\n")
+    failing = xml.stem in os.environ.get('STUB_BEAST_FAIL', '').split(',')
+    status = 1 if failing and not resume else 0
+    if status == 0:
+        Path(f"{xml.stem}.log").write_text("Sample\tposterior\n0\t-10.0\n1000\t-9.5\n")
+        Path(f"{xml.stem}.trees").write_text("#NEXUS\nEnd;\n")
+
+    if os.environ.get('STUB_BEAST_CALLS'):
+        with open(os.environ['STUB_BEAST_CALLS'], 'a') as f:
+            f.write(json.dumps({
+                'xml': xml.stem, 'cwd': os.getcwd(), 'seed': seed, 'threads': threads,
+                'resume': resume, 'started': started, 'finished': time.time(),
+                'status': status,
+            }) + "\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,126 @@
+# tests/test_run_beast_jobs.py
+"""run_beast_jobs against the stub BEAST executable (tests/stub_beast.py)."""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from run_beast_jobs import load_manifest, plan_jobs, run_jobs
+
+STUB = Path(__file__).resolve().parent / "stub_beast.py"
+
+
+@pytest.fixture
+def sweep(tmp_path, monkeypatch):
+    """Four XMLs, an output dir and a log of every stub call."""
+    xml_dir = tmp_path / "xml"
+    xml_dir.mkdir()
+    xmls = []
+    for name in ("loose", "medium", "tight", "extra"):
+        xml = xml_dir / f"dravidian_{name}_prior.xml"
+        xml.write_text("<beast/>\n")
+        xmls.append(xml)
+    calls = tmp_path / "calls.jsonl"
+    monkeypatch.setenv("STUB_BEAST_CALLS", str(calls))
+    monkeypatch.setenv("STUB_BEAST_SLEEP", "0.3")
+
+    def read_calls():
+        if not calls.exists():
+            return []
+        return [json.loads(line) for line in calls.read_text().splitlines()]
+
+    return xmls, tmp_path / "out", read_calls
+
+
+def run(xmls, out, **kw):
+    jobs = plan_jobs(xmls, out)
+    return jobs, run_jobs(jobs, out / "manifest.json", beast=str(STUB), poll=0.05, **kw)
+
+
+def test_runs_within_cpu_budget(sweep):
+    xmls, out, calls = sweep
+    jobs, manifest = run(xmls, out, cpus=2)
+
+    assert all(manifest['jobs'][name]['status'] == 'done' for name in jobs)
+    records = calls()
+    assert sorted(r['xml'] for r in records) == sorted(x.stem for x in xmls)
+    assert len({r['seed'] for r in records}) == len(xmls)
+
+    # Each job ran in its own directory with its outputs there
+    for name, job in manifest['jobs'].items():
+        workdir = Path(job['workdir'])
+        assert workdir == out / name
+        assert (workdir / f"{Path(job['xml']).stem}.log").exists()
+
+    # At most two stubs at once, and more than one at some point
+    events = sorted([(r['started'], 1) for r in records] + [(r['finished'], -1) for r in records])
+    level = peak = 0
+    for _, step in events:
+        level += step
+        peak = max(peak, level)
+    assert peak == 2
+
+
+def test_skips_finished_jobs(sweep):
+    xmls, out, calls = sweep
+    run(xmls, out, cpus=4)
+    assert len(calls()) == 4
+
+    jobs, manifest = run(xmls, out, cpus=4)
+    assert len(calls()) == 4
+    assert all(manifest['jobs'][name]['status'] == 'done' for name in jobs)
+
+    run(xmls[:1], out, cpus=4, rerun=True)
+    assert len(calls()) == 5
+
+
+def test_resumes_failed_jobs(sweep, monkeypatch):
+    xmls, out, calls = sweep
+    monkeypatch.setenv("STUB_BEAST_FAIL", xmls[0].stem)
+
+    jobs, manifest = run(xmls, out, cpus=4)
+    assert manifest['jobs']['loose']['status'] == 'failed'
+    assert manifest['jobs']['loose']['returncode'] == 1
+    assert sum(manifest['jobs'][name]['status'] == 'done' for name in jobs) == 3
+
+    jobs, manifest = run(xmls, out, cpus=4)
+    assert manifest['jobs']['loose']['status'] == 'done'
+    assert manifest['jobs']['loose']['resumed']
+    last = calls()[-1]
+    assert (last['xml'], last['resume']) == (xmls[0].stem, True)
+    assert len(calls()) == 5
+
+
+def test_relative_executable(sweep, monkeypatch):
+    xmls, out, calls = sweep
+    monkeypatch.chdir(STUB.parent.parent)
+    jobs = plan_jobs(xmls[:1], out)
+    manifest = run_jobs(jobs, out / "manifest.json", beast=os.path.join("tests", STUB.name),
+                        poll=0.05)
+    assert manifest['jobs']['loose']['status'] == 'done'
+
+
+def test_launch_failure_saves_manifest(sweep):
+    xmls, out, calls = sweep
+    jobs = plan_jobs(xmls, out)
+    with pytest.raises(OSError):
+        run_jobs(jobs, out / "manifest.json", cpus=4, beast=str(out / "no_such_beast"), poll=0.05)
+
+    manifest = load_manifest(out / "manifest.json")
+    assert manifest['jobs']['loose']['status'] == 'failed'
+    assert 'error' in manifest['jobs']['loose']
+    assert calls() == []
+
+
+def test_launch_failure_stops_running_jobs(sweep):
+    xmls, out, calls = sweep
+    jobs = plan_jobs(xmls[:2], out)
+    xmls[1].unlink()            # the second job cannot be set up
+    with pytest.raises(OSError):
+        run_jobs(jobs, out / "manifest.json", cpus=4, beast=str(STUB), poll=0.05)
+
+    manifest = load_manifest(out / "manifest.json")
+    assert manifest['jobs']['loose']['status'] == 'interrupted'
+    assert manifest['jobs']['medium']['status'] == 'failed'